@@ -0,0 +1,183 @@
+"""Compressed, content-deduplicated archives of the W&B offline runs in an output directory.
+
+Layout of <user>__<slug>__v<version>.tar.gz:
+
+    manifest.json                      kernel ID, version, runs, dedup links
+    <path of offline-run-* relative to the output dir>/...
+
+Files with identical content are stored once; later copies are hard-link
+members pointing at the first one. The archive is written and read as a
+stream, so neither side holds the runs in memory.
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import time
+from pathlib import Path, PurePosixPath
+
+from kaggle_wandb_sync._utils import offline_run_id
+
+
+ARCHIVE_SUFFIX = ".tar.gz"
+MANIFEST_NAME = "manifest.json"
+SKIP_DIRS = ("logs", "tmp")  # debug logs and scratch space are not needed to re-sync
+
+
+def archive_name(kernel_id: str, version) -> str:
+    """File name of the archive for kernel_id at version (e.g. me__my-nb__v3.tar.gz)."""
+    return f"{kernel_id.replace('/', '__')}__v{version}{ARCHIVE_SUFFIX}"
+
+
+def find_archive(archive_dir: Path, kernel_id: str, version=None) -> Path | None:
+    """Return the archive for kernel_id at version, or its newest archive if version is None."""
+    if version is not None:
+        path = archive_dir / archive_name(kernel_id, version)
+        return path if path.exists() else None
+    prefix = f"{kernel_id.replace('/', '__')}__v"
+    candidates = [p for p in archive_dir.glob(f"{prefix}*{ARCHIVE_SUFFIX}")]
+    return max(candidates, key=lambda p: p.stat().st_mtime, default=None)
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _run_files(run_dir: Path) -> list:
+    files = []
+    for f in sorted(run_dir.rglob("*")):
+        rel = f.relative_to(run_dir)
+        if f.is_file() and not f.is_symlink() and rel.parts[0] not in SKIP_DIRS:
+            files.append(f)
+    return files
+
+
+def write_archive(output_dir: Path, dest: Path, kernel_id: str, version) -> dict:
+    """Pack every offline-run-* under output_dir into dest and return the manifest.
+
+    The archive is written to a temporary name and renamed into place, so an
+    interrupted run never leaves a truncated archive behind.
+    """
+    output_dir = Path(output_dir)
+    run_dirs = sorted(p for p in output_dir.rglob("offline-run-*") if p.is_dir())
+
+    entries = []  # (path, arcname, link target or None)
+    first_by_digest = {}
+    runs = []
+    for run_dir in run_dirs:
+        files = _run_files(run_dir)
+        for f in files:
+            arcname = f.relative_to(output_dir).as_posix()
+            digest = _file_digest(f)
+            target = first_by_digest.setdefault(digest, arcname)
+            entries.append((f, arcname, None if target == arcname else target))
+        runs.append({
+            "name": run_dir.name,
+            "run_id": offline_run_id(run_dir),
+            "path": run_dir.relative_to(output_dir).as_posix(),
+            "files": len(files),
+            "bytes": sum(f.stat().st_size for f in files),
+        })
+
+    manifest = {
+        "kernel_id": kernel_id,
+        "version": version,
+        "created_at": time.time(),
+        "runs": runs,
+        "links": {arcname: target for _, arcname, target in entries if target},
+        "stored_bytes": sum(f.stat().st_size for f, _, target in entries if not target),
+    }
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    with tarfile.open(tmp, "w:gz") as tar:
+        data = json.dumps(manifest, indent=2).encode()
+        info = tarfile.TarInfo(MANIFEST_NAME)
+        info.size = len(data)
+        info.mtime = int(manifest["created_at"])
+        tar.addfile(info, io.BytesIO(data))
+        for f, arcname, target in entries:
+            info = tar.gettarinfo(str(f), arcname)
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            if target:
+                info.type = tarfile.LNKTYPE
+                info.linkname = target
+                info.size = 0
+                tar.addfile(info)
+            else:
+                info.type = tarfile.REGTYPE
+                info.size = f.stat().st_size
+                with open(f, "rb") as fp:
+                    tar.addfile(info, fp)
+    os.replace(tmp, dest)
+    return manifest
+
+
+def read_manifest(path: Path) -> dict:
+    """Read the manifest (first member) without decompressing the rest."""
+    with tarfile.open(path, "r|gz") as tar:
+        member = tar.next()
+        if member is None or member.name != MANIFEST_NAME:
+            raise ValueError(f"{path} is not a kaggle-wandb-sync archive (no manifest)")
+        return json.loads(tar.extractfile(member).read())
+
+
+def _safe_target(output_dir: Path, arcname: str) -> Path:
+    parts = PurePosixPath(arcname).parts
+    if not parts or PurePosixPath(arcname).is_absolute() or ".." in parts:
+        raise ValueError(f"unsafe path in archive: {arcname!r}")
+    return output_dir.joinpath(*parts)
+
+
+def restore_archive(path: Path, output_dir: Path, runs=None) -> list:
+    """Extract the runs named in runs (run IDs or directory names; all if None).
+
+    Reads the archive in a single streaming pass. Deduplicated files whose
+    stored copy belongs to a run that is not being restored are still
+    written, from that stored copy. Returns the restored run manifest entries.
+    """
+    output_dir = Path(output_dir)
+    manifest = read_manifest(path)
+    wanted = [
+        r for r in manifest["runs"]
+        if runs is None or r["run_id"] in runs or r["name"] in runs
+    ]
+    prefixes = tuple(r["path"] + "/" for r in wanted)
+
+    # stored member -> link members (in wanted runs) that need its content
+    needed_by = {}
+    for link, target in manifest["links"].items():
+        if link.startswith(prefixes):
+            needed_by.setdefault(target, []).append(link)
+
+    with tarfile.open(path, "r|gz") as tar:
+        for member in tar:
+            if member.name == MANIFEST_NAME or member.islnk():
+                continue  # link members are materialised from their stored copy below
+            if not member.isfile():
+                continue
+            destinations = list(needed_by.get(member.name, []))
+            if member.name.startswith(prefixes):
+                destinations.insert(0, member.name)
+            if not destinations:
+                continue
+
+            first = _safe_target(output_dir, destinations[0])
+            first.parent.mkdir(parents=True, exist_ok=True)
+            with tar.extractfile(member) as src, open(first, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.utime(first, (member.mtime, member.mtime))
+            for other in destinations[1:]:
+                target = _safe_target(output_dir, other)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(first, target)
+
+    return wanted
@@ -0,0 +1,150 @@
+"""Log selected kernel output files as a W&B artifact of the synced run.
+
+Offline runs are not the only output worth keeping: submission.csv, OOF
+predictions and model weights sit next to them in the output directory and
+are lost with the CI workspace. Each W&B project found in the output gets
+one artifact (default name PROJECT-output), logged as an output of its
+latest run.
+
+A new version only uploads what changed since the previous one. Its
+manifest is fetched first; a file whose size differs is changed outright,
+and files with the same name and size are MD5-hashed in parallel (the
+digest W&B records) and compared. Unchanged files are carried over from
+the previous version, and if nothing changed the existing version is just
+linked to the new run. Each upload holds a slot of a shared semaphore, so
+concurrent kernels never have more than `jobs` artifacts in flight.
+"""
+
+import base64
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+
+from kaggle_wandb_sync._profile import timed
+from kaggle_wandb_sync._utils import is_not_found
+
+
+ARTIFACT_TYPE = "kaggle-output"
+_CHUNK = 1024 * 1024
+
+
+def select_files(output_dir, patterns) -> dict:
+    """Map artifact path → file for the files under output_dir matching any glob.
+
+    Patterns are relative to output_dir (** recurses). Files inside wandb/
+    or offline-run-* directories are left out: the runs are synced instead.
+    """
+    root = Path(output_dir)
+    files = {}
+    for pattern in patterns:
+        if Path(pattern).is_absolute():
+            raise ValueError(f"artifact pattern must be relative to the output directory: {pattern!r}")
+        for path in sorted(root.glob(pattern)):
+            rel = path.relative_to(root)
+            if any(part == "wandb" or part.startswith("offline-run-") for part in rel.parts[:-1]):
+                continue
+            if path.is_file():
+                files.setdefault(rel.as_posix(), path)
+    return files
+
+
+def md5_b64(path) -> str:
+    """Base64 MD5 of a file, as recorded in W&B artifact manifests."""
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK):
+            md5.update(chunk)
+    return base64.b64encode(md5.digest()).decode("ascii")
+
+
+def file_digests(paths, max_workers: int | None = None) -> dict:
+    """md5_b64 of every path, hashed on a thread pool (hashlib releases the GIL)."""
+    paths = list(paths)
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(paths, pool.map(md5_b64, paths)))
+
+
+def changed_files(files: dict, previous: dict, max_workers: int | None = None) -> list:
+    """Names in files (name → path) whose content differs from previous (name → (size, digest)).
+
+    Only files with the same name and size as before need hashing.
+    """
+    candidates = {
+        name: path for name, path in files.items()
+        if name in previous and os.path.getsize(path) == previous[name][0]
+    }
+    digests = file_digests(candidates.values(), max_workers)
+    return [
+        name for name, path in files.items()
+        if name not in candidates or digests[path] != previous[name][1]
+    ]
+
+
+def _latest_version(api, path: str, artifact_type: str):
+    """The latest version of the artifact at entity/project/name, or None if there is none yet."""
+    from wandb.errors import CommError
+
+    try:
+        with timed("network"):
+            return api.artifact(f"{path}:latest", type=artifact_type)
+    except (CommError, ValueError) as e:
+        if is_not_found(e):
+            return None
+        raise
+
+
+def log_output_artifact(
+    run_path: str,
+    files: dict,
+    name: str,
+    api,
+    init=None,
+    limit=None,
+    artifact_type: str = ARTIFACT_TYPE,
+    max_workers: int | None = None,
+) -> tuple:
+    """Log files (name → path) as a new version of artifact `name`, output of run_path.
+
+    run_path is entity/project/run_id (or project/run_id). api is a
+    wandb.Api(); init defaults to wandb.init and resumes the run when files
+    have to be uploaded. limit is a semaphore held while uploading. Returns
+    ("name:vN", changed file names); raises on failure.
+    """
+    import wandb
+
+    init = init or wandb.init
+    project_path, run_id = run_path.rsplit("/", 1)
+    latest = _latest_version(api, f"{project_path}/{name}", artifact_type)
+    previous = {n: (e.size, e.digest) for n, e in latest.manifest.entries.items()} if latest is not None else {}
+    changed = changed_files(files, previous, max_workers)
+    removed = [n for n in previous if n not in files]
+
+    with limit or nullcontext():
+        if latest is not None and not changed and not removed:
+            with timed("network"):
+                api.run(run_path).log_artifact(latest)
+            return f"{name}:{latest.version}", []
+
+        draft = latest.new_draft() if latest is not None else wandb.Artifact(name, type=artifact_type)
+        for n in removed:
+            draft.remove(n)
+        for n in changed:
+            # immutable: upload the file in place instead of staging a copy
+            draft.add_file(str(files[n]), name=n, overwrite=True, policy="immutable")
+
+        entity, _, project = project_path.rpartition("/")
+        with timed("network"):
+            run = init(
+                entity=entity or None, project=project, id=run_id, resume="must",
+                reinit="create_new", settings=wandb.Settings(silent=True),
+            )
+            try:
+                logged = run.log_artifact(draft)
+                logged.wait()
+            finally:
+                run.finish()
+    return f"{name}:{logged.version}", changed
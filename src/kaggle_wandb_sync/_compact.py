@@ -0,0 +1,254 @@
+"""Pre-sync compaction of offline runs to cut upload volume."""
+
+import json
+import shutil
+from pathlib import Path
+from typing import NamedTuple
+
+from kaggle_wandb_sync._utils import dir_size, format_bytes
+from kaggle_wandb_sync._records import (
+    RecordFormatError, RecordWriter, find_wandb_file, iter_records, parse_record, read_header,
+)
+
+
+class CompactResult(NamedTuple):
+    """What compact_run did to one offline run."""
+
+    name: str
+    bytes_before: int
+    bytes_after: int
+    history_before: int
+    history_after: int
+    media_dropped: list
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+def _item_key(item) -> str:
+    return ".".join(item.nested_key) if item.nested_key else item.key
+
+
+def _references_media(value_json: str, dropped_media: set) -> bool:
+    """True if a history/summary value points at one of the dropped media files.
+
+    Media values are dicts like {"_type": "image-file", "path": "media/..."};
+    grouped media list theirs under "filenames".
+    """
+    if not any(path in value_json for path in dropped_media):
+        return False  # cheap pre-check: most values are plain numbers
+    try:
+        value = json.loads(value_json)
+    except ValueError:
+        return False
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get("path") in dropped_media:
+                return True
+            if any(f in dropped_media for f in node.get("filenames") or () if isinstance(f, str)):
+                return True
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return False
+
+
+def _scan(wandb_file: Path, max_points: int | None) -> tuple:
+    """First pass: find the last summary record and, if downsampling, pick
+    evenly spaced point indices to keep for each metric.
+
+    Returns (last_summary_index, keep) where keep maps metric -> set of point
+    indices, only for metrics with more than max_points points.
+    """
+    counts = {}
+    last_summary_index = None
+    for i, data in enumerate(iter_records(wandb_file)):
+        record = parse_record(data)
+        kind = record.WhichOneof("record_type")
+        if kind == "summary":
+            last_summary_index = i
+        elif kind == "history" and max_points:
+            for item in record.history.item:
+                key = _item_key(item)
+                if not key.startswith("_"):
+                    counts[key] = counts.get(key, 0) + 1
+
+    keep = {}
+    for key, count in counts.items():
+        if count <= max_points:
+            continue
+        if max_points == 1:
+            keep[key] = {count - 1}
+        else:
+            keep[key] = {round(i * (count - 1) / (max_points - 1)) for i in range(max_points)}
+    return last_summary_index, keep
+
+
+def _rewrite_records(src: Path, dst: Path, max_points: int | None, dropped_media: set) -> tuple:
+    """Second pass: write src to dst with history downsampled, summaries merged,
+    and files records and history/summary values for dropped media removed.
+    Returns (history_before, history_after).
+    """
+    last_summary_index, keep = _scan(src, max_points)
+    with open(src, "rb") as fp:
+        version = read_header(fp)
+
+    seen = {}
+    summary = {}
+    history_before = history_after = 0
+
+    with RecordWriter(dst, version=version) as writer:
+        for i, data in enumerate(iter_records(src)):
+            record = parse_record(data)
+            kind = record.WhichOneof("record_type")
+
+            if kind == "history":
+                history_before += 1
+                items = []
+                had_metric = has_metric = False
+                for item in record.history.item:
+                    key = _item_key(item)
+                    if key.startswith("_"):
+                        items.append(item)
+                        continue
+                    had_metric = True
+                    index = seen.get(key, 0)
+                    seen[key] = index + 1
+                    if key in keep and index not in keep[key]:
+                        continue
+                    if dropped_media and _references_media(item.value_json, dropped_media):
+                        continue
+                    items.append(item)
+                    has_metric = True
+                if had_metric and not has_metric:
+                    continue
+                if len(items) != len(record.history.item):
+                    del record.history.item[:]
+                    record.history.item.extend(items)
+                    data = record.SerializeToString()
+                history_after += 1
+
+            elif kind == "summary":
+                for item in record.summary.update:
+                    if dropped_media and _references_media(item.value_json, dropped_media):
+                        summary[(item.key, tuple(item.nested_key))] = None  # would point at a dropped file
+                    else:
+                        summary[(item.key, tuple(item.nested_key))] = item
+                for item in record.summary.remove:
+                    summary[(item.key, tuple(item.nested_key))] = None
+                if i != last_summary_index:
+                    continue
+                del record.summary.update[:]
+                del record.summary.remove[:]
+                for (key, nested), item in summary.items():
+                    if item is None:
+                        removed = record.summary.remove.add()
+                        removed.key = key
+                        removed.nested_key.extend(nested)
+                    else:
+                        record.summary.update.append(item)
+                data = record.SerializeToString()
+
+            elif kind == "files" and dropped_media:
+                items = [f for f in record.files.files if f.path not in dropped_media]
+                if len(items) != len(record.files.files):
+                    if not items:
+                        continue
+                    del record.files.files[:]
+                    record.files.files.extend(items)
+                    data = record.SerializeToString()
+
+            writer.write(data)
+
+    return history_before, history_after
+
+
+def compact_run(
+    run_dir: Path,
+    dest_dir: Path,
+    max_history_points: int | None = None,
+    max_media_bytes: int | None = None,
+) -> CompactResult:
+    """Write a compacted copy of run_dir to dest_dir/<run_dir.name>.
+
+    - History is downsampled to at most max_history_points evenly spaced
+      points per metric (first and last point are always kept).
+    - All summary updates are merged into a single record holding
+      the final values.
+    - Files under files/media/ larger than max_media_bytes are dropped, along
+      with their upload entries and the history/summary values that point
+      at them (a history row left with no metrics is dropped too).
+    The original run_dir is not modified.
+    """
+    run_dir = Path(run_dir)
+    target = Path(dest_dir) / run_dir.name
+    wandb_file = find_wandb_file(run_dir)
+    files_dir = run_dir / "files"
+
+    dropped_media = set()
+    if max_media_bytes is not None and (files_dir / "media").is_dir():
+        for f in (files_dir / "media").rglob("*"):
+            if f.is_file() and f.stat().st_size > max_media_bytes:
+                dropped_media.add(f.relative_to(files_dir).as_posix())
+
+    def ignore(directory, names):
+        skipped = set()
+        for name in names:
+            path = Path(directory) / name
+            if name.endswith(".wandb.syncstate") or path == wandb_file:
+                skipped.add(name)  # sync offsets don't apply to the rewritten stream
+            elif path.is_file() and path.is_relative_to(files_dir) \
+                    and path.relative_to(files_dir).as_posix() in dropped_media:
+                skipped.add(name)
+        return skipped
+
+    shutil.copytree(run_dir, target, ignore=ignore)
+
+    history_before = history_after = 0
+    if wandb_file is not None:
+        history_before, history_after = _rewrite_records(
+            wandb_file, target / wandb_file.name, max_history_points, dropped_media,
+        )
+
+    return CompactResult(
+        name=run_dir.name,
+        bytes_before=dir_size(run_dir),
+        bytes_after=dir_size(target),
+        history_before=history_before,
+        history_after=history_after,
+        media_dropped=sorted(dropped_media),
+    )
+
+
+def compact_runs(offline_runs, tmp_path: Path, max_history_points=None, max_media_mb=None, log=None) -> list:
+    """Write compacted copies of offline_runs under tmp_path and return their paths.
+
+    A run that can't be compacted (e.g. unreadable .wandb file) is returned
+    as-is. log(message, err=False), if given, gets a per-run report.
+    """
+    log = log or (lambda *a, **k: None)
+    max_media_bytes = int(max_media_mb * 1024 * 1024) if max_media_mb is not None else None
+    log("\nCompacting offline runs...")
+    compacted = []
+    total_saved = 0
+    for i, run_dir in enumerate(offline_runs):
+        try:
+            result = compact_run(run_dir, tmp_path / str(i), max_history_points, max_media_bytes)
+        except (RecordFormatError, OSError) as e:
+            log(f"  {run_dir.name}: not compacted ({e}); syncing original.", err=True)
+            compacted.append(run_dir)
+            continue
+        total_saved += result.bytes_saved
+        details = f"history {result.history_before}→{result.history_after} rows"
+        if result.media_dropped:
+            details += f", dropped {len(result.media_dropped)} media file(s)"
+        log(
+            f"  {result.name}: {format_bytes(result.bytes_before)} → {format_bytes(result.bytes_after)}"
+            f" (saved {format_bytes(result.bytes_saved)}; {details})"
+        )
+        compacted.append(tmp_path / str(i) / run_dir.name)
+    log(f"  Total saved: {format_bytes(total_saved)}")
+    return compacted
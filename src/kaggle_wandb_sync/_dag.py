@@ -0,0 +1,123 @@
+"""Minimal dependency-aware stage executor used by the run pipeline."""
+
+import asyncio
+import inspect
+import threading
+import time
+from typing import Callable, NamedTuple
+
+import click
+
+
+class Stage(NamedTuple):
+    """A unit of work that starts once every stage named in deps has succeeded."""
+
+    name: str
+    func: Callable
+    deps: tuple = ()
+
+
+class StageResult(NamedTuple):
+    """Outcome of one stage: status is OK, FAILED or SKIPPED."""
+
+    status: str
+    seconds: float = 0.0
+    value: object = None
+    error: BaseException | None = None
+
+
+def _describe(error: BaseException) -> str:
+    if isinstance(error, SystemExit):
+        return f"exit {error.code}"
+    return f"{type(error).__name__}: {error}"
+
+
+async def run_stages_async(stages: list, cancel_event: threading.Event | None = None, echo: bool = True) -> dict:
+    """Run stages concurrently on the running event loop, respecting dependencies.
+
+    A stage's func is either a coroutine function, awaited as a task, or a
+    plain callable, run with asyncio.to_thread. Each stage starts as soon as
+    all its deps are OK. If a stage fails (including SystemExit from a click
+    command), every stage that depends on it, directly or not, is SKIPPED;
+    independent stages keep running. Returns {name: StageResult} in the
+    order the stages were given. With echo, stage starts and ends are printed.
+
+    On KeyboardInterrupt (or when this coroutine is cancelled, as asyncio.run
+    does on Ctrl-C), cancel_event is set so threaded stages can stop their
+    waits, every running task is cancelled, and the interrupt is re-raised.
+    """
+    log = click.echo if echo else (lambda *a, **k: None)
+    by_name = {s.name: s for s in stages}
+    if len(by_name) != len(stages):
+        raise ValueError("stage names must be unique")
+    for s in stages:
+        missing = [d for d in s.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"stage {s.name!r} depends on unknown stage(s): {missing}")
+
+    results = {}
+    pending = list(stages)
+    running = {}
+
+    async def timed(stage):
+        start = time.monotonic()
+        try:
+            if inspect.iscoroutinefunction(stage.func):
+                value = await stage.func()
+            else:
+                value = await asyncio.to_thread(stage.func)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:  # SystemExit and KeyboardInterrupt would escape the event loop
+            return None, e, time.monotonic() - start
+        return value, None, time.monotonic() - start
+
+    try:
+        while pending or running:
+            for stage in list(pending):
+                dep_status = [results[d].status for d in stage.deps if d in results]
+                if any(status != "OK" for status in dep_status):
+                    failed_dep = next(d for d in stage.deps if d in results and results[d].status != "OK")
+                    results[stage.name] = StageResult("SKIPPED")
+                    pending.remove(stage)
+                    log(f"--- [{stage.name}] skipped ({failed_dep} did not succeed)")
+                elif len(dep_status) == len(stage.deps):
+                    log(f"==> [{stage.name}] started")
+                    running[asyncio.create_task(timed(stage))] = stage
+                    pending.remove(stage)
+
+            if not running:
+                if pending:
+                    raise ValueError(f"dependency cycle among stages: {[s.name for s in pending]}")
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stage = running.pop(task)
+                value, error, seconds = task.result()
+                if error is None:
+                    results[stage.name] = StageResult("OK", seconds, value)
+                    log(f"<== [{stage.name}] done ({seconds:.1f}s)")
+                elif isinstance(error, KeyboardInterrupt):
+                    raise error
+                else:
+                    results[stage.name] = StageResult("FAILED", seconds, error=error)
+                    log(f"<== [{stage.name}] FAILED ({_describe(error)}, {seconds:.1f}s)", err=True)
+    except BaseException:
+        if cancel_event is not None:
+            cancel_event.set()
+        for task in running:
+            task.cancel()
+        raise
+
+    return {s.name: results[s.name] for s in stages}
+
+
+def format_summary(results: dict) -> str:
+    """Render a per-stage status table."""
+    width = max((len(name) for name in results), default=0)
+    lines = []
+    for name, r in results.items():
+        seconds = f"{r.seconds:.1f}s" if r.status != "SKIPPED" else "-"
+        lines.append(f"  {name.ljust(width)}  {r.status.ljust(7)}  {seconds}")
+    return "\n".join(lines)
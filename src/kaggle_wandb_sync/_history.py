@@ -0,0 +1,217 @@
+"""Local SQLite index of past pipeline outcomes (used by the history command)."""
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from kaggle_wandb_sync._utils import normalize_path
+
+
+HISTORY_ENV = "KAGGLE_WANDB_SYNC_HISTORY"
+DEFAULT_HISTORY_PATH = Path.home() / ".kaggle-wandb-sync" / "history.db"
+SORT_COLUMNS = ("recorded_at", "duration", "score", "version")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at REAL NOT NULL,
+    command TEXT NOT NULL,
+    kernel_id TEXT,
+    version INTEGER,
+    status TEXT,
+    duration REAL,
+    bytes INTEGER,
+    score REAL,
+    stages TEXT,
+    run_ids TEXT,
+    run_seconds TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_kernel ON events (kernel_id, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_events_command ON events (command, recorded_at);
+"""
+
+
+def history_path() -> Path | None:
+    """Return the index location, or None if recording is disabled.
+
+    Set KAGGLE_WANDB_SYNC_HISTORY to a file path to relocate the index,
+    or to an empty string / "off" to disable it.
+    """
+    value = os.environ.get(HISTORY_ENV)
+    if value is None:
+        return DEFAULT_HISTORY_PATH
+    if value.strip().lower() in ("", "0", "off", "false"):
+        return None
+    return Path(normalize_path(value))
+
+
+def connect(path: Path | None = None) -> sqlite3.Connection:
+    """Open (and create if needed) the history index."""
+    path = path or history_path()
+    if path is None:
+        raise sqlite3.OperationalError(f"history is disabled ({HISTORY_ENV})")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(events)")}
+    if "run_seconds" not in columns:  # index created before per-run upload times
+        conn.execute("ALTER TABLE events ADD COLUMN run_seconds TEXT")
+    return conn
+
+
+def record_event(
+    command: str,
+    kernel_id: str | None = None,
+    version: int | None = None,
+    status: str | None = None,
+    duration: float | None = None,
+    num_bytes: int | None = None,
+    score: float | None = None,
+    stages: dict | None = None,
+    run_ids: list | None = None,
+    run_seconds: dict | None = None,
+) -> None:
+    """Append one outcome to the index. Best-effort: never raises.
+
+    stages maps pipeline stage -> seconds; run_seconds maps W&B run ID ->
+    upload seconds (sync only).
+    """
+    if history_path() is None:
+        return
+    try:
+        conn = connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO events (recorded_at, command, kernel_id, version, status,"
+                    " duration, bytes, score, stages, run_ids, run_seconds)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        time.time(), command, kernel_id, version, status, duration, num_bytes, score,
+                        json.dumps(stages) if stages else None,
+                        json.dumps(run_ids) if run_ids else None,
+                        json.dumps(run_seconds) if run_seconds else None,
+                    ),
+                )
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        pass  # history is best-effort
+
+
+def query_events(
+    kernel_id: str | None = None,
+    command: str | None = None,
+    since: float | None = None,
+    sort: str = "recorded_at",
+    descending: bool = True,
+    limit: int | None = 20,
+) -> list:
+    """Return matching events as dicts (stages/run_ids/run_seconds decoded).
+
+    since is a UNIX timestamp; events recorded before it are excluded.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {SORT_COLUMNS}, got {sort!r}")
+    if history_path() is None:
+        return []
+
+    clauses, params = [], []
+    if kernel_id:
+        clauses.append("kernel_id = ?")
+        params.append(kernel_id)
+    if command:
+        clauses.append("command = ?")
+        params.append(command)
+    if since is not None:
+        clauses.append("recorded_at >= ?")
+        params.append(since)
+
+    sql = "SELECT * FROM events"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    # NULLs last regardless of direction
+    sql += f" ORDER BY {sort} IS NULL, {sort} {'DESC' if descending else 'ASC'}, id DESC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    conn = connect()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    events = []
+    for row in rows:
+        event = dict(row)
+        event["stages"] = json.loads(event["stages"]) if event["stages"] else {}
+        event["run_ids"] = json.loads(event["run_ids"]) if event["run_ids"] else []
+        event["run_seconds"] = json.loads(event["run_seconds"]) if event["run_seconds"] else {}
+        events.append(event)
+    return events
+
+
+def measured_throughput(limit: int = 20) -> float | None:
+    """Per-upload throughput (bytes/s) of the last successful syncs, if any.
+
+    Sync events store each run's upload time in run_seconds (run ID -> seconds),
+    so bytes are divided by the summed upload time rather than the wall time
+    of a --parallel sync; events recorded without it fall back to duration.
+    """
+    if history_path() is None:
+        return None
+    try:
+        conn = connect()
+        try:
+            rows = conn.execute(
+                "SELECT bytes, duration, run_seconds FROM events"
+                " WHERE command = 'sync' AND status = 'OK' AND bytes > 0 AND duration > 0"
+                " ORDER BY recorded_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        return None
+    total_bytes = total_seconds = 0
+    for row in rows:
+        run_seconds = json.loads(row["run_seconds"]) if row["run_seconds"] else {}
+        total_bytes += row["bytes"]
+        total_seconds += sum(run_seconds.values()) or row["duration"]
+    if not total_bytes or not total_seconds:
+        return None
+    return total_bytes / total_seconds
+
+
+def latest_version(kernel_id: str) -> int | None:
+    """Highest kernel version recorded for kernel_id, if any."""
+    try:
+        events = query_events(kernel_id=kernel_id, sort="version", limit=1)
+    except (sqlite3.Error, OSError):
+        return None
+    return events[0]["version"] if events else None
+
+
+def average_duration(kernel_id: str, command: str = "run", limit: int = 5) -> float | None:
+    """Mean duration of the last successful `command` events for kernel_id, if any."""
+    if history_path() is None:
+        return None
+    try:
+        conn = connect()
+        try:
+            row = conn.execute(
+                "SELECT AVG(duration) FROM ("
+                " SELECT duration FROM events"
+                " WHERE kernel_id = ? AND command = ? AND status = 'OK' AND duration > 0"
+                " ORDER BY recorded_at DESC LIMIT ?)",
+                (kernel_id, command, limit),
+            ).fetchone()
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        return None
+    return row[0]
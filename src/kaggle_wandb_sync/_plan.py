@@ -0,0 +1,67 @@
+"""Dry-run planning for sync: sizes, record counts and upload time estimates."""
+
+import heapq
+from pathlib import Path
+from typing import NamedTuple
+
+from kaggle_wandb_sync._records import RecordFormatError, find_wandb_file, iter_records
+from kaggle_wandb_sync._utils import dir_size, offline_run_id
+
+
+DEFAULT_THROUGHPUT = 2 * 1024 * 1024  # bytes/s, used until a sync has been measured
+
+
+class RunPlan(NamedTuple):
+    """Upload footprint of one offline run."""
+
+    name: str
+    path: str
+    run_id: str
+    records: int | None
+    wandb_bytes: int
+    media_bytes: int
+    total_bytes: int
+
+
+def scan_run(run_dir: Path, count_records: bool = True) -> RunPlan:
+    """Measure one offline run without uploading anything.
+
+    records is None if the .wandb file is missing/unreadable or count_records is False.
+    """
+    wandb_file = find_wandb_file(run_dir)
+    records = None
+    if count_records and wandb_file is not None:
+        try:
+            records = sum(1 for _ in iter_records(wandb_file))
+        except (RecordFormatError, OSError):
+            records = None
+    media_dir = run_dir / "files" / "media"
+    return RunPlan(
+        name=run_dir.name,
+        path=str(run_dir),
+        run_id=offline_run_id(run_dir),
+        records=records,
+        wandb_bytes=wandb_file.stat().st_size if wandb_file is not None else 0,
+        media_bytes=dir_size(media_dir) if media_dir.is_dir() else 0,
+        total_bytes=dir_size(run_dir),
+    )
+
+
+def plan_runs(offline_runs: list, count_records: bool = True) -> list:
+    """Scan offline_runs and return RunPlans sorted largest first."""
+    plans = [scan_run(run_dir, count_records) for run_dir in offline_runs]
+    return sorted(plans, key=lambda p: (-p.total_bytes, p.name))
+
+
+def estimate_seconds(sizes: list, throughput: float, workers: int = 1) -> float:
+    """Estimated wall time to upload runs of the given sizes.
+
+    With several workers, runs are assigned largest first to the least loaded
+    worker, which is how sync --parallel schedules them.
+    """
+    if not sizes:
+        return 0.0
+    loads = [0.0] * max(1, workers)
+    for size in sorted(sizes, reverse=True):
+        heapq.heapreplace(loads, loads[0] + size / throughput)
+    return max(loads)
@@ -0,0 +1,153 @@
+"""Profiling for the global --profile option.
+
+A Profiler records a cProfile of every thread (stage executor and download
+threads included) plus a wall-clock breakdown. The breakdown comes from
+timed() blocks around the places where the tool waits rather than works:
+child kaggle/wandb processes, sleeps between polls, and in-process network
+calls (W&B API, Discord). timed() costs one global lookup when profiling is
+off.
+"""
+
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import NamedTuple
+
+
+CATEGORIES = ("child", "sleep", "network")
+
+# Built-in calls that block rather than compute; left out of the hotspot list.
+_BLOCKING = (
+    "sleep", "poll", "select", "wait", "acquire", "read", "readline", "readinto",
+    "recv", "recv_into", "accept", "connect", "waitpid", "get",
+)
+_BUILTIN_NAME = re.compile(r"<(?:built-in method|method) '?([\w.]+)")
+
+_active = None  # the running Profiler, if any
+
+
+@contextmanager
+def timed(category: str):
+    """Add the wall time of the block to category while a Profiler is running."""
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add(category, time.perf_counter() - start)
+
+
+class ProfileReport(NamedTuple):
+    """Wall-clock breakdown of one profiled command; waits are summed over threads."""
+
+    command: str
+    wall: float
+    cpu: float  # this process, all threads (user + system)
+    child_cpu: float  # CPU used by child processes that have exited
+    child: float  # wall time waiting on child processes
+    sleep: float
+    network: float
+    stats: pstats.Stats
+
+
+class Profiler:
+    """cProfile every thread and account wall time by category."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = dict.fromkeys(CATEGORIES, 0.0)
+        self._profiles = []
+
+    def add(self, category: str, seconds: float) -> None:
+        with self._lock:
+            self._totals[category] += seconds
+
+    def _thread_hook(self, frame, event, arg):
+        # Runs on the first profile event of each new thread; enabling a
+        # cProfile.Profile there replaces this hook for the rest of the thread.
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def start(self) -> "Profiler":
+        global _active
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._child_cpu = _children_cpu()
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        # Before 3.12, cProfile only sees the thread that enabled it, so every
+        # new thread gets its own profiler; from 3.12 one profiler sees all.
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._thread_hook)
+        profile.enable()
+        _active = self
+        return self
+
+    def stop(self, command: str = "") -> ProfileReport:
+        global _active
+        _active = None
+        self._profiles[0].disable()
+        threading.setprofile(None)
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        child_cpu = _children_cpu() - self._child_cpu
+
+        with self._lock:
+            profiles = list(self._profiles)
+            totals = dict(self._totals)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            try:
+                stats.add(profile)
+            except TypeError:
+                pass  # thread started but never recorded a call
+        return ProfileReport(command, wall, cpu, child_cpu, totals["child"], totals["sleep"], totals["network"], stats)
+
+
+def _children_cpu() -> float:
+    t = os.times()
+    return t.children_user + t.children_system
+
+
+def hotspots(stats: pstats.Stats, limit: int = 15) -> list:
+    """Top functions by own time as (calls, tottime, cumtime, 'file:line(func)'), blocking built-ins excluded."""
+    rows = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        if filename == "~":
+            m = _BUILTIN_NAME.match(func)
+            if m and m.group(1).rsplit(".", 1)[-1] in _BLOCKING:
+                continue
+        where = func if filename == "~" else f"{os.path.basename(filename)}:{line}({func})"
+        rows.append((calls, tottime, cumtime, where))
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return rows[:limit]
+
+
+def format_report(report: ProfileReport, path: str | None = None, limit: int = 15) -> str:
+    """Render the breakdown and hotspot table printed at exit."""
+    lines = [
+        f"Profile of '{report.command}': {report.wall:.2f}s wall",
+        f"  self CPU       {report.cpu:8.2f}s  (this process, all threads)",
+        f"  child process  {report.child:8.2f}s  waiting on kaggle/wandb ({report.child_cpu:.2f}s child CPU)",
+        f"  sleep          {report.sleep:8.2f}s",
+        f"  network        {report.network:8.2f}s  (W&B API, Discord)",
+        "  Waits are summed over threads, so concurrent stages can add up to more than wall time.",
+        "",
+        f"Top {limit} functions by own time:",
+        f"  {'CALLS':>8}  {'OWN':>8}  {'CUM':>8}  FUNCTION",
+    ]
+    for calls, tottime, cumtime, where in hotspots(report.stats, limit):
+        lines.append(f"  {calls:>8}  {tottime:>7.3f}s  {cumtime:>7.3f}s  {where}")
+    if path:
+        lines.append(f"\ncProfile dump: {path}  (python -m pstats {path})")
+    return "\n".join(lines)
@@ -0,0 +1,136 @@
+"""Reader/writer for the .wandb record stream inside offline-run-* directories.
+
+A .wandb file is a LevelDB-style log: a 7-byte file header (":W&B", magic,
+version) followed by 32 KiB blocks of chunks. Each chunk has a 7-byte header
+(crc32, length, type) and large records are split into FIRST/MIDDLE/LAST
+chunks. The payload of each record is a serialized wandb Record protobuf.
+"""
+
+import struct
+import zlib
+from pathlib import Path
+
+
+HEADER_IDENT = b":W&B"
+HEADER_MAGIC = 0xBEE1
+HEADER_LEN = 7
+BLOCK_LEN = 32768
+DATA_LEN = BLOCK_LEN - HEADER_LEN
+
+FULL, FIRST, MIDDLE, LAST = 1, 2, 3, 4
+
+_TYPE_CRC = {t: zlib.crc32(bytes([t])) & 0xFFFFFFFF for t in (FULL, FIRST, MIDDLE, LAST)}
+
+
+class RecordFormatError(ValueError):
+    """Raised when a .wandb file is not a valid record stream."""
+
+
+def find_wandb_file(run_dir: Path) -> Path | None:
+    """Return the run-<id>.wandb file of an offline-run directory, if any."""
+    return next(iter(sorted(run_dir.glob("run-*.wandb"))), None)
+
+
+def read_header(fp) -> int:
+    """Read and validate the file header; return the format version."""
+    header = fp.read(HEADER_LEN)
+    if len(header) != HEADER_LEN:
+        raise RecordFormatError("file is too short to be a .wandb record stream")
+    ident, magic, version = struct.unpack("<4sHB", header)
+    if ident != HEADER_IDENT or magic != HEADER_MAGIC:
+        raise RecordFormatError("not a .wandb record stream (bad header)")
+    return version
+
+
+def iter_records(path: Path):
+    """Yield the raw payload of each record in a .wandb file, in order.
+
+    A truncated trailing record (e.g. from a killed kernel) ends the stream
+    instead of raising.
+    """
+    with open(path, "rb") as fp:
+        read_header(fp)
+        index = HEADER_LEN
+        pending = None
+        while True:
+            space_left = BLOCK_LEN - index % BLOCK_LEN
+            if space_left < HEADER_LEN:
+                fp.read(space_left)
+                index += space_left
+            header = fp.read(HEADER_LEN)
+            if len(header) < HEADER_LEN:
+                return
+            checksum, length, chunk_type = struct.unpack("<IHB", header)
+            if chunk_type == 0 and length == 0:
+                # zero padding up to the end of the block
+                skip = BLOCK_LEN - (index + HEADER_LEN) % BLOCK_LEN
+                fp.read(skip % BLOCK_LEN)
+                index += HEADER_LEN + skip % BLOCK_LEN
+                continue
+            data = fp.read(length)
+            index += HEADER_LEN + length
+            if len(data) < length:
+                return
+            if chunk_type not in _TYPE_CRC:
+                raise RecordFormatError(f"unknown chunk type {chunk_type} at offset {index}")
+            if zlib.crc32(data, _TYPE_CRC[chunk_type]) & 0xFFFFFFFF != checksum:
+                raise RecordFormatError(f"checksum mismatch at offset {index}")
+
+            if chunk_type == FULL:
+                yield data
+            elif chunk_type == FIRST:
+                pending = [data]
+            elif pending is not None:
+                pending.append(data)
+                if chunk_type == LAST:
+                    yield b"".join(pending)
+                    pending = None
+
+
+class RecordWriter:
+    """Write payloads as a .wandb record stream (same framing wandb uses)."""
+
+    def __init__(self, path: Path, version: int = 0):
+        self._fp = open(path, "wb")
+        self._fp.write(struct.pack("<4sHB", HEADER_IDENT, HEADER_MAGIC, version))
+        self._index = HEADER_LEN
+
+    def _write_chunk(self, data: bytes, chunk_type: int) -> None:
+        checksum = zlib.crc32(data, _TYPE_CRC[chunk_type]) & 0xFFFFFFFF
+        self._fp.write(struct.pack("<IHB", checksum, len(data), chunk_type))
+        self._fp.write(data)
+        self._index += HEADER_LEN + len(data)
+
+    def write(self, data: bytes) -> None:
+        space_left = BLOCK_LEN - self._index % BLOCK_LEN
+        if space_left < HEADER_LEN:
+            self._fp.write(b"\x00" * space_left)
+            self._index += space_left
+            space_left = BLOCK_LEN
+
+        if len(data) + HEADER_LEN <= space_left:
+            self._write_chunk(data, FULL)
+            return
+
+        used = space_left - HEADER_LEN
+        self._write_chunk(data[:used], FIRST)
+        while len(data) - used > DATA_LEN:
+            self._write_chunk(data[used:used + DATA_LEN], MIDDLE)
+            used += DATA_LEN
+        self._write_chunk(data[used:], LAST)
+
+    def close(self) -> None:
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_record(data: bytes):
+    """Decode one payload into a wandb Record protobuf."""
+    from wandb.proto import wandb_internal_pb2
+
+    return wandb_internal_pb2.Record.FromString(data)
@@ -0,0 +1,152 @@
+"""Discover the W&B runs in a kernel's output and update their summaries in one batch."""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from kaggle_wandb_sync._profile import timed
+from kaggle_wandb_sync._records import RecordFormatError, find_wandb_file, iter_records, parse_record
+from kaggle_wandb_sync._utils import is_not_found, offline_run_id
+
+
+TARGET_KEYS = ("group", "job_type", "tag")
+
+
+class RunInfo(NamedTuple):
+    """Identity and grouping of one offline run found in an output directory."""
+
+    path: str  # entity/project/run_id, or project/run_id if the entity was left to the default
+    run_id: str
+    group: str
+    job_type: str
+    tags: tuple
+    directory: str
+
+
+def _from_run_record(run_dir: Path) -> RunInfo | None:
+    wandb_file = find_wandb_file(run_dir)
+    if wandb_file is None:
+        return None
+    try:
+        for data in iter_records(wandb_file):
+            record = parse_record(data)
+            if record.WhichOneof("record_type") == "run":
+                run = record.run
+                project = run.project or "uncategorized"
+                run_id = run.run_id or offline_run_id(run_dir)
+                path = "/".join(filter(None, [run.entity, project, run_id]))
+                return RunInfo(path, run_id, run.run_group, run.job_type, tuple(run.tags), str(run_dir))
+    except (RecordFormatError, OSError):
+        return None
+    return None
+
+
+def _read_metadata(run_dir: Path) -> dict:
+    metadata_path = next(run_dir.rglob("wandb-metadata.json"), None)
+    if metadata_path is None:
+        return {}
+    try:
+        meta = json.loads(metadata_path.read_text())
+    except (json.JSONDecodeError, ValueError, OSError):
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
+def _from_metadata(run_dir: Path) -> RunInfo | None:
+    meta = _read_metadata(run_dir)
+    entity, project, run_id = meta.get("entity", ""), meta.get("project", ""), meta.get("run_id", "")
+    if not (entity and project and run_id):
+        return None
+    return RunInfo(f"{entity}/{project}/{run_id}", run_id, meta.get("group", ""),
+                   meta.get("job_type", ""), tuple(meta.get("tags", ())), str(run_dir))
+
+
+def discover_runs(output_dir) -> list:
+    """Return a RunInfo for every offline-run-* in output_dir, oldest first.
+
+    Identity is read from the run record in the .wandb stream, falling back
+    to files/wandb-metadata.json. Runs with neither are left out. Offline
+    runs usually have no entity in their run record; wandb-metadata.json's
+    is used then, if it has one.
+    """
+    run_dirs = sorted(
+        (p for p in Path(output_dir).rglob("offline-run-*") if p.is_dir()),
+        key=lambda p: p.name,
+    )
+    runs = []
+    for run_dir in run_dirs:
+        info = _from_run_record(run_dir)
+        if info is not None and info.path.count("/") == 1:
+            entity = _read_metadata(run_dir).get("entity", "")
+            if entity:
+                info = info._replace(path=f"{entity}/{info.path}")
+        info = info or _from_metadata(run_dir)
+        if info is not None:
+            runs.append(info)
+    return runs
+
+
+def parse_target(rule: str) -> tuple:
+    """Validate a target rule: all, latest, group=NAME, job_type=NAME or tag=NAME."""
+    if rule in ("all", "latest"):
+        return rule, None
+    key, sep, value = rule.partition("=")
+    if not sep or key not in TARGET_KEYS or not value:
+        raise ValueError(f"invalid target {rule!r}: use all, latest, group=NAME, job_type=NAME or tag=NAME")
+    return key, value
+
+
+def select_runs(runs: list, rules=("all",)) -> list:
+    """Return the runs matching every rule (rules are ANDed)."""
+    selected = list(runs)
+    for rule in rules:
+        key, value = parse_target(rule)
+        if key == "latest":
+            selected = selected[-1:]
+        elif key == "group":
+            selected = [r for r in selected if r.group == value]
+        elif key == "job_type":
+            selected = [r for r in selected if r.job_type == value]
+        elif key == "tag":
+            selected = [r for r in selected if value in r.tags]
+    return selected
+
+
+def update_summaries(
+    run_paths: list,
+    updates: dict,
+    api=None,
+    max_workers: int = 8,
+    retries: int = 3,
+    backoff: float = 1.0,
+) -> dict:
+    """Apply the same summary updates to several runs through one wandb.Api().
+
+    Runs are written concurrently; each is retried up to ``retries`` times with
+    exponential backoff, except when the run does not exist. Returns
+    {run_path: None on success or the last error}.
+    """
+    if api is None:
+        import wandb
+
+        with timed("network"):
+            api = wandb.Api()
+
+    def update(run_path):
+        for attempt in range(retries + 1):
+            try:
+                with timed("network"):
+                    api.run(run_path).summary.update(updates)
+                return None
+            except Exception as e:
+                if attempt == retries or is_not_found(e):
+                    return e
+                with timed("sleep"):
+                    time.sleep(backoff * 2 ** attempt)
+
+    if not run_paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(run_paths))) as pool:
+        return dict(zip(run_paths, pool.map(update, run_paths)))
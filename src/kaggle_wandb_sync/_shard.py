@@ -0,0 +1,48 @@
+"""Deterministic, balanced assignment of notebooks to CI shards (run --shard)."""
+
+import heapq
+from pathlib import Path
+
+from kaggle_wandb_sync._history import average_duration
+from kaggle_wandb_sync._utils import dir_size
+
+
+def parse_shard(value: str) -> tuple:
+    """Parse 'I/N' (1-based, 1 <= I <= N) into (I, N)."""
+    index, sep, count = value.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index = count = 0
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise ValueError(f"invalid shard {value!r}: use I/N with 1 <= I <= N (e.g. 2/4)")
+    return index, count
+
+
+def notebook_weights(notebooks: dict) -> tuple:
+    """Weigh {kernel_id: directory} for balancing; returns (weights, basis).
+
+    If every kernel has successful runs in the history index, the weight is
+    its mean run duration (basis "history"); otherwise every notebook is
+    weighed by its directory size (basis "size"), so all weights share a unit.
+    """
+    durations = {kernel_id: average_duration(kernel_id) for kernel_id in notebooks}
+    if durations and all(d is not None for d in durations.values()):
+        return durations, "history"
+    return {kernel_id: dir_size(Path(d)) for kernel_id, d in notebooks.items()}, "size"
+
+
+def assign_shards(weights: dict, count: int) -> list:
+    """Split the keys of weights into count lists of roughly equal total weight.
+
+    Longest-processing-time first: the heaviest remaining key goes to the
+    currently lightest shard. Ties break on key and shard index, so every
+    shard that sees the same weights computes the same split.
+    """
+    shards = [[] for _ in range(count)]
+    heap = [(0.0, i) for i in range(count)]
+    for key in sorted(weights, key=lambda k: (-weights[k], k)):
+        load, i = heapq.heappop(heap)
+        shards[i].append(key)
+        heapq.heappush(heap, (load + weights[key], i))
+    return [sorted(s) for s in shards]
@@ -0,0 +1,157 @@
+"""Disk budget and bandwidth cap shared by concurrent kernel output downloads.
+
+Each download goes into a fresh staging directory inside its target, so
+everything under it was written by that download: its size is the bytes
+transferred even when the files replace earlier ones, and an aborted
+download is undone by deleting it.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from kaggle_wandb_sync._utils import dir_size
+
+
+class TransferMonitor:
+    """Tracks bytes written by in-flight downloads against a disk budget and a rate cap.
+
+    A background thread samples the staging directories every interval
+    seconds (each sample walks them, so it is kept coarse). When the total
+    would exceed max_bytes, every in-flight download is cancelled and no new
+    one may start. When more than max_rate bytes/s have been written on
+    average, all downloads are paused until the average falls back under it.
+    """
+
+    def __init__(self, max_bytes: int | None, max_rate: float | None, interval: float = 1.0):
+        self.max_bytes = max_bytes
+        self.max_rate = max_rate
+        self.interval = interval
+        self.pause = threading.Event()
+        self.exceeded = False
+        self._lock = threading.Lock()
+        self._active = {}  # staging path -> cancel event
+        self._done_bytes = 0
+        self._start = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def __enter__(self):
+        if self.max_bytes is not None or self.max_rate is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self.pause.clear()
+
+    def begin(self, path: Path) -> threading.Event | None:
+        """Register a download into the (new, empty) staging path.
+
+        Returns its cancel event, or None if over budget. The path identifies
+        the download in end().
+        """
+        written = self._written()
+        with self._lock:
+            if self.max_bytes is not None and written >= self.max_bytes:
+                self.exceeded = True
+            if self.exceeded:
+                return None
+            cancel = threading.Event()
+            self._active[path] = cancel
+            return cancel
+
+    def end(self, path: Path) -> int:
+        """Unregister the download into path and return the bytes it wrote."""
+        with self._lock:
+            del self._active[path]
+            written = dir_size(path)
+            self._done_bytes += written
+            return written
+
+    def _written(self) -> int:
+        with self._lock:
+            active = list(self._active)
+            done = self._done_bytes
+        return done + sum(dir_size(path) for path in active)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            written = self._written()
+            if self.max_bytes is not None and written > self.max_bytes:
+                with self._lock:
+                    self.exceeded = True
+                    for cancel in self._active.values():
+                        cancel.set()
+                self.pause.clear()
+            if self.max_rate is not None:
+                allowed = self.max_rate * (time.monotonic() - self._start)
+                if written > allowed:
+                    self.pause.set()
+                else:
+                    self.pause.clear()
+
+
+STAGING_PREFIX = ".kaggle-wandb-sync-download-"
+
+
+_in_use = set()  # staging dirs of this process's downloads
+_in_use_lock = threading.Lock()
+
+
+def _owner_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return False  # ours but not in _in_use: left by an earlier download
+    if os.name == "nt":
+        return True  # os.kill would terminate it; keep the dir to be safe
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by another user
+    return True
+
+
+def make_staging_dir(target: Path) -> Path:
+    """Create an empty staging directory inside target and mark it in use.
+
+    Staging dirs left by an interrupted run are removed first; those of
+    downloads still running, in this or another live process, are kept.
+    Call release_staging_dir when done.
+    """
+    with _in_use_lock:
+        for stale in target.glob(f"{STAGING_PREFIX}*"):
+            pid = stale.name[len(STAGING_PREFIX):].partition("-")[0]
+            if stale in _in_use or (pid.isdigit() and _owner_alive(int(pid))):
+                continue
+            shutil.rmtree(stale, ignore_errors=True)
+        staging = Path(tempfile.mkdtemp(prefix=f"{STAGING_PREFIX}{os.getpid()}-", dir=target))
+        _in_use.add(staging)
+    return staging
+
+
+def release_staging_dir(staging: Path) -> None:
+    """Delete staging (if still there) and unmark it."""
+    shutil.rmtree(staging, ignore_errors=True)
+    with _in_use_lock:
+        _in_use.discard(staging)
+
+
+def move_into(staging: Path, target: Path) -> int:
+    """Move every file under staging to the same place under target, then release staging.
+
+    Existing files are replaced. Returns the number of files moved.
+    """
+    moved = 0
+    for root, _, names in os.walk(staging):
+        dest_dir = target / Path(root).relative_to(staging)
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        for name in names:
+            os.replace(os.path.join(root, name), dest_dir / name)
+            moved += 1
+    release_staging_dir(staging)
+    return moved
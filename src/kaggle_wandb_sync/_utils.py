@@ -1,19 +1,46 @@
 """Shared utilities for kaggle-wandb-sync."""
 
+import asyncio
+import codecs
 import json
+import locale
+import math
 import os
 import re
 import shutil
+import signal
 import subprocess
+import sys
 import sysconfig
 import tempfile
+import threading
+import time
 import urllib.request
+from collections import deque
 from pathlib import Path
+from typing import NamedTuple
+
+from kaggle_wandb_sync._profile import timed
 
 
 TERMINAL_STATUSES = ("COMPLETE", "ERROR", "CANCEL")
 
 
+_NEWLINE = re.compile(r"\r\n|\r|\n")
+
+# Suspending a child (used for bandwidth caps) needs SIGSTOP/SIGCONT.
+CAN_PAUSE = hasattr(signal, "SIGSTOP")
+
+
+class StreamResult(NamedTuple):
+    """Outcome of run_streaming: exit code plus the last few output lines."""
+
+    returncode: int
+    tail: list
+    timed_out: bool = False
+    cancelled: bool = False
+
+
 def notify_discord(message: str) -> None:
     """Send a message to Discord via DISCORD_WEBHOOK_URL env var. No-op if not set."""
     url = os.environ.get("DISCORD_WEBHOOK_URL", "")
@@ -22,7 +49,8 @@ def notify_discord(message: str) -> None:
     try:
         data = json.dumps({"content": message}).encode()
         req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
-        urllib.request.urlopen(req, timeout=10)
+        with timed("network"):
+            urllib.request.urlopen(req, timeout=10)
     except Exception:
         pass  # notifications are best-effort
 
@@ -72,62 +100,232 @@ def find_wandb() -> str | None:
     return None
 
 
+def run_streaming(
+    cmd: list,
+    prefix: str = "",
+    timeout: float | None = None,
+    cancel_event: threading.Event | None = None,
+    tail_lines: int = 30,
+    echo: bool = True,
+    pause_event: threading.Event | None = None,
+    rewrite=None,
+) -> StreamResult:
+    """Run cmd and echo its stdout/stderr line by line as it arrives.
+
+    Blocking wrapper around run_streaming_async; see there for the options.
+    """
+    return asyncio.run(run_streaming_async(cmd, prefix, timeout, cancel_event, tail_lines, echo, pause_event, rewrite))
+
+
+async def run_streaming_async(
+    cmd: list,
+    prefix: str = "",
+    timeout: float | None = None,
+    cancel_event: threading.Event | None = None,
+    tail_lines: int = 30,
+    echo: bool = True,
+    pause_event: threading.Event | None = None,
+    rewrite=None,
+) -> StreamResult:
+    """Run cmd and echo its stdout/stderr line by line as it arrives.
+
+    Each echoed line is prefixed with ``prefix``; stderr lines are echoed to
+    stderr. Only the last ``tail_lines`` lines of both streams are kept in
+    memory (stderr lines labelled "[stderr] "), so long-running uploads
+    don't accumulate their whole output. If the child fails, the tail is
+    echoed again as one block, since live output of parallel children is
+    interleaved. The child is killed if ``timeout`` seconds elapse or
+    ``cancel_event`` is set. While ``pause_event`` is set the child is
+    suspended (SIGSTOP/SIGCONT; POSIX only, see CAN_PAUSE). The events are
+    plain threading.Events so other threads can drive them. A child killed
+    by signal N reports returncode 128 + N, as a shell would. ``rewrite``,
+    if given, maps each line before it is echoed or kept.
+    """
+    with timed("child"):
+        return await _run_streaming(cmd, prefix, timeout, cancel_event, tail_lines, echo, pause_event, rewrite)
+
+
+async def _run_streaming(cmd, prefix, timeout, cancel_event, tail_lines, echo, pause_event, rewrite) -> StreamResult:
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    tail = deque(maxlen=tail_lines)
+    state = {"timed_out": False, "cancelled": False}
+
+    async def watchdog():
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        paused = False
+        while True:
+            await asyncio.sleep(0.1)
+            if cancel_event is not None and cancel_event.is_set():
+                state["cancelled"] = True
+            elif deadline is not None and time.monotonic() >= deadline:
+                state["timed_out"] = True
+            else:
+                if CAN_PAUSE and pause_event is not None and pause_event.is_set() != paused:
+                    paused = not paused
+                    try:
+                        proc.send_signal(signal.SIGSTOP if paused else signal.SIGCONT)
+                    except ProcessLookupError:
+                        pass
+                continue
+            _kill(proc)
+            return
+
+    async def pump(stream, is_stderr):
+        def emit(line):
+            if rewrite is not None:
+                line = rewrite(line)
+            tail.append(f"[stderr] {line}" if is_stderr else line)
+            if echo:
+                print(f"{prefix}{line}", file=sys.stderr if is_stderr else sys.stdout, flush=True)
+
+        # Decode like a text-mode pipe: locale encoding, universal newlines.
+        decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors="replace")
+        buffer = ""
+        while True:
+            chunk = await stream.read(65536)
+            buffer += decoder.decode(chunk, final=not chunk)
+            lines = _NEWLINE.split(buffer)
+            # a trailing "\r" may be the first half of "\r\n": wait for more data
+            keep = 2 if chunk and buffer.endswith("\r") else 1
+            for line in lines[:-keep]:
+                emit(line)
+            buffer = "\r".join(lines[-keep:]) if keep == 2 else lines[-1]
+            if not chunk:
+                break
+        if buffer:
+            emit(buffer)
+
+    watcher = None
+    if timeout is not None or cancel_event is not None or pause_event is not None:
+        watcher = asyncio.ensure_future(watchdog())
+
+    try:
+        await asyncio.gather(pump(proc.stdout, False), pump(proc.stderr, True))
+    except BaseException:
+        _kill(proc)
+        raise
+    finally:
+        returncode = await proc.wait()
+        if watcher is not None:
+            watcher.cancel()
+
+    if returncode < 0:
+        returncode = 128 - returncode  # killed by signal -returncode
+    if echo and returncode != 0 and tail and not state["cancelled"]:
+        print(f"{prefix}Exited with code {returncode}; last {len(tail)} line(s) of output:", file=sys.stderr, flush=True)
+        for line in tail:
+            print(f"{prefix}  {line}", file=sys.stderr, flush=True)
+    return StreamResult(returncode, list(tail), state["timed_out"], state["cancelled"])
+
+
+def _kill(proc) -> None:
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass
+
+
 def parse_kernel_status(raw: str) -> str:
     """Parse kernel status from 'has status "KernelWorkerStatus.COMPLETE"' format."""
     m = re.search(r'has status "([^"]+)"', raw)
     return m.group(1) if m else ""
 
 
+def parse_pushed_version(raw: str) -> int | None:
+    """Parse the version number from 'Kernel version 3 successfully pushed' output."""
+    m = re.search(r'[Kk]ernel version (\d+)', raw)
+    return int(m.group(1)) if m else None
+
+
+def offline_run_id(run_dir: Path) -> str:
+    """Return the W&B run ID from an offline-run-YYYYMMDD_HHMMSS-<id> directory name."""
+    return run_dir.name.rsplit("-", 1)[-1]
+
+
+def dir_size(path: Path) -> int:
+    """Total size in bytes of all files under path."""
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def format_bytes(n: float) -> str:
+    """Human-readable byte count (e.g. '1.5 MB')."""
+    if n < 0:
+        return "-" + format_bytes(-n)
+    units = ("B", "KB", "MB", "GB", "TB")
+    exp = min(int(math.log(n, 1024)), len(units) - 1) if n >= 1 else 0
+    if exp == 0:
+        return f"{n:.0f} B"
+    return f"{n / 1024 ** exp:.1f} {units[exp]}"
+
+
 def is_terminal(status: str) -> bool:
     """Return True if the status is a terminal state (complete/error/cancel)."""
     upper = status.upper()
     return any(s in upper for s in TERMINAL_STATUSES)
 
 
+def is_not_found(error: BaseException) -> bool:
+    """Whether a wandb.Api() error means the run, artifact or project does not exist.
+
+    wandb raises ValueError ("... not found ...", "Could not find run ...")
+    for these, wrapped in a CommError whose exc is the original error; HTTP
+    failures are wrapped the same way, so a 404 counts too.
+    """
+    cause = getattr(error, "exc", None) or error
+    if getattr(getattr(cause, "response", None), "status_code", None) == 404:
+        return True
+    message = str(cause).lower()
+    return isinstance(cause, ValueError) and ("not found" in message or "could not find" in message)
+
+
 def get_kernel_status(kaggle_cmd: str, kernel_id: str) -> str:
     """Run kaggle kernels status and return parsed status string."""
-    result = subprocess.run(
-        [kaggle_cmd, "kernels", "status", kernel_id],
-        capture_output=True,
-        text=True,
-    )
+    with timed("child"):
+        result = subprocess.run(
+            [kaggle_cmd, "kernels", "status", kernel_id],
+            capture_output=True,
+            text=True,
+        )
     raw = result.stdout + result.stderr
     return parse_kernel_status(raw)
 
 
-def wait_and_record_score(
-    kaggle_cmd: str,
-    competition_slug: str,
-    output_dir: str,
-    poll_interval: int = 30,
-    max_attempts: int = 240,
-) -> None:
-    """Poll Kaggle submissions until a new scored entry appears, then record to W&B.
-
-    Waits up to max_attempts * poll_interval seconds (default 2 hours).
-    Reads W&B entity/project/run_id from wandb-metadata.json in output_dir.
-    """
-    import time
-
-    print(f"Waiting for a new submission to '{competition_slug}' ...")
-    print("Please submit via browser now. This step will wait up to 2 hours.")
-    notify_discord(f"⚡ **W&B sync完了！ブラウザで提出してください**\nCompetition: `{competition_slug}`")
-
-    def get_submissions():
+def get_submissions(kaggle_cmd: str, competition_slug: str) -> list:
+    """Return the CSV rows (without header) of 'kaggle competitions submissions list'."""
+    with timed("child"):
         result = subprocess.run(
             [kaggle_cmd, "competitions", "submissions", "list",
              "-c", competition_slug, "--csv"],
             capture_output=True, text=True,
         )
-        return [l for l in result.stdout.splitlines() if l.strip()][1:]  # skip header
+    return [l for l in result.stdout.splitlines() if l.strip()][1:]  # skip header
+
 
-    before_count = len(get_submissions())
-    print(f"Current submission count: {before_count}")
+def wait_for_new_score(
+    kaggle_cmd: str,
+    competition_slug: str,
+    before_count: int,
+    poll_interval: int = 30,
+    max_attempts: int = 240,
+    cancel_event: threading.Event | None = None,
+    echo: bool = True,
+) -> str | None:
+    """Poll submissions until there are more than before_count and one is scored.
 
-    score = None
+    Returns the public score string, or None after max_attempts polls or
+    once cancel_event is set. With echo, each attempt is reported.
+    """
     for i in range(1, max_attempts + 1):
-        time.sleep(poll_interval)
-        lines = get_submissions()
+        with timed("sleep"):
+            if cancel_event is None:
+                time.sleep(poll_interval)
+            elif cancel_event.wait(poll_interval):
+                return None
+        lines = get_submissions(kaggle_cmd, competition_slug)
         if len(lines) > before_count:
             for line in lines:
                 parts = line.split(",")
@@ -135,49 +333,12 @@ def wait_and_record_score(
                     status = parts[3].strip().lower()
                     pub_score = parts[4].strip()
                     if status == "complete" and pub_score not in ("", "None", "none"):
-                        score = pub_score
-                        break
-            if score:
-                print(f"New submission detected! publicScore={score}")
-                break
-        print(f"Attempt {i}/{max_attempts}: waiting for submission...")
-
-    if not score:
-        print("No new scored submission detected. Skipping W&B score recording.")
-        return
-
-    metadata_path = next(Path(output_dir).rglob("wandb-metadata.json"), None)
-    if not metadata_path:
-        print("No wandb-metadata.json found. Skipping W&B recording.")
-        return
-
-    try:
-        meta = json.loads(metadata_path.read_text())
-    except (json.JSONDecodeError, ValueError) as e:
-        print(f"Failed to parse wandb-metadata.json: {e}")
-        return
-    entity = meta.get("entity", "")
-    project = meta.get("project", "")
-    run_id = meta.get("run_id", "")
-    if not (entity and project and run_id):
-        print(f"Incomplete W&B metadata: {meta}. Skipping.")
-        return
-
-    run_path = f"{entity}/{project}/{run_id}"
-    print(f"Recording to W&B run: {run_path}")
-    try:
-        import wandb
-        api = wandb.Api()
-        run = api.run(run_path)
-        run.summary.update({"submitted": True, "kaggle_score": float(score)})
-        print(f"  kaggle_score = {score}")
-        print(f"  submitted = True")
-        notify_discord(
-            f"✅ **スコア記録完了！**\nCompetition: `{competition_slug}`\n"
-            f"Score: `{score}`\nW&B: https://wandb.ai/{run_path}"
-        )
-    except Exception as e:
-        print(f"Error recording to W&B: {e}")
+                        if echo:
+                            print(f"New submission detected! publicScore={pub_score}")
+                        return pub_score
+        if echo:
+            print(f"Attempt {i}/{max_attempts}: waiting for submission...")
+    return None
 
 
 def show_kernel_diagnostics(kaggle_cmd: str, kernel_id: str) -> None:
@@ -188,10 +349,7 @@ def show_kernel_diagnostics(kaggle_cmd: str, kernel_id: str) -> None:
     """
     slug = kernel_id.split("/")[-1]
     with tempfile.TemporaryDirectory() as tmpdir:
-        subprocess.run(
-            [kaggle_cmd, "kernels", "output", kernel_id, "-p", tmpdir],
-            capture_output=True,
-        )
+        run_streaming([kaggle_cmd, "kernels", "output", kernel_id, "-p", tmpdir], echo=False)
         log_file = Path(tmpdir) / f"{slug}.log"
         if not log_file.exists():
             print("(no kernel log found)")
@@ -0,0 +1,755 @@
+"""Async Python API for driving the pipeline without the CLI.
+
+Every step of the CLI is a coroutine on Client, so an orchestrator can push,
+poll, download and sync many kernels from one event loop:
+
+    import asyncio
+    from kaggle_wandb_sync.api import Client
+
+    async def pipeline(client, directory, output_dir):
+        pushed = await client.push(directory)
+        polled = await client.poll(pushed.kernel_id)
+        if polled.ok:
+            await client.download(pushed.kernel_id, output_dir)
+            await client.sync(output_dir, kernel_id=pushed.kernel_id)
+
+    async def main(dirs):
+        client = Client()
+        await asyncio.gather(*(pipeline(client, d, f"out/{d}") for d in dirs))
+
+    asyncio.run(main(["nb1", "nb2"]))
+
+Client.pipeline does the same as the run command: every step of every
+kernel as a stage of one dependency-aware executor, with the competition
+submission steps and a per-stage StageResult for each.
+
+The kaggle/wandb CLIs still do the transfers, but as asyncio subprocesses:
+waiting on hundreds of kernels costs one event loop, not one process or
+thread per kernel. Methods return NamedTuple results; problems that stop a
+step before it starts (missing kernel-metadata.json, CLI not installed, no
+offline runs) raise KaggleWandbSyncError. The click commands are thin
+wrappers over this module.
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from kaggle_wandb_sync._artifacts import log_output_artifact, select_files
+from kaggle_wandb_sync._compact import compact_runs
+from kaggle_wandb_sync._dag import Stage, run_stages_async
+from kaggle_wandb_sync._history import record_event
+from kaggle_wandb_sync._plan import plan_runs
+from kaggle_wandb_sync._profile import timed
+from kaggle_wandb_sync._runs import discover_runs, select_runs, update_summaries
+from kaggle_wandb_sync._transfer import TransferMonitor, make_staging_dir, move_into, release_staging_dir
+from kaggle_wandb_sync._utils import (
+    CAN_PAUSE, dir_size, find_kaggle, find_wandb, format_bytes, get_submissions, is_terminal, normalize_path,
+    notify_discord, offline_run_id, parse_kernel_status, parse_pushed_version, run_streaming_async,
+    show_kernel_diagnostics, wait_for_new_score,
+)
+
+
+class KaggleWandbSyncError(Exception):
+    """A pipeline step could not start (bad input or missing tool)."""
+
+
+class StageFailed(KaggleWandbSyncError):
+    """A Client.pipeline stage ran but did not succeed; returncode is the exit code to report."""
+
+    def __init__(self, message: str, returncode: int = 1):
+        super().__init__(message)
+        self.returncode = returncode
+
+
+class PushResult(NamedTuple):
+    """Outcome of Client.push."""
+
+    kernel_id: str
+    version: int | None  # None if Kaggle did not report it
+    returncode: int
+    tail: list  # last lines of 'kaggle kernels push' output
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+class PollResult(NamedTuple):
+    """Outcome of Client.poll. status is None if the kernel never finished."""
+
+    kernel_id: str
+    status: str | None
+    attempts: int
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and "COMPLETE" in self.status.upper()
+
+
+class DownloadResult(NamedTuple):
+    """Outcome of downloading one kernel's output: status is OK, FAILED, ABORTED or SKIPPED."""
+
+    kernel_id: str
+    path: str
+    status: str
+    files: int
+    bytes: int
+    seconds: float
+    timed_out: bool = False
+    returncode: int = 0  # of 'kaggle kernels output', when it FAILED
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "OK"
+
+
+class SyncResult(NamedTuple):
+    """Outcome of Client.sync: offline-run-* names that were synced and that failed."""
+
+    synced: list
+    failed: list
+    bytes: int
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+class ScoreResult(NamedTuple):
+    """Outcome of Client.record_score: errors maps run path to the error message."""
+
+    updates: dict
+    updated: list
+    errors: dict
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+class ArtifactResult(NamedTuple):
+    """Outcome of logging one project's output artifact (see Client.log_artifacts)."""
+
+    run_path: str  # entity/project/run_id the artifact was logged from
+    artifact: str  # name:version, or just the name if logging failed
+    files: int
+    uploaded: int  # files that were new or changed since the previous version
+    bytes: int  # size of the uploaded files
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def read_kernel_id(directory) -> str:
+    """Return the id from DIRECTORY/kernel-metadata.json ("" if it has none)."""
+    metadata_path = Path(normalize_path(str(directory))) / "kernel-metadata.json"
+    if not metadata_path.exists():
+        raise KaggleWandbSyncError(f"{metadata_path} not found.")
+    with open(metadata_path) as f:
+        return json.load(f).get("id", "")
+
+
+def kernel_output_dir(output_dir, kernel_id: str) -> str:
+    """output_dir/<user>__<slug>: where a kernel's output goes when several are downloaded together."""
+    return str(Path(str(output_dir)) / kernel_id.replace("/", "__"))
+
+
+def find_offline_runs(output_dir) -> list:
+    """Return the offline-run-* directories under output_dir, sorted by path."""
+    output_path = Path(normalize_path(str(output_dir)))
+    if not output_path.exists():
+        raise KaggleWandbSyncError(f"{output_path} does not exist.")
+    return [p for p in sorted(output_path.rglob("offline-run-*")) if p.is_dir()]
+
+
+class _AnyEvent:
+    """Read-only event that is set while any of the given events is set."""
+
+    def __init__(self, *events):
+        self.events = [e for e in events if e is not None]
+
+    def is_set(self) -> bool:
+        return any(e.is_set() for e in self.events)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.is_set():
+            left = None if deadline is None else deadline - time.monotonic()
+            if left is not None and left <= 0:
+                return False
+            time.sleep(0.1 if left is None else min(0.1, left))
+        return True
+
+
+class Client:
+    """Async client for the push → poll → download → sync → score steps.
+
+    kaggle_cmd/wandb_cmd default to the executables found on PATH. With
+    echo=True, progress and child process output are printed as the CLI
+    does; by default the client is quiet. Setting cancel_event (a
+    threading.Event, so any thread may set it) kills the client's child
+    processes and cuts its waits short. One client can be shared by any
+    number of concurrent tasks.
+    """
+
+    def __init__(
+        self,
+        kaggle_cmd: str | None = None,
+        wandb_cmd: str | None = None,
+        echo: bool = False,
+        cancel_event: threading.Event | None = None,
+    ):
+        self._kaggle_cmd = kaggle_cmd
+        self._wandb_cmd = wandb_cmd
+        self.echo = echo
+        self.cancel_event = cancel_event
+
+    @property
+    def kaggle_cmd(self) -> str:
+        if self._kaggle_cmd is None:
+            self._kaggle_cmd = find_kaggle()
+            if not self._kaggle_cmd:
+                raise KaggleWandbSyncError("kaggle command not found. Run: pip install kaggle")
+        return self._kaggle_cmd
+
+    @property
+    def wandb_cmd(self) -> str:
+        if self._wandb_cmd is None:
+            self._wandb_cmd = find_wandb()
+            if not self._wandb_cmd:
+                raise KaggleWandbSyncError("wandb command not found. Run: pip install wandb")
+        return self._wandb_cmd
+
+    def _log(self, message: str = "", err: bool = False) -> None:
+        if self.echo:
+            print(message, file=sys.stderr if err else sys.stdout, flush=True)
+
+    async def _sleep(self, seconds: float) -> None:
+        """asyncio.sleep that raises KaggleWandbSyncError once cancel_event is set."""
+        with timed("sleep"):
+            if self.cancel_event is None:
+                await asyncio.sleep(seconds)
+                return
+            deadline = time.monotonic() + seconds
+            while not self.cancel_event.is_set() and (left := deadline - time.monotonic()) > 0:
+                await asyncio.sleep(min(left, 0.2))
+        if self.cancel_event.is_set():
+            raise KaggleWandbSyncError("cancelled.")
+
+    async def status(self, kernel_id: str) -> str:
+        """Return the kernel's current status ("" if it could not be read)."""
+        with timed("child"):
+            proc = await asyncio.create_subprocess_exec(
+                self.kaggle_cmd, "kernels", "status", kernel_id,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+            out, _ = await proc.communicate()
+        return parse_kernel_status(out.decode(errors="replace"))
+
+    async def push(self, directory, wait_interval: float = 30, max_wait: int = 20) -> PushResult:
+        """Push the notebook in DIRECTORY (which must contain kernel-metadata.json).
+
+        If the kernel is currently running, waits (up to max_wait checks,
+        wait_interval seconds apart) until it finishes to avoid a 409 conflict.
+        """
+        kernel_id = read_kernel_id(directory)
+        dir_path = Path(normalize_path(str(directory)))
+        kaggle_cmd = self.kaggle_cmd
+
+        for i in range(max_wait):
+            status = await self.status(kernel_id)
+            if not status or is_terminal(status):
+                break
+            self._log(f"  Kernel is {status}, waiting {wait_interval}s... ({i + 1}/{max_wait})")
+            await self._sleep(wait_interval)
+
+        self._log("Pushing to Kaggle...")
+        result = await run_streaming_async(
+            [kaggle_cmd, "kernels", "push", "-p", str(dir_path)], prefix="  ", cancel_event=self.cancel_event, echo=self.echo,
+        )
+        version = parse_pushed_version("\n".join(result.tail)) if result.returncode == 0 else None
+        return PushResult(kernel_id, version, result.returncode, result.tail)
+
+    async def poll(self, kernel_id: str, interval: float = 30, max_attempts: int = 60) -> PollResult:
+        """Check the kernel status every interval seconds until it is COMPLETE, ERROR or CANCEL."""
+        self.kaggle_cmd  # fail before the first wait if kaggle is missing
+        self._log(f"Polling {kernel_id} (interval={interval}s, max={max_attempts} attempts)...")
+
+        start = time.monotonic()
+        for i in range(max_attempts):
+            status = await self.status(kernel_id)
+            self._log(f"  [{i + 1}/{max_attempts}] Status: {status or '(unknown)'}")
+            if is_terminal(status):
+                self._log(f"Kernel finished with status: {status}")
+                result = PollResult(kernel_id, status, i + 1, time.monotonic() - start)
+                await asyncio.to_thread(record_event, "poll", kernel_id=kernel_id, status="OK" if result.ok else "FAILED", duration=result.seconds)
+                return result
+            await self._sleep(interval)
+
+        result = PollResult(kernel_id, None, max_attempts, time.monotonic() - start)
+        await asyncio.to_thread(record_event, "poll", kernel_id=kernel_id, status="FAILED", duration=result.seconds)
+        return result
+
+    async def download(self, kernel_id: str, output_dir, timeout: float | None = None) -> DownloadResult:
+        """Download one kernel's output files into output_dir."""
+        return (await self.download_many([kernel_id], output_dir, timeout=timeout))[0]
+
+    async def download_many(
+        self,
+        kernel_ids: list,
+        output_dir,
+        jobs: int = 4,
+        timeout: float | None = None,
+        max_total_mb: float | None = None,
+        max_mbps: float | None = None,
+    ) -> list:
+        """Download several kernels' outputs, up to jobs at a time.
+
+        With more than one kernel, each gets its own output_dir/<user>__<slug>
+        subdirectory. max_total_mb is a disk budget across all downloads:
+        once exceeded, in-flight downloads are aborted (their partial files
+        removed) and the rest are skipped. max_mbps caps the average
+        bandwidth by suspending the downloads (POSIX only). Returns one
+        DownloadResult per kernel, in order. Each kernel may be given once.
+        """
+        duplicates = sorted({k for k in kernel_ids if kernel_ids.count(k) > 1})
+        if duplicates:
+            raise KaggleWandbSyncError(f"kernel(s) given more than once: {', '.join(duplicates)}")
+        kaggle_cmd = self.kaggle_cmd
+        if max_mbps is not None and not CAN_PAUSE:
+            self._log("Warning: --max-mbps is not supported on this platform; ignoring it.", err=True)
+            max_mbps = None
+
+        output_path = Path(normalize_path(str(output_dir)))
+        output_path.mkdir(parents=True, exist_ok=True)
+        multi = len(kernel_ids) > 1
+        limit = asyncio.Semaphore(jobs)
+        monitor = TransferMonitor(
+            max_bytes=int(max_total_mb * 1024 * 1024) if max_total_mb is not None else None,
+            max_rate=max_mbps * 1024 * 1024 if max_mbps is not None else None,
+        )
+
+        async def download(kernel_id):
+            async with limit:
+                target = Path(kernel_output_dir(output_path, kernel_id)) if multi else output_path
+                target.mkdir(parents=True, exist_ok=True)
+                # files land in a fresh staging dir, so its size is what this download wrote
+                staging = await asyncio.to_thread(make_staging_dir, target)
+                try:
+                    cancel = await asyncio.to_thread(monitor.begin, staging)
+                    if cancel is None:
+                        await asyncio.to_thread(release_staging_dir, staging)
+                        self._log(f"Skipping {kernel_id}: disk budget exhausted.", err=True)
+                        return DownloadResult(kernel_id, str(target), "SKIPPED", 0, 0, 0.0)
+
+                    self._log(f"Downloading output from {kernel_id} to {target}...")
+                    start = time.monotonic()
+                    result = await run_streaming_async(
+                        [kaggle_cmd, "kernels", "output", kernel_id, "-p", str(staging)],
+                        prefix=f"  [{kernel_id}] " if multi else "  ",
+                        timeout=timeout,
+                        cancel_event=_AnyEvent(cancel, self.cancel_event),
+                        pause_event=monitor.pause,
+                        echo=self.echo,
+                        # kaggle names the files it wrote: show where they end up
+                        rewrite=lambda line: line.replace(str(staging), str(target)),
+                    )
+                    seconds = time.monotonic() - start
+                    written = await asyncio.to_thread(monitor.end, staging)
+
+                    if result.cancelled:
+                        if self.cancel_event is not None and self.cancel_event.is_set():
+                            reason = "cancelled"
+                        else:
+                            reason = f"disk budget of {max_total_mb} MB exceeded"
+                        self._log(f"Error: {kernel_id} aborted: {reason}.", err=True)
+                        await asyncio.to_thread(release_staging_dir, staging)
+                        return DownloadResult(kernel_id, str(target), "ABORTED", 0, 0, seconds)
+
+                    # a failed download keeps what it got, as an in-place download would
+                    files = await asyncio.to_thread(move_into, staging, target)
+                    if result.timed_out:
+                        self._log(f"Error: {kernel_id} download timed out after {timeout}s.", err=True)
+                    if result.returncode != 0:
+                        return DownloadResult(
+                            kernel_id, str(target), "FAILED", files, written, seconds, result.timed_out, result.returncode,
+                        )
+
+                    self._log(f"Downloaded {files} file(s) to {target}/")
+                    return DownloadResult(kernel_id, str(target), "OK", files, written, seconds)
+                except BaseException:
+                    release_staging_dir(staging)  # cancelled: don't leave it marked in use
+                    raise
+
+        with monitor:
+            return list(await asyncio.gather(*(download(k) for k in kernel_ids)))
+
+    async def sync(
+        self,
+        output_dir,
+        timeout: float | None = None,
+        kernel_id: str | None = None,
+        max_history_points: int | None = None,
+        max_media_mb: float | None = None,
+        parallel: int = 1,
+    ) -> SyncResult:
+        """Run 'wandb sync' on every offline-run-* under output_dir.
+
+        With max_history_points or max_media_mb, each run is first compacted
+        into a temporary copy which is synced instead. With parallel > 1 the
+        largest runs start first. kernel_id tags the history index entry.
+        """
+        offline_runs = await asyncio.to_thread(find_offline_runs, output_dir)
+        if not offline_runs:
+            raise KaggleWandbSyncError(f"No offline-run-* directories found in {normalize_path(str(output_dir))}/")
+        wandb_cmd = self.wandb_cmd
+
+        self._log(f"Found {len(offline_runs)} offline run(s):")
+        for run_dir in offline_runs:
+            self._log(f"  {run_dir}")
+
+        with tempfile.TemporaryDirectory(prefix="kaggle-wandb-sync-") as tmpdir:
+            if max_history_points is not None or max_media_mb is not None:
+                offline_runs = await asyncio.to_thread(
+                    compact_runs, offline_runs, Path(tmpdir), max_history_points, max_media_mb, self._log
+                )
+            if parallel > 1:
+                plans = await asyncio.to_thread(plan_runs, offline_runs, count_records=False)
+                offline_runs = [Path(p.path) for p in plans]
+
+            limit = asyncio.Semaphore(parallel)
+
+            async def sync_one(run_dir):
+                async with limit:
+                    started = time.monotonic()
+                    self._log(f"\nSyncing {run_dir.name}...")
+                    result = await run_streaming_async(
+                        [wandb_cmd, "sync", str(run_dir)],
+                        prefix=f"  [{run_dir.name}] ",
+                        timeout=timeout,
+                        cancel_event=self.cancel_event,
+                        echo=self.echo,
+                    )
+                    if result.timed_out:
+                        self._log(f"  [{run_dir.name}] Timed out after {timeout}s.", err=True)
+                    seconds[offline_run_id(run_dir)] = round(time.monotonic() - started, 3)
+                    return result.returncode == 0
+
+            start = time.monotonic()
+            seconds = {}  # run ID -> upload time, for per-upload throughput
+            ok = await asyncio.gather(*(sync_one(run_dir) for run_dir in offline_runs))
+            seconds_taken = time.monotonic() - start
+            result = SyncResult(
+                synced=[d.name for d, good in zip(offline_runs, ok) if good],
+                failed=[d.name for d, good in zip(offline_runs, ok) if not good],
+                bytes=await asyncio.to_thread(lambda: sum(dir_size(run_dir) for run_dir in offline_runs)),
+                seconds=seconds_taken,
+            )
+
+        await asyncio.to_thread(
+            record_event,
+            "sync",
+            kernel_id=kernel_id,
+            status="OK" if result.ok else "FAILED",
+            duration=result.seconds,
+            num_bytes=result.bytes,
+            run_seconds=seconds,
+            run_ids=[offline_run_id(run_dir) for run_dir in offline_runs],
+        )
+        return result
+
+    async def record_score(
+        self,
+        score: float | None = None,
+        run_paths=(),
+        output_dir=None,
+        targets=("all",),
+        rank: int | None = None,
+        metrics: dict | None = None,
+        api=None,
+    ) -> ScoreResult:
+        """Write the LB score (plus rank/metrics and submitted=True) to W&B run summaries.
+
+        run_paths are entity/project/run_id paths. With output_dir, the runs
+        found there that match targets (see _runs.select_runs) are updated
+        too. All runs go through one wandb.Api() session, concurrently and
+        with retries; pass api to reuse a session across calls.
+        """
+        if score is None and rank is None and not metrics:
+            raise KaggleWandbSyncError("provide at least one of score, rank, or metrics.")
+
+        run_paths = list(run_paths)
+        if output_dir is not None:
+            runs = await asyncio.to_thread(discover_runs, normalize_path(str(output_dir)))
+            selected = select_runs(runs, targets)
+            self._log(f"Found {len(runs)} run(s) in {output_dir}, {len(selected)} matching {' '.join(targets)}.")
+            run_paths.extend(r.path for r in selected if r.path not in run_paths)
+        if not run_paths:
+            raise KaggleWandbSyncError("no W&B runs to update.")
+
+        updates = {"submitted": True}
+        if score is not None:
+            updates["kaggle_score"] = score
+        if rank is not None:
+            updates["kaggle_rank"] = rank
+        updates.update(metrics or {})
+
+        api = await self._wandb_api(api)
+        errors = await asyncio.to_thread(update_summaries, run_paths, updates, api)
+        result = ScoreResult(
+            updates,
+            [p for p, e in errors.items() if e is None],
+            {p: str(e) for p, e in errors.items() if e is not None},
+        )
+        if result.updated:
+            await asyncio.to_thread(
+                record_event, "score", status="OK" if result.ok else "FAILED", score=score, run_ids=result.updated,
+            )
+        return result
+
+    async def log_artifacts(
+        self,
+        output_dir,
+        patterns,
+        name: str | None = None,
+        jobs: int = 4,
+        kernel_id: str | None = None,
+        api=None,
+        init=None,
+        limit=None,
+    ) -> list:
+        """Log the output files matching patterns as W&B artifacts of the synced runs.
+
+        Each project in output_dir gets one artifact (name, default
+        PROJECT-output) logged as an output of its latest run; only files
+        that changed since the previous version are uploaded. At most jobs
+        artifacts upload at once; pass a threading.Semaphore as limit to
+        share that bound across calls. Returns one ArtifactResult per project
+        (empty if no file matches).
+        """
+        output_path = Path(normalize_path(str(output_dir)))
+        runs = await asyncio.to_thread(discover_runs, output_path)
+        if not runs:
+            raise KaggleWandbSyncError(f"No W&B runs found in {output_path}/")
+        try:
+            files = await asyncio.to_thread(select_files, output_path, patterns)
+        except ValueError as e:
+            raise KaggleWandbSyncError(str(e))
+        if not files:
+            self._log(f"No output files match {' '.join(patterns)}; no artifact logged.")
+            return []
+
+        latest = {r.path.rsplit("/", 1)[0]: r for r in runs}  # runs are oldest first
+        api = await self._wandb_api(api)
+        limit = limit or threading.Semaphore(jobs)
+        sizes = await asyncio.to_thread(lambda: {n: p.stat().st_size for n, p in files.items()})
+        total = sum(sizes.values())
+        self._log(f"\nLogging {len(files)} output file(s) ({format_bytes(total)}) as artifact(s) of {len(latest)} run(s)...")
+
+        async def log_one(project_path, run):
+            artifact_name = name or f"{project_path.rsplit('/', 1)[-1]}-output"
+            try:
+                version, changed = await asyncio.to_thread(
+                    log_output_artifact, run.path, files, artifact_name, api, init, limit
+                )
+            except Exception as e:
+                self._log(f"  {run.path}: Error logging artifact {artifact_name}: {e}", err=True)
+                return ArtifactResult(run.path, artifact_name, len(files), 0, 0, str(e))
+            uploaded = sum(sizes[n] for n in changed)
+            self._log(
+                f"  {run.path}: {version} ({len(changed)} of {len(files)} file(s) uploaded, {format_bytes(uploaded)})"
+            )
+            return ArtifactResult(run.path, version, len(files), len(changed), uploaded)
+
+        start = time.monotonic()
+        results = await asyncio.gather(*(log_one(p, r) for p, r in latest.items()))
+        await asyncio.to_thread(
+            record_event,
+            "artifact",
+            kernel_id=kernel_id,
+            status="OK" if all(r.ok for r in results) else "FAILED",
+            duration=time.monotonic() - start,
+            num_bytes=sum(r.bytes for r in results),
+            run_ids=[r.run_path.rsplit("/", 1)[-1] for r in results],
+        )
+        return results
+
+    async def pipeline(
+        self,
+        notebooks: dict,
+        output_dir,
+        skip_push: bool = False,
+        skip_sync: bool = False,
+        poll_interval: float = 30,
+        max_attempts: int = 60,
+        competition_slug: str | None = None,
+        score_targets=("all",),
+        artifacts=(),
+        artifact_name: str | None = None,
+        artifact_jobs: int = 4,
+        per_kernel: bool | None = None,
+    ) -> dict:
+        """Push, poll, download and sync every notebook concurrently, as the run command does.
+
+        notebooks maps kernel ID → directory. Each kernel's steps are stages
+        of one executor (_dag.run_stages_async) on this event loop, so
+        kernels overlap and a failed stage only skips the stages after it.
+        With per_kernel (default: with several notebooks), stage names are
+        prefixed "KERNEL_ID:" and each kernel's output goes to
+        kernel_output_dir(output_dir, KERNEL_ID).
+
+        With artifacts (globs), an artifact stage after sync logs the
+        matching files; at most artifact_jobs upload at once across kernels.
+        With competition_slug, the submission count is taken while the
+        kernel runs; once its output is downloaded the user is asked to
+        submit while it syncs, and the new LB score is recorded to the runs
+        matching score_targets once both have finished. A failed sync stops
+        the watch and skips the record.
+
+        Returns {stage name: StageResult}. A stage that ran but did not
+        succeed fails with StageFailed. On cancellation, cancel_event (or a
+        new event) is set so every stage stops.
+        """
+        multi = len(notebooks) > 1 if per_kernel is None else per_kernel
+        if competition_slug and multi:
+            raise KaggleWandbSyncError("competition_slug needs a single notebook without per_kernel.")
+        cancel = self.cancel_event or threading.Event()
+        upload_slots = threading.Semaphore(artifact_jobs)
+        sync_failed = threading.Event()
+        values = {}
+
+        async def baseline():
+            submissions = await asyncio.to_thread(get_submissions, self.kaggle_cmd, competition_slug)
+            values["before"] = len(submissions)
+            self._log(f"Current submission count: {values['before']}")
+
+        async def watch():
+            if sync_failed.is_set():
+                raise StageFailed("sync did not succeed")
+            self._log(f"Waiting for a new submission to '{competition_slug}' ...")
+            self._log("Please submit via browser now. This step will wait up to 2 hours.")
+            await asyncio.to_thread(
+                notify_discord, f"⚡ **カーネル完了！ブラウザで提出してください**\nCompetition: `{competition_slug}`"
+            )
+            score = await asyncio.to_thread(
+                wait_for_new_score, self.kaggle_cmd, competition_slug, values["before"],
+                cancel_event=_AnyEvent(cancel, sync_failed), echo=self.echo,
+            )
+            if sync_failed.is_set():
+                raise StageFailed("stopped waiting: sync did not succeed")
+            if score is None:
+                self._log("No new scored submission detected. Skipping W&B score recording.")
+            values["score"] = score
+            return score
+
+        async def record():
+            score = values.get("score")
+            if score is None:
+                return
+            result = await self.record_score(float(score), output_dir=output_dir, targets=score_targets)
+            for run_path in result.updated:
+                self._log(f"  {run_path}: kaggle_score = {score}, submitted = True")
+            for run_path, error in result.errors.items():
+                self._log(f"  {run_path}: Error recording to W&B: {error}", err=True)
+            if result.updated:
+                links = "\n".join(f"W&B: https://wandb.ai/{p}" for p in result.updated)
+                await asyncio.to_thread(
+                    notify_discord,
+                    f"✅ **スコア記録完了！**\nCompetition: `{competition_slug}`\nScore: `{score}`\n{links}",
+                )
+            if not result.ok:
+                raise StageFailed(f"{len(result.errors)} run(s) could not be updated")
+
+        def kernel_stages(kernel_id, directory):
+            out = kernel_output_dir(output_dir, kernel_id) if multi else str(output_dir)
+            name = (lambda stage: f"{kernel_id}:{stage}") if multi else (lambda stage: stage)
+
+            async def push():
+                self._log(f"Kernel: {kernel_id}")
+                result = await self.push(directory)
+                if not result.ok:
+                    raise StageFailed(f"'kaggle kernels push' exited with code {result.returncode}", result.returncode)
+                self._log("Push complete." + (f" (version {result.version})" if result.version else ""))
+                return result.version
+
+            async def poll():
+                result = await self.poll(kernel_id, interval=poll_interval, max_attempts=max_attempts)
+                if result.status is None:
+                    raise StageFailed(f"kernel did not finish after {max_attempts} attempts")
+                if not result.ok:
+                    if self.echo:
+                        self._log("\n=== Kernel diagnostics ===")
+                        await asyncio.to_thread(show_kernel_diagnostics, self.kaggle_cmd, kernel_id)
+                    raise StageFailed(f"kernel finished with status {result.status}")
+
+            async def output():
+                result = await self.download(kernel_id, out)
+                if not result.ok:
+                    raise StageFailed(f"download {result.status.lower()}", result.returncode or 1)
+
+            async def sync():
+                try:
+                    result = await self.sync(out, kernel_id=kernel_id)
+                    if not result.ok:
+                        raise StageFailed(f"{len(result.failed)} run(s) failed to sync: {result.failed}")
+                except BaseException:
+                    sync_failed.set()  # stops the submission watcher
+                    raise
+                self._log(f"\nAll {len(result.synced)} run(s) synced successfully.")
+
+            async def artifact():
+                results = await self.log_artifacts(
+                    out, artifacts, artifact_name, kernel_id=kernel_id, limit=upload_slots,
+                )
+                failed = [r for r in results if not r.ok]
+                if failed:
+                    raise StageFailed(f"{len(failed)} artifact(s) failed to log")
+
+            stages = []
+            if not skip_push:
+                stages.append(Stage(name("push"), push))
+            stages.append(Stage(name("poll"), poll, deps=() if skip_push else (name("push"),)))
+            stages.append(Stage(name("output"), output, deps=(name("poll"),)))
+            if not skip_sync:
+                stages.append(Stage(name("sync"), sync, deps=(name("output"),)))
+                if artifacts:
+                    stages.append(Stage(name("artifact"), artifact, deps=(name("sync"),)))
+            return stages
+
+        # The submission baseline is taken while the kernel runs and the
+        # watcher runs alongside the sync; the score is only recorded once
+        # the runs are on W&B, and a failed sync stops the watcher.
+        stages = []
+        if competition_slug:
+            stages.append(Stage("baseline", baseline))
+        for kernel_id, directory in notebooks.items():
+            stages.extend(kernel_stages(kernel_id, directory))
+        if competition_slug:
+            stages.append(Stage("watch", watch, deps=("output", "baseline")))
+            stages.append(Stage("record", record, deps=("watch",) if skip_sync else ("sync", "watch")))
+        return await run_stages_async(stages, cancel_event=cancel, echo=self.echo)
+
+    async def _wandb_api(self, api=None):
+        """Return api, or a new wandb.Api() session."""
+        if api is not None:
+            return api
+        try:
+            import wandb
+        except ImportError:
+            raise KaggleWandbSyncError("wandb not found. Run: pip install wandb")
+        try:
+            with timed("network"):
+                return await asyncio.to_thread(wandb.Api)
+        except Exception as e:
+            raise KaggleWandbSyncError(f"could not connect to W&B: {e}")
@@ -3,17 +3,25 @@
 import click
 
 from kaggle_wandb_sync import __version__
+from kaggle_wandb_sync._profile import Profiler, format_report
+from kaggle_wandb_sync._utils import normalize_path
 from kaggle_wandb_sync.commands.push import push
 from kaggle_wandb_sync.commands.poll import poll
 from kaggle_wandb_sync.commands.output import output
 from kaggle_wandb_sync.commands.sync import sync
 from kaggle_wandb_sync.commands.run import run
 from kaggle_wandb_sync.commands.score import score
+from kaggle_wandb_sync.commands.history import history
+from kaggle_wandb_sync.commands.archive import archive
+from kaggle_wandb_sync.commands.restore import restore
+from kaggle_wandb_sync.commands.merge_results import merge_results
 
 
 @click.group()
 @click.version_option(version=__version__)
-def main():
+@click.option("--profile", "profile_file", default=None, metavar="FILE", help="Profile the command: write a cProfile dump to FILE and print a wall-clock breakdown (self CPU, child processes, sleep, network) and the top hotspots at exit.")
+@click.pass_context
+def main(ctx, profile_file):
     """Sync W&B offline runs from Kaggle Notebooks to W&B cloud.
 
     Full pipeline: push notebook → poll until complete → download output → wandb sync
@@ -21,8 +29,23 @@ def main():
     Typical usage:
         kaggle-wandb-sync run my-notebook/   # all-in-one
         kaggle-wandb-sync run my-notebook/ --skip-push  # re-sync only
+        kaggle-wandb-sync --profile run.prof run my-notebook/  # where does the time go?
     """
-    pass
+    if profile_file:
+        profiler = Profiler().start()
+        ctx.call_on_close(lambda: _finish_profile(profiler, ctx.invoked_subcommand, profile_file))
+
+
+def _finish_profile(profiler, command, profile_file):
+    report = profiler.stop(command or "")
+    path = normalize_path(profile_file)
+    try:
+        report.stats.dump_stats(path)
+    except OSError as e:
+        click.echo(f"Error: could not write profile to {path}: {e}", err=True)
+        path = None
+    click.echo("", err=True)
+    click.echo(format_report(report, path), err=True)
 
 
 main.add_command(push)
@@ -31,3 +54,7 @@ main.add_command(output)
 main.add_command(sync)
 main.add_command(run)
 main.add_command(score)
+main.add_command(history)
+main.add_command(archive)
+main.add_command(restore)
+main.add_command(merge_results)
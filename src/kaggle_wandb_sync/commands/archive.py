@@ -0,0 +1,50 @@
+"""kaggle-wandb-sync archive: Pack synced offline runs into a compressed archive."""
+
+import time
+from pathlib import Path
+
+import click
+
+from kaggle_wandb_sync._archive import archive_name, write_archive
+from kaggle_wandb_sync._history import latest_version
+from kaggle_wandb_sync._utils import format_bytes, normalize_path
+
+
+@click.command()
+@click.argument("kernel_id")
+@click.argument("output_dir", default="./kaggle_output")
+@click.option("--kernel-version", default=None, help="Kernel version to key the archive by (default: latest version in the history index, else 'latest').")
+@click.option("--archive-dir", default="./kaggle_archive", show_default=True, help="Directory to write the archive to.")
+def archive(kernel_id, output_dir, kernel_version, archive_dir):
+    """Pack the W&B offline runs in OUTPUT_DIR into one compressed archive.
+
+    KERNEL_ID format: username/kernel-slug  (e.g. yasunorim/my-notebook)
+
+    Only the offline-run-* directories are kept (debug logs are left out),
+    and files with identical content are stored once. The archive is named
+    <username>__<kernel-slug>__v<version>.tar.gz, which makes a convenient
+    GitHub Actions cache key; bring the runs back with 'restore'.
+    """
+    output_path = Path(normalize_path(output_dir))
+    if not output_path.exists():
+        click.echo(f"Error: {output_path} does not exist.", err=True)
+        raise SystemExit(1)
+    if not any(p.is_dir() for p in output_path.rglob("offline-run-*")):
+        click.echo(f"No offline-run-* directories found in {output_path}/", err=True)
+        raise SystemExit(1)
+
+    if kernel_version is None:
+        kernel_version = latest_version(kernel_id) or "latest"
+
+    dest = Path(normalize_path(archive_dir)) / archive_name(kernel_id, kernel_version)
+    click.echo(f"Archiving {output_path} → {dest} ...")
+    start = time.monotonic()
+    manifest = write_archive(output_path, dest, kernel_id, kernel_version)
+
+    total = sum(r["bytes"] for r in manifest["runs"])
+    for r in manifest["runs"]:
+        click.echo(f"  {r['name']}: {r['files']} file(s), {format_bytes(r['bytes'])}")
+    click.echo(
+        f"Archived {len(manifest['runs'])} run(s): {format_bytes(total)} → {format_bytes(dest.stat().st_size)}"
+        f" ({len(manifest['links'])} duplicate file(s) stored once, {time.monotonic() - start:.1f}s)"
+    )
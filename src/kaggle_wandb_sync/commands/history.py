@@ -0,0 +1,89 @@
+"""kaggle-wandb-sync history: Query the local index of past pipeline outcomes."""
+
+import json
+import sqlite3
+import time
+
+import click
+
+from kaggle_wandb_sync._history import SORT_COLUMNS, history_path, query_events
+
+
+def _format_duration(seconds) -> str:
+    if seconds is None:
+        return "-"
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{secs:02d}s"
+    return f"{secs}s"
+
+
+@click.command()
+@click.option("--kernel-id", "-k", default=None, help="Only show events for this kernel (username/kernel-slug).")
+@click.option("--command", "-c", "command_name", type=click.Choice(["run", "poll", "sync", "artifact", "score"]), default=None, help="Only show events recorded by this command.")
+@click.option("--since", type=float, default=None, metavar="DAYS", help="Only show events from the last DAYS days.")
+@click.option("--sort", type=click.Choice(SORT_COLUMNS), default="recorded_at", show_default=True, help="Column to sort by.")
+@click.option("--asc", is_flag=True, default=False, help="Sort ascending (default: descending).")
+@click.option("--limit", "-n", default=20, show_default=True, help="Maximum number of events to show (0 = all).")
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print events as JSON.")
+def history(kernel_id, command_name, since, sort, asc, limit, as_json):
+    """Show past run/poll/sync/score outcomes from the local history index.
+
+    Every run, poll, sync and score records its outcome (kernel ID, version,
+    stage durations, W&B run IDs, score) to a SQLite file, by default
+    ~/.kaggle-wandb-sync/history.db. Set KAGGLE_WANDB_SYNC_HISTORY to move it,
+    or to "off" to disable recording.
+
+    Examples:
+
+      kaggle-wandb-sync history -k me/my-notebook --since 7
+
+      kaggle-wandb-sync history -c run --sort score
+    """
+    if history_path() is None:
+        click.echo("Error: history is disabled (KAGGLE_WANDB_SYNC_HISTORY=off).", err=True)
+        raise SystemExit(1)
+
+    try:
+        events = query_events(
+            kernel_id=kernel_id,
+            command=command_name,
+            since=time.time() - since * 86400 if since is not None else None,
+            sort=sort,
+            descending=not asc,
+            limit=limit,
+        )
+    except sqlite3.Error as e:
+        click.echo(f"Error: could not read the history index {history_path()}: {e}", err=True)
+        raise SystemExit(1)
+
+    if as_json:
+        click.echo(json.dumps(events, indent=2, ensure_ascii=False))
+        return
+
+    if not events:
+        click.echo("No matching events.")
+        return
+
+    rows = [("WHEN", "COMMAND", "KERNEL", "VER", "STATUS", "DURATION", "SCORE", "STAGES / RUNS")]
+    for e in events:
+        stages = " ".join(f"{k}={_format_duration(v)}" for k, v in e["stages"].items())
+        runs = ",".join(
+            f"{r}={_format_duration(e['run_seconds'][r])}" if r in e["run_seconds"] else r for r in e["run_ids"]
+        )
+        rows.append((
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(e["recorded_at"])),
+            e["command"],
+            e["kernel_id"] or "-",
+            str(e["version"]) if e["version"] is not None else "-",
+            e["status"] or "-",
+            _format_duration(e["duration"]),
+            f"{e['score']:g}" if e["score"] is not None else "-",
+            " ".join(filter(None, [stages, runs])) or "-",
+        ))
+    widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]) - 1)]
+    for r in rows:
+        click.echo("  ".join(c.ljust(w) for c, w in zip(r, widths)) + "  " + r[-1])
@@ -0,0 +1,126 @@
+"""kaggle-wandb-sync merge-results: Combine sharded run results into one report."""
+
+import json
+from collections import Counter
+from pathlib import Path
+
+import click
+
+from kaggle_wandb_sync._shard import parse_shard
+from kaggle_wandb_sync._utils import normalize_path, notify_discord
+from kaggle_wandb_sync.commands.history import _format_duration
+
+
+@click.command("merge-results")
+@click.argument("result_files", metavar="RESULT_FILE...", nargs=-1, required=True)
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print the merged report as JSON.")
+@click.option("--notify/--no-notify", default=True, show_default=True, help="Send one Discord notification for the whole pipeline.")
+def merge_results(result_files, as_json, notify):
+    """Merge the --result-file outputs of sharded 'run' jobs.
+
+    Prints one table of every kernel across all shards, reports shards that
+    are missing from an I/N set, and sends a single Discord notification
+    (DISCORD_WEBHOOK_URL). Exits 1 if any kernel failed or a shard is missing.
+
+    Every result file lists all the kernels being sharded. The files must
+    agree on that list, and every kernel on it must appear in exactly one
+    of them; otherwise the shards split the work differently (e.g. from
+    different history indexes) and the merge fails.
+
+    Example (GitHub Actions, after a matrix of 'run --shard I/N --result-file'):
+
+      kaggle-wandb-sync merge-results results/*.json
+    """
+    shards = []
+    kernels = []
+    notebook_lists = set()
+    bases = set()
+    for name in result_files:
+        path = Path(normalize_path(name))
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, json.JSONDecodeError, ValueError) as e:
+            click.echo(f"Error: could not read {path}: {e}", err=True)
+            raise SystemExit(1)
+        shards.append(data.get("shard"))
+        if "notebooks" in data:
+            notebook_lists.add(tuple(data["notebooks"]))
+            bases.add(data.get("basis"))
+        for kernel in data.get("kernels", []):
+            kernels.append(dict(kernel, shard=data.get("shard")))
+
+    missing = []
+    counts = {parse_shard(s)[1] for s in shards if s}
+    if len(counts) > 1:
+        click.echo(f"Error: result files come from different shard counts: {sorted(counts)}", err=True)
+        raise SystemExit(1)
+    if counts:
+        count = counts.pop()
+        seen = {parse_shard(s)[0] for s in shards if s}
+        missing = [f"{i}/{count}" for i in range(1, count + 1) if i not in seen]
+
+    if len(notebook_lists) > 1:
+        click.echo("Error: result files were run with different kernel lists.", err=True)
+        raise SystemExit(1)
+    ids = [k["kernel_id"] for k in kernels]
+    duplicates = sorted(kid for kid, n in Counter(ids).items() if n > 1)
+    missing_kernels = []
+    if notebook_lists and not missing:
+        # with a shard missing, its kernels are missing too: report the shard only
+        missing_kernels = sorted(set(next(iter(notebook_lists))) - set(ids))
+
+    kernels.sort(key=lambda k: k["kernel_id"])
+    failed = [k["kernel_id"] for k in kernels if k["status"] != "OK"]
+    total = sum(k.get("duration") or 0 for k in kernels)
+
+    if as_json:
+        click.echo(json.dumps({
+            "kernels": kernels,
+            "ok": len(kernels) - len(failed),
+            "failed": failed,
+            "missing_shards": missing,
+            "missing_kernels": missing_kernels,
+            "duplicate_kernels": duplicates,
+            "duration": round(total, 3),
+        }, indent=2))
+    else:
+        rows = [("KERNEL", "SHARD", "STATUS", "VERSION", "DURATION", "RUNS")]
+        for k in kernels:
+            rows.append((
+                k["kernel_id"], k["shard"] or "-", k["status"],
+                str(k["version"]) if k.get("version") is not None else "-",
+                _format_duration(k.get("duration")), str(len(k.get("run_ids", []))),
+            ))
+        widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+        for r in rows:
+            click.echo("  ".join(c.ljust(w) for c, w in zip(r, widths)).rstrip())
+        click.echo(f"\n{len(kernels) - len(failed)}/{len(kernels)} kernel(s) OK across {len(result_files)} result file(s)")
+        if missing:
+            click.echo(f"Error: missing shard(s): {', '.join(missing)}", err=True)
+        if missing_kernels:
+            click.echo(f"Error: kernel(s) in no result file: {', '.join(missing_kernels)}", err=True)
+        if duplicates:
+            click.echo(f"Error: kernel(s) in more than one result file: {', '.join(duplicates)}", err=True)
+        if (missing_kernels or duplicates) and len(bases) > 1:
+            click.echo(
+                f"  The shards were balanced on different bases ({', '.join(sorted(map(str, bases)))});"
+                " give every shard the same history index.",
+                err=True,
+            )
+
+    if notify:
+        if failed or missing or missing_kernels or duplicates:
+            lines = [f"❌ **パイプライン失敗** ({len(kernels) - len(failed)}/{len(kernels)} OK)"]
+            lines += [f"Failed: `{kid}`" for kid in failed]
+            if missing:
+                lines.append(f"Missing shards: {', '.join(missing)}")
+            if missing_kernels:
+                lines.append(f"Missing kernels: {', '.join(missing_kernels)}")
+            if duplicates:
+                lines.append(f"Duplicate kernels: {', '.join(duplicates)}")
+        else:
+            lines = [f"✅ **パイプライン完了** ({len(kernels)} kernel(s))"]
+        notify_discord("\n".join(lines))
+
+    if failed or missing or missing_kernels or duplicates:
+        raise SystemExit(1)
@@ -1,47 +1,51 @@
 """kaggle-wandb-sync output: Download kernel output files."""
 
-import subprocess
-from pathlib import Path
+import asyncio
 
 import click
 
-from kaggle_wandb_sync._utils import find_kaggle, normalize_path
+from kaggle_wandb_sync._utils import format_bytes
+from kaggle_wandb_sync.api import Client, KaggleWandbSyncError
 
 
 @click.command()
-@click.argument("kernel_id")
+@click.argument("kernel_ids", metavar="KERNEL_ID...", nargs=-1, required=True)
 @click.option("--output-dir", "-o", default="./kaggle_output", show_default=True, help="Directory to save downloaded files.")
-def output(kernel_id, output_dir):
-    """Download output files from a completed Kaggle kernel.
+@click.option("--timeout", type=float, default=None, help="Seconds to allow each download before killing it (default: no limit).")
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=4, show_default=True, help="Maximum concurrent downloads when several kernels are given.")
+@click.option("--max-total-mb", type=click.FloatRange(min=0), default=None, help="Disk budget for all downloads; in-flight downloads are aborted and the rest skipped once exceeded.")
+@click.option("--max-mbps", type=click.FloatRange(min=0, min_open=True), default=None, help="Average download bandwidth cap in MB/s across all downloads (POSIX only).")
+def output(kernel_ids, output_dir, timeout, jobs, max_total_mb, max_mbps):
+    """Download output files from one or more completed Kaggle kernels.
 
     KERNEL_ID format: username/kernel-slug  (e.g. yasunorim/my-notebook)
 
     Downloads all output files including wandb/ offline run directories.
+    With a single KERNEL_ID files go straight into --output-dir; with several,
+    each kernel gets its own subdirectory (username__kernel-slug) and up to
+    --jobs downloads run concurrently. Ends with a per-kernel size/time summary.
     """
-    kaggle_cmd = find_kaggle()
-    if not kaggle_cmd:
-        click.echo("Error: kaggle command not found. Run: pip install kaggle", err=True)
+    client = Client(echo=True)
+    try:
+        results = asyncio.run(client.download_many(
+            kernel_ids, output_dir, jobs=jobs, timeout=timeout, max_total_mb=max_total_mb, max_mbps=max_mbps,
+        ))
+    except KaggleWandbSyncError as e:
+        click.echo(f"Error: {e}", err=True)
         raise SystemExit(1)
 
-    output_path = Path(normalize_path(output_dir))
-    output_path.mkdir(parents=True, exist_ok=True)
-
-    click.echo(f"Downloading output from {kernel_id} to {output_path}...")
-
-    result = subprocess.run(
-        [kaggle_cmd, "kernels", "output", kernel_id, "-p", str(output_path)],
-        capture_output=True,
-        text=True,
-    )
-
-    if result.stdout:
-        click.echo(result.stdout.rstrip())
-    if result.stderr:
-        click.echo(result.stderr.rstrip(), err=True)
-
-    if result.returncode != 0:
-        raise SystemExit(result.returncode)
-
-    # Show downloaded files
-    files = list(output_path.rglob("*"))
-    click.echo(f"Downloaded {len([f for f in files if f.is_file()])} file(s) to {output_path}/")
+    multi = len(kernel_ids) > 1
+    failed = [r for r in results if not r.ok]
+    if multi:
+        rows = [("KERNEL", "STATUS", "FILES", "SIZE", "TIME")]
+        for r in results:
+            rows.append((r.kernel_id, r.status, str(r.files), format_bytes(r.bytes), f"{r.seconds:.1f}s"))
+        widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+        click.echo("")
+        for r in rows:
+            click.echo("  ".join(c.ljust(w) for c, w in zip(r, widths)).rstrip())
+        total = sum(r.bytes for r in results)
+        click.echo(f"\n{len(results) - len(failed)}/{len(results)} kernel(s) downloaded, {format_bytes(total)} total")
+
+    if failed:
+        raise SystemExit(next((r.returncode for r in failed if r.returncode), 1))
@@ -1,10 +1,11 @@
 """kaggle-wandb-sync poll: Poll until a kernel reaches a terminal state."""
 
-import time
+import asyncio
 
 import click
 
-from kaggle_wandb_sync._utils import find_kaggle, get_kernel_status, is_terminal, show_kernel_diagnostics
+from kaggle_wandb_sync._utils import show_kernel_diagnostics
+from kaggle_wandb_sync.api import Client, KaggleWandbSyncError
 
 
 @click.command()
@@ -16,26 +17,17 @@ def poll(kernel_id, interval, max_attempts):
 
     KERNEL_ID format: username/kernel-slug  (e.g. yasunorim/my-notebook)
     """
-    kaggle_cmd = find_kaggle()
-    if not kaggle_cmd:
-        click.echo("Error: kaggle command not found. Run: pip install kaggle", err=True)
+    client = Client(echo=True)
+    try:
+        result = asyncio.run(client.poll(kernel_id, interval=interval, max_attempts=max_attempts))
+    except KaggleWandbSyncError as e:
+        click.echo(f"Error: {e}", err=True)
         raise SystemExit(1)
 
-    click.echo(f"Polling {kernel_id} (interval={interval}s, max={max_attempts} attempts)...")
-
-    for i in range(max_attempts):
-        status = get_kernel_status(kaggle_cmd, kernel_id)
-        click.echo(f"  [{i + 1}/{max_attempts}] Status: {status or '(unknown)'}")
-
-        if is_terminal(status):
-            click.echo(f"Kernel finished with status: {status}")
-            if "ERROR" in status.upper() or "CANCEL" in status.upper():
-                click.echo("\n=== Kernel diagnostics ===")
-                show_kernel_diagnostics(kaggle_cmd, kernel_id)
-                raise SystemExit(1)
-            return
-
-        time.sleep(interval)
-
-    click.echo(f"Error: kernel did not finish after {max_attempts} attempts.", err=True)
-    raise SystemExit(1)
+    if result.status is None:
+        click.echo(f"Error: kernel did not finish after {max_attempts} attempts.", err=True)
+        raise SystemExit(1)
+    if not result.ok:
+        click.echo("\n=== Kernel diagnostics ===")
+        show_kernel_diagnostics(client.kaggle_cmd, kernel_id)
+        raise SystemExit(1)
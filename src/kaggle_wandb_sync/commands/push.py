@@ -1,13 +1,11 @@
 """kaggle-wandb-sync push: Push a Kaggle Notebook (with 409 protection)."""
 
-import json
-import subprocess
-import time
-from pathlib import Path
+import asyncio
 
 import click
 
-from kaggle_wandb_sync._utils import find_kaggle, get_kernel_status, is_terminal, normalize_path
+from kaggle_wandb_sync._utils import normalize_path
+from kaggle_wandb_sync.api import Client, KaggleWandbSyncError, read_kernel_id
 
 
 @click.command()
@@ -21,52 +19,27 @@ def push(directory, wait_interval, max_wait, dry_run):
     DIRECTORY must contain kernel-metadata.json.
     If the kernel is currently running, waits until it finishes to avoid a 409 conflict.
     """
-    dir_path = Path(normalize_path(directory))
-    metadata_path = dir_path / "kernel-metadata.json"
-
-    if not metadata_path.exists():
-        click.echo(f"Error: {metadata_path} not found.", err=True)
-        raise SystemExit(1)
-
-    with open(metadata_path) as f:
-        metadata = json.load(f)
-
-    kernel_id = metadata.get("id", "")
-
-    kaggle_cmd = find_kaggle()
-    if not kaggle_cmd:
-        click.echo("Error: kaggle command not found. Run: pip install kaggle", err=True)
+    client = Client(echo=True)
+    try:
+        kernel_id = read_kernel_id(directory)
+        kaggle_cmd = client.kaggle_cmd
+    except KaggleWandbSyncError as e:
+        click.echo(f"Error: {e}", err=True)
         raise SystemExit(1)
 
     click.echo(f"Kernel: {kernel_id}")
 
     if dry_run:
-        click.echo(f"Dry run: {kaggle_cmd} kernels push -p {dir_path}")
+        click.echo(f"Dry run: {kaggle_cmd} kernels push -p {normalize_path(directory)}")
         return
 
-    # Wait for any running kernel to finish (409 protection)
-    for i in range(max_wait):
-        status = get_kernel_status(kaggle_cmd, kernel_id)
-        if not status or is_terminal(status):
-            break
-        click.echo(f"  Kernel is {status}, waiting {wait_interval}s... ({i + 1}/{max_wait})")
-        time.sleep(wait_interval)
-
-    # Push
-    click.echo("Pushing to Kaggle...")
-    result = subprocess.run(
-        [kaggle_cmd, "kernels", "push", "-p", str(dir_path)],
-        capture_output=True,
-        text=True,
-    )
-
-    if result.stdout:
-        click.echo(result.stdout.rstrip())
-    if result.stderr:
-        click.echo(result.stderr.rstrip(), err=True)
-
-    if result.returncode != 0:
+    try:
+        result = asyncio.run(client.push(directory, wait_interval=wait_interval, max_wait=max_wait))
+    except KaggleWandbSyncError as e:
+        click.echo(f"Error: {e}", err=True)
+        raise SystemExit(1)
+    if not result.ok:
         raise SystemExit(result.returncode)
 
-    click.echo("Push complete.")
+    click.echo("Push complete." + (f" (version {result.version})" if result.version else ""))
     click.echo(f"  Check status: kaggle-wandb-sync poll {kernel_id}")
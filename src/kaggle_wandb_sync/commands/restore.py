@@ -0,0 +1,55 @@
+"""kaggle-wandb-sync restore: Extract offline runs from an archive."""
+
+from pathlib import Path
+
+import click
+
+from kaggle_wandb_sync._archive import find_archive, read_manifest, restore_archive
+from kaggle_wandb_sync._utils import format_bytes, normalize_path
+
+
+@click.command()
+@click.argument("kernel_id")
+@click.option("--kernel-version", default=None, help="Archive version to restore (default: newest archive for the kernel).")
+@click.option("--run", "runs", multiple=True, metavar="RUN_ID", help="Only restore this run (run ID or offline-run-* name; repeatable).")
+@click.option("--output-dir", "-o", default="./kaggle_output", show_default=True, help="Directory to restore the runs into.")
+@click.option("--archive-dir", default="./kaggle_archive", show_default=True, help="Directory containing archives.")
+@click.option("--list", "list_only", is_flag=True, default=False, help="List the runs in the archive without extracting.")
+def restore(kernel_id, kernel_version, runs, output_dir, archive_dir, list_only):
+    """Restore W&B offline runs archived with 'archive'.
+
+    KERNEL_ID format: username/kernel-slug  (e.g. yasunorim/my-notebook)
+
+    Runs are restored to the same relative paths they had in the output
+    directory, so 'sync' can be pointed at --output-dir afterwards.
+    """
+    path = find_archive(Path(normalize_path(archive_dir)), kernel_id, kernel_version)
+    if path is None:
+        version = f" version {kernel_version}" if kernel_version else ""
+        click.echo(f"Error: no archive for {kernel_id}{version} in {archive_dir}/", err=True)
+        raise SystemExit(1)
+
+    try:
+        manifest = read_manifest(path)
+    except (ValueError, OSError) as e:
+        click.echo(f"Error: {e}", err=True)
+        raise SystemExit(1)
+
+    if list_only:
+        click.echo(f"{path.name} ({manifest['kernel_id']} version {manifest['version']}):")
+        for r in manifest["runs"]:
+            click.echo(f"  {r['run_id']}  {r['path']}  {r['files']} file(s), {format_bytes(r['bytes'])}")
+        return
+
+    known = {r["run_id"] for r in manifest["runs"]} | {r["name"] for r in manifest["runs"]}
+    unknown = [r for r in runs if r not in known]
+    if unknown:
+        click.echo(f"Error: run(s) not in {path.name}: {', '.join(unknown)}", err=True)
+        raise SystemExit(1)
+
+    output_path = Path(normalize_path(output_dir))
+    click.echo(f"Restoring from {path} to {output_path} ...")
+    restored = restore_archive(path, output_path, set(runs) or None)
+    for r in restored:
+        click.echo(f"  {r['path']}")
+    click.echo(f"Restored {len(restored)} run(s).")
@@ -1,105 +1,190 @@
 """kaggle-wandb-sync run: Push, poll, download, and sync in one step."""
 
+import asyncio
 import json
 import time
 from pathlib import Path
 
 import click
 
-from kaggle_wandb_sync._utils import find_kaggle, find_wandb, get_kernel_status, is_terminal, normalize_path, notify_discord, wait_and_record_score
-from kaggle_wandb_sync.commands.push import push as push_cmd
-from kaggle_wandb_sync.commands.poll import poll as poll_cmd
-from kaggle_wandb_sync.commands.output import output as output_cmd
-from kaggle_wandb_sync.commands.sync import sync as sync_cmd
+from kaggle_wandb_sync._dag import format_summary
+from kaggle_wandb_sync._history import record_event
+from kaggle_wandb_sync._shard import assign_shards, notebook_weights, parse_shard
+from kaggle_wandb_sync._utils import find_kaggle, find_wandb, normalize_path, notify_discord, offline_run_id
+from kaggle_wandb_sync.api import Client, StageFailed, kernel_output_dir
+from kaggle_wandb_sync.commands.score import validate_targets
+
+
+def _validate_shard(ctx, param, value):
+    """Click callback: check --shard I/N before doing any work."""
+    if value is None:
+        return None
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
 
 
 @click.command()
-@click.argument("directory", default=".")
-@click.option("--kernel-id", "-k", default=None, help="Kernel ID (default: read from kernel-metadata.json).")
+@click.argument("directories", metavar="[DIRECTORY]...", nargs=-1)
+@click.option("--kernel-id", "-k", default=None, help="Kernel ID (default: read from kernel-metadata.json). Single DIRECTORY only.")
 @click.option("--output-dir", "-o", default="./kaggle_output", show_default=True, help="Directory to save downloaded output.")
 @click.option("--poll-interval", default=30, show_default=True, help="Seconds between status checks.")
 @click.option("--max-attempts", default=60, show_default=True, help="Maximum poll attempts.")
 @click.option("--skip-push", is_flag=True, default=False, help="Skip push (re-run output+sync only).")
 @click.option("--skip-sync", is_flag=True, default=False, help="Skip wandb sync (download output only).")
-@click.option("--competition-slug", default=None, help="Competition slug to auto-record LB score after submission (e.g. march-machine-learning-mania-2026).")
-def run(directory, kernel_id, output_dir, poll_interval, max_attempts, skip_push, skip_sync, competition_slug):
+@click.option("--competition-slug", default=None, help="Competition slug to auto-record LB score after submission (e.g. march-machine-learning-mania-2026). Single DIRECTORY only.")
+@click.option("--score-target", multiple=True, default=("all",), show_default=True, callback=validate_targets, help="Which runs get the LB score: all, latest, group=NAME, job_type=NAME or tag=NAME (repeat to AND).")
+@click.option("--artifact", "artifacts", multiple=True, metavar="GLOB", help="Add an artifact stage after sync: log output files matching GLOB (repeatable) as a W&B artifact of the latest run.")
+@click.option("--artifact-name", default=None, help="Artifact name (default: PROJECT-output).")
+@click.option("--artifact-jobs", type=click.IntRange(min=1), default=4, show_default=True, help="Maximum artifacts uploading at once, across all kernels.")
+@click.option("--shard", default=None, metavar="I/N", callback=_validate_shard, help="Only run shard I of N (1-based) of the DIRECTORY list, balanced by past run time or directory size.")
+@click.option("--result-file", default=None, type=click.Path(dir_okay=False), help="Write a JSON result (per-kernel status, stages, run IDs) for merge-results.")
+def run(directories, kernel_id, output_dir, poll_interval, max_attempts, skip_push, skip_sync, competition_slug, score_target, artifacts, artifact_name, artifact_jobs, shard, result_file):
     """Run the full pipeline: push → poll → output → wandb sync → wait for submission → record LB score.
 
-    DIRECTORY must contain kernel-metadata.json.
+    Stages run as soon as the stages they depend on have finished, so
+    independent work overlaps (e.g. the submission baseline is taken while
+    the kernel runs, and the submission watcher runs alongside the sync).
+    A per-stage status summary is printed at the end.
+
+    Each DIRECTORY (default: .) must contain kernel-metadata.json. With
+    several, their pipelines run concurrently and each kernel's output goes
+    to its own --output-dir subdirectory (username__kernel-slug).
+
+    With --artifact, an artifact stage after sync logs the matching output
+    files (e.g. submission.csv, oof/*.npy, models/*.pt) as a W&B artifact
+    of the synced run, uploading only files that changed since the previous
+    version. --artifact-jobs bounds concurrent uploads across all kernels.
+
+    With --shard I/N, the directories are split deterministically across N
+    CI jobs: by mean run time from the history index when every kernel has
+    one, otherwise by directory size. Every shard must be given the same
+    DIRECTORY list (and history index). Sharded runs skip the Discord
+    notification; combine the --result-file outputs with 'merge-results'
+    to get a single report. Each result file records the full kernel list
+    and the weight basis, so merge-results can tell when the shards did not
+    split the same list the same way.
+
     Requires WANDB_API_KEY environment variable (or prior 'wandb login').
     """
-    dir_path = Path(normalize_path(directory))
-    metadata_path = dir_path / "kernel-metadata.json"
-
-    if not metadata_path.exists():
-        click.echo(f"Error: {metadata_path} not found.", err=True)
+    directories = directories or (".",)
+    if len(directories) > 1 and (kernel_id or competition_slug):
+        click.echo("Error: --kernel-id and --competition-slug need a single DIRECTORY.", err=True)
         raise SystemExit(1)
 
-    if kernel_id is None:
-        with open(metadata_path) as f:
-            metadata = json.load(f)
-        kernel_id = metadata.get("id", "")
-        if not kernel_id:
-            click.echo("Error: 'id' not found in kernel-metadata.json.", err=True)
+    notebooks = {}  # kernel_id -> directory
+    for directory in directories:
+        metadata_path = Path(normalize_path(directory)) / "kernel-metadata.json"
+        if not metadata_path.exists():
+            click.echo(f"Error: {metadata_path} not found.", err=True)
             raise SystemExit(1)
+        kid = kernel_id
+        if kid is None:
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            kid = metadata.get("id", "")
+            if not kid:
+                click.echo(f"Error: 'id' not found in {metadata_path}.", err=True)
+                raise SystemExit(1)
+        if kid in notebooks:
+            click.echo(f"Error: {notebooks[kid]} and {directory} are both {kid}.", err=True)
+            raise SystemExit(1)
+        notebooks[kid] = directory
+
+    all_notebooks = sorted(notebooks)  # every shard records this, for merge-results to check
+    basis = None
+    if shard is not None:
+        index, count = shard
+        weights, basis = notebook_weights(notebooks)
+        selected = assign_shards(weights, count)[index - 1]
+        click.echo(f"Shard {index}/{count}: {len(selected)} of {len(notebooks)} notebook(s), balanced by {basis}.")
+        for kid in selected:
+            click.echo(f"  {kid}  ({notebooks[kid]})")
+        notebooks = {kid: notebooks[kid] for kid in selected}
 
     kaggle_cmd = find_kaggle()
     if not kaggle_cmd:
         click.echo("Error: kaggle command not found. Run: pip install kaggle", err=True)
         raise SystemExit(1)
 
+    wandb_cmd = None
     if not skip_sync:
         wandb_cmd = find_wandb()
         if not wandb_cmd:
             click.echo("Error: wandb command not found. Run: pip install wandb", err=True)
             raise SystemExit(1)
 
-    ctx = click.get_current_context()
-
-    # Step 1: Push
-    if not skip_push:
-        click.echo("=" * 50)
-        click.echo("Step 1/4: Push")
-        click.echo("=" * 50)
-        ctx.invoke(push_cmd, directory=directory)
-
-    # Step 2: Poll
-    click.echo("")
-    click.echo("=" * 50)
-    click.echo("Step 2/4: Poll")
-    click.echo("=" * 50)
-    ctx.invoke(poll_cmd, kernel_id=kernel_id, interval=poll_interval, max_attempts=max_attempts)
-
-    # Step 3: Download output
-    click.echo("")
-    click.echo("=" * 50)
-    click.echo("Step 3/4: Download output")
-    click.echo("=" * 50)
-    ctx.invoke(output_cmd, kernel_id=kernel_id, output_dir=output_dir)
-
-    total_steps = 5 if competition_slug else 4
-
-    # Step 4: Sync
-    if not skip_sync:
-        click.echo("")
-        click.echo("=" * 50)
-        click.echo(f"Step 4/{total_steps}: W&B sync")
-        click.echo("=" * 50)
-        ctx.invoke(sync_cmd, output_dir=output_dir)
-
-    # Step 5: Wait for submission and record LB score
-    if competition_slug:
+    # with several directories, each kernel gets its own output subdirectory,
+    # even when its shard only runs one of them
+    multi = len(directories) > 1
+    client = Client(kaggle_cmd=kaggle_cmd, wandb_cmd=wandb_cmd, echo=True)
+    start = time.monotonic()
+    results = asyncio.run(client.pipeline(
+        notebooks, output_dir, skip_push=skip_push, skip_sync=skip_sync, poll_interval=poll_interval,
+        max_attempts=max_attempts, competition_slug=competition_slug, score_targets=score_target,
+        artifacts=artifacts, artifact_name=artifact_name, artifact_jobs=artifact_jobs, per_kernel=multi,
+    ))
+    duration = time.monotonic() - start
+    watched = results.get("watch")
+    score = watched.value if watched is not None and watched.value is not None else None
+
+    if results:
         click.echo("")
-        click.echo("=" * 50)
-        click.echo(f"Step 5/{total_steps}: Wait for submission → record LB score")
-        click.echo("=" * 50)
-        wait_and_record_score(
-            kaggle_cmd=kaggle_cmd,
-            competition_slug=competition_slug,
-            output_dir=output_dir,
+        click.echo("Stage summary:")
+        click.echo(format_summary(results))
+
+    kernels = []
+    for kid, directory in notebooks.items():
+        if multi:
+            # a kernel's stages form a chain, so their durations add up to its wall time
+            own = {name.split(":", 1)[1]: r for name, r in results.items() if name.startswith(f"{kid}:")}
+        else:
+            own = results
+        out_path = Path(normalize_path(kernel_output_dir(output_dir, kid) if multi else output_dir))
+        run_dirs = [p for p in out_path.rglob("offline-run-*") if p.is_dir()] if out_path.exists() else []
+        kernel = {
+            "kernel_id": kid,
+            "directory": directory,
+            "status": "FAILED" if any(r.status != "OK" for r in own.values()) else "OK",
+            "version": own["push"].value if "push" in own else None,
+            "duration": round(sum(r.seconds for r in own.values()) if multi else duration, 3),
+            "score": float(score) if score is not None else None,
+            "stages": {name: {"status": r.status, "seconds": round(r.seconds, 3)} for name, r in own.items()},
+            "run_ids": sorted(offline_run_id(p) for p in run_dirs),
+        }
+        kernels.append(kernel)
+        record_event(
+            "run",
+            kernel_id=kid,
+            version=kernel["version"],
+            status=kernel["status"],
+            duration=kernel["duration"],
+            score=kernel["score"],
+            stages={name: s["seconds"] for name, s in kernel["stages"].items() if s["status"] != "SKIPPED"},
+            run_ids=kernel["run_ids"],
         )
 
+    if result_file:
+        result_path = Path(normalize_path(result_file))
+        result_path.parent.mkdir(parents=True, exist_ok=True)
+        result_path.write_text(json.dumps({
+            "shard": f"{shard[0]}/{shard[1]}" if shard else None,
+            "notebooks": all_notebooks,
+            "basis": basis,
+            "recorded_at": time.time(),
+            "duration": round(duration, 3),
+            "kernels": kernels,
+        }, indent=2))
+        click.echo(f"Wrote result to {result_path}")
+
+    failed = [r for r in results.values() if r.status == "FAILED"]
+    if failed:
+        error = failed[0].error
+        raise SystemExit(error.returncode if isinstance(error, StageFailed) and error.returncode else 1)
+
     click.echo("")
     click.echo("Pipeline complete.")
-    if not competition_slug:
-        notify_discord(f"✅ **パイプライン完了**\nKernel: `{kernel_id}`")
+    if not competition_slug and shard is None:
+        done = ", ".join(f"`{kid}`" for kid in notebooks)
+        notify_discord(f"✅ **パイプライン完了**\nKernel: {done}")
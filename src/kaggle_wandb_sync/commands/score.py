@@ -1,9 +1,13 @@
-"""kaggle-wandb-sync score: Log Kaggle submission scores to a W&B run."""
+"""kaggle-wandb-sync score: Log Kaggle submission scores to W&B runs."""
 
+import asyncio
 import re
 
 import click
 
+from kaggle_wandb_sync._runs import parse_target
+from kaggle_wandb_sync.api import Client, KaggleWandbSyncError
+
 
 def _parse_run_path(run_id: str) -> str:
     """Parse run_id into W&B run path (entity/project/run_id).
@@ -26,20 +30,35 @@ def _parse_run_path(run_id: str) -> str:
     return run_id
 
 
+def validate_targets(ctx, param, value):
+    """Click callback: check --target/--score-target rules before doing any work."""
+    for rule in value:
+        try:
+            parse_target(rule)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+    return value
+
+
 @click.command()
-@click.argument("run_id")
+@click.argument("run_ids", metavar="[RUN_ID]...", nargs=-1)
 @click.option("--project", "-p", default=None, help="W&B project path (entity/project). Required if RUN_ID is a bare ID.")
 @click.option("--score", "kaggle_score", type=float, default=None, help="Kaggle public LB score.")
 @click.option("--rank", type=int, default=None, help="Leaderboard rank.")
 @click.option("--metric", "-m", multiple=True, metavar="KEY=VALUE", help="Additional metric (can be repeated, e.g. -m auc=0.95 -m loss=0.3).")
-def score(run_id, project, kaggle_score, rank, metric):
-    """Log Kaggle submission scores to a W&B run.
+@click.option("--from-output", default=None, metavar="DIR", help="Also update the runs found in a downloaded kernel output directory.")
+@click.option("--target", multiple=True, default=("all",), show_default=True, callback=validate_targets, help="With --from-output, which runs to update: all, latest, group=NAME, job_type=NAME or tag=NAME (repeat to AND).")
+def score(run_ids, project, kaggle_score, rank, metric, from_output, target):
+    """Log Kaggle submission scores to one or more W&B runs.
 
     RUN_ID can be:
       - Full W&B URL:  https://wandb.ai/entity/project/runs/abc123
       - Path:          entity/project/abc123
       - Bare ID:       abc123  (requires --project entity/project)
 
+    All runs are updated through a single W&B API session, concurrently and
+    with retries.
+
     Examples:
 
       kaggle-wandb-sync score https://wandb.ai/me/my-proj/runs/abc123 --score 0.127 --rank 200
@@ -47,25 +66,28 @@ def score(run_id, project, kaggle_score, rank, metric):
       kaggle-wandb-sync score abc123 --project me/my-proj --score 0.127
 
       kaggle-wandb-sync score abc123 --project me/my-proj -m auc=0.95 -m loss=0.3
+
+      kaggle-wandb-sync score --from-output ./kaggle_output --target job_type=ensemble --score 0.127
     """
-    try:
-        import wandb
-    except ImportError:
-        click.echo("Error: wandb not found. Run: pip install wandb", err=True)
+    if not run_ids and not from_output:
+        click.echo("Error: provide at least one RUN_ID or --from-output DIR.", err=True)
         raise SystemExit(1)
 
-    # Build run path
-    run_path = _parse_run_path(run_id)
-
-    # Bare ID needs --project
-    if '/' not in run_path:
-        if not project:
-            click.echo(
-                "Error: RUN_ID is a bare ID. Provide --project entity/project or use a full URL.",
-                err=True,
-            )
-            raise SystemExit(1)
-        run_path = f"{project}/{run_path}"
+    # Build run paths
+    run_paths = []
+    for run_id in run_ids:
+        run_path = _parse_run_path(run_id)
+
+        # Bare ID needs --project
+        if '/' not in run_path:
+            if not project:
+                click.echo(
+                    "Error: RUN_ID is a bare ID. Provide --project entity/project or use a full URL.",
+                    err=True,
+                )
+                raise SystemExit(1)
+            run_path = f"{project}/{run_path}"
+        run_paths.append(run_path)
 
     # Parse --metric KEY=VALUE pairs
     extra = {}
@@ -84,23 +106,22 @@ def score(run_id, project, kaggle_score, rank, metric):
         click.echo("Error: provide at least one of --score, --rank, or --metric.", err=True)
         raise SystemExit(1)
 
-    # Update run summary
+    client = Client(echo=True)
     try:
-        api = wandb.Api()
-        run = api.run(run_path)
-    except Exception as e:
-        click.echo(f"Error: could not find W&B run '{run_path}': {e}", err=True)
+        result = asyncio.run(client.record_score(
+            kaggle_score, run_paths, output_dir=from_output, targets=target, rank=rank, metrics=extra,
+        ))
+    except KaggleWandbSyncError as e:
+        click.echo(f"Error: {e}", err=True)
         raise SystemExit(1)
 
-    updates = {'submitted': True}
-    if kaggle_score is not None:
-        updates['kaggle_score'] = kaggle_score
-    if rank is not None:
-        updates['kaggle_rank'] = rank
-    updates.update(extra)
+    for run_path in result.updated:
+        click.echo(f"Updated run: {run_path}")
+    for run_path, error in result.errors.items():
+        click.echo(f"Error: could not update W&B run '{run_path}': {error}", err=True)
+    if result.updated:
+        for k, v in result.updates.items():
+            click.echo(f"  {k} = {v}")
 
-    run.summary.update(updates)
-
-    click.echo(f"Updated run: {run.name} ({run_path})")
-    for k, v in updates.items():
-        click.echo(f"  {k} = {v}")
+    if not result.ok:
+        raise SystemExit(1)
@@ -1,63 +1,162 @@
 """kaggle-wandb-sync sync: Sync W&B offline runs to W&B cloud."""
 
-import subprocess
+import asyncio
+import json
+import tempfile
 from pathlib import Path
 
 import click
 
-from kaggle_wandb_sync._utils import find_wandb, normalize_path
+from kaggle_wandb_sync._compact import compact_runs
+from kaggle_wandb_sync._history import measured_throughput
+from kaggle_wandb_sync._plan import DEFAULT_THROUGHPUT, estimate_seconds, plan_runs
+from kaggle_wandb_sync._utils import dir_size, format_bytes, normalize_path
+from kaggle_wandb_sync.api import Client, KaggleWandbSyncError, find_offline_runs
 
 
 @click.command()
 @click.argument("output_dir", default="./kaggle_output")
-def sync(output_dir):
+@click.option("--timeout", type=float, default=None, help="Seconds to allow each 'wandb sync' before killing it (default: no limit).")
+@click.option("--kernel-id", "-k", default=None, help="Kernel ID to tag this sync with in the local history index.")
+@click.option("--max-history-points", type=click.IntRange(min=1), default=None, help="Compact before syncing: keep at most N evenly spaced history points per metric.")
+@click.option("--max-media-mb", type=click.FloatRange(min=0), default=None, help="Compact before syncing: drop media files larger than this many MB.")
+@click.option("--parallel", "-j", type=click.IntRange(min=1), default=1, show_default=True, help="Number of runs to sync concurrently (largest runs start first).")
+@click.option("--artifact", "artifacts", multiple=True, metavar="GLOB", help="After syncing, log output files matching GLOB (relative to OUTPUT_DIR; repeatable) as a W&B artifact of the latest run.")
+@click.option("--artifact-name", default=None, help="Artifact name (default: PROJECT-output).")
+@click.option("--artifact-jobs", type=click.IntRange(min=1), default=4, show_default=True, help="Maximum artifacts uploading at once.")
+@click.option("--plan", is_flag=True, default=False, help="Dry run: report runs, sizes and estimated upload time without syncing.")
+@click.option("--json", "as_json", is_flag=True, default=False, help="With --plan, print the plan as JSON.")
+def sync(output_dir, timeout, kernel_id, max_history_points, max_media_mb, parallel, artifacts, artifact_name, artifact_jobs, plan, as_json):
     """Sync W&B offline runs found in OUTPUT_DIR to W&B cloud.
 
     Searches OUTPUT_DIR recursively for offline-run-* directories and
     runs 'wandb sync' on each one.
 
+    With --max-history-points or --max-media-mb, each run is first rewritten
+    to a temporary compacted copy (downsampled history, merged summary
+    updates, oversized media dropped) and the copy is synced instead.
+    The downloaded runs are left untouched.
+
+    With --artifact, matching output files (submission.csv, OOF predictions,
+    model weights, ...) are then logged as a W&B artifact of each project's
+    latest run. Files are hashed in parallel and compared with the previous
+    artifact version, so only files that changed are uploaded.
+
+    --plan scans every run (record count, .wandb/media/total bytes, run ID)
+    and estimates upload time from the throughput of earlier syncs recorded
+    in the history index, without uploading anything. With the compaction
+    options, the runs are compacted to a temporary directory first and the
+    plan shows the compacted sizes.
+
     Requires WANDB_API_KEY environment variable (or prior 'wandb login').
     """
-    wandb_cmd = find_wandb()
-    if not wandb_cmd:
-        click.echo("Error: wandb command not found. Run: pip install wandb", err=True)
+    try:
+        offline_runs = find_offline_runs(output_dir)
+    except KaggleWandbSyncError as e:
+        click.echo(f"Error: {e}", err=True)
         raise SystemExit(1)
 
-    output_path = Path(normalize_path(output_dir))
-    if not output_path.exists():
-        click.echo(f"Error: {output_path} does not exist.", err=True)
+    if not offline_runs:
+        click.echo(f"No offline-run-* directories found in {normalize_path(output_dir)}/")
+        click.echo("Make sure the notebook used WANDB_MODE=offline before importing wandb.")
         raise SystemExit(1)
 
-    offline_runs = sorted(output_path.rglob("offline-run-*"))
-    offline_runs = [p for p in offline_runs if p.is_dir()]
+    if plan:
+        _print_plan(offline_runs, parallel, as_json, max_history_points, max_media_mb)
+        return
 
-    if not offline_runs:
-        click.echo(f"No offline-run-* directories found in {output_path}/")
-        click.echo("Make sure the notebook used WANDB_MODE=offline before importing wandb.")
+    client = Client(echo=True)
+    try:
+        result = asyncio.run(client.sync(
+            output_dir, timeout=timeout, kernel_id=kernel_id, max_history_points=max_history_points,
+            max_media_mb=max_media_mb, parallel=parallel,
+        ))
+    except KaggleWandbSyncError as e:
+        click.echo(f"Error: {e}", err=True)
+        raise SystemExit(1)
+
+    if result.failed:
+        click.echo(f"\nError: {len(result.failed)} run(s) failed to sync: {result.failed}", err=True)
         raise SystemExit(1)
 
-    click.echo(f"Found {len(offline_runs)} offline run(s):")
-    for run_dir in offline_runs:
-        click.echo(f"  {run_dir}")
-
-    failed = []
-    for run_dir in offline_runs:
-        click.echo(f"\nSyncing {run_dir.name}...")
-        result = subprocess.run(
-            [wandb_cmd, "sync", str(run_dir)],
-            capture_output=True,
-            text=True,
-        )
-        if result.stdout:
-            click.echo(result.stdout.rstrip())
-        if result.stderr:
-            click.echo(result.stderr.rstrip(), err=True)
-
-        if result.returncode != 0:
-            failed.append(run_dir.name)
+    click.echo(f"\nAll {len(result.synced)} run(s) synced successfully.")
+    if artifacts:
+        log_artifacts(output_dir, artifacts, artifact_name, artifact_jobs, kernel_id)
 
+
+def log_artifacts(output_dir, patterns, name=None, jobs=4, kernel_id=None):
+    """Log the output files matching patterns as W&B artifacts; exit 1 on failure."""
+    client = Client(echo=True)
+    try:
+        results = asyncio.run(client.log_artifacts(
+            output_dir, patterns, name=name, jobs=jobs, kernel_id=kernel_id,
+        ))
+    except KaggleWandbSyncError as e:
+        click.echo(f"Error: {e}", err=True)
+        raise SystemExit(1)
+
+    failed = [r for r in results if not r.ok]
     if failed:
-        click.echo(f"\nError: {len(failed)} run(s) failed to sync: {failed}", err=True)
+        click.echo(f"\nError: {len(failed)} artifact(s) failed to log.", err=True)
         raise SystemExit(1)
 
-    click.echo(f"\nAll {len(offline_runs)} run(s) synced successfully.")
+
+def _print_plan(offline_runs, parallel, as_json, max_history_points=None, max_media_mb=None):
+    """Print the sync plan (largest runs first) as a table or JSON.
+
+    With compaction options, the sizes are those of the compacted copies
+    that would actually be uploaded.
+    """
+    compacting = max_history_points is not None or max_media_mb is not None
+    with tempfile.TemporaryDirectory(prefix="kaggle-wandb-sync-") as tmpdir:
+        scanned = offline_runs
+        if compacting:
+            scanned = compact_runs(offline_runs, Path(tmpdir), max_history_points, max_media_mb)
+        originals = {str(copy): str(run_dir) for copy, run_dir in zip(scanned, offline_runs)}
+        plans = [p._replace(path=originals[p.path]) for p in plan_runs(scanned)]
+    original_bytes = sum(dir_size(run_dir) for run_dir in offline_runs)
+    measured = measured_throughput()
+    throughput = measured or DEFAULT_THROUGHPUT
+    sizes = [p.total_bytes for p in plans]
+    total_seconds = estimate_seconds(sizes, throughput)
+    parallel_seconds = estimate_seconds(sizes, throughput, parallel)
+
+    if as_json:
+        click.echo(json.dumps({
+            "runs": [
+                dict(p._asdict(), estimated_seconds=round(p.total_bytes / throughput, 1))
+                for p in plans
+            ],
+            "total_bytes": sum(sizes),
+            "compacted": compacting,
+            "original_bytes": original_bytes,
+            "throughput_bytes_per_s": round(throughput),
+            "throughput_measured": measured is not None,
+            "parallel": parallel,
+            "estimated_seconds": round(parallel_seconds, 1),
+        }, indent=2))
+        return
+
+    rows = [("RUN", "RUN ID", "RECORDS", ".WANDB", "MEDIA", "TOTAL", "EST.")]
+    for p in plans:
+        rows.append((
+            p.name,
+            p.run_id,
+            str(p.records) if p.records is not None else "?",
+            format_bytes(p.wandb_bytes),
+            format_bytes(p.media_bytes),
+            format_bytes(p.total_bytes),
+            f"{p.total_bytes / throughput:.0f}s",
+        ))
+    widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+    for r in rows:
+        click.echo("  ".join(c.ljust(w) for c, w in zip(r, widths)).rstrip())
+
+    source = "measured from earlier syncs" if measured else "default; no sync history yet"
+    click.echo(f"\n{len(plans)} run(s), {format_bytes(sum(sizes))} total", nl=not compacting)
+    if compacting:
+        click.echo(f" after compaction ({format_bytes(original_bytes)} before)")
+    click.echo(f"Throughput: {format_bytes(throughput)}/s ({source})")
+    click.echo(f"Estimated upload time: {total_seconds:.0f}s sequential", nl=parallel == 1)
+    if parallel > 1:
+        click.echo(f", {parallel_seconds:.0f}s with --parallel {parallel}")
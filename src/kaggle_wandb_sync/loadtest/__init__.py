@@ -0,0 +1,10 @@
+"""Fake Kaggle/W&B services and a load-test driver for kaggle-wandb-sync.
+
+    python -m kaggle_wandb_sync.loadtest                  # 10, 100 and 500 kernels
+    python -m kaggle_wandb_sync.loadtest -n 50 --error-rate 0.05
+    python -m kaggle_wandb_sync.loadtest --serve          # just run the fake server
+
+Nothing here talks to the real services. The package imports nothing on
+purpose: the kaggle/wandb shims import loadtest.shim on every invocation
+and must start fast.
+"""
@@ -0,0 +1,98 @@
+"""python -m kaggle_wandb_sync.loadtest: Load-test the pipeline against the fake services."""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+from kaggle_wandb_sync._utils import format_bytes
+from kaggle_wandb_sync.loadtest.driver import STAGES, run_load
+from kaggle_wandb_sync.loadtest.server import FakeServer, FaultConfig
+from kaggle_wandb_sync.loadtest.shim import write_shims
+
+
+_DEFAULTS = FaultConfig._field_defaults
+
+
+def _print_report(report) -> None:
+    failed = ", ".join(f"{stage}: {n}" for stage, n in report.failed.items()) or "none"
+    click.echo(
+        f"\n{report.kernels} kernel(s): {report.ok} OK, failed {failed}, {report.seconds:.1f}s wall"
+        f" — {report.kernels_per_second:.2f} kernels/s, {format_bytes(report.bytes_per_second)}/s"
+    )
+    rows = [("STAGE", "N", "P50", "P99", "RETRIES", "429", "5XX")]
+    for stage in STAGES:
+        s = report.stages[stage]
+        rows.append((stage, str(s.count), f"{s.p50:.2f}s", f"{s.p99:.2f}s",
+                     str(s.retries), str(s.rate_limited), str(s.server_errors)))
+    widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+    for r in rows:
+        click.echo("  " + "  ".join(c.ljust(w) for c, w in zip(r, widths)).rstrip())
+
+
+@click.command()
+@click.option("--kernels", "-n", "sizes", multiple=True, type=click.IntRange(min=1), default=(10, 100, 500), show_default=True, help="Number of kernels per round (repeatable).")
+@click.option("--concurrency", "-c", type=click.IntRange(min=1), default=64, show_default=True, help="Maximum kernels in flight at once.")
+@click.option("--poll-interval", type=float, default=0.5, show_default=True, help="Seconds between status checks.")
+@click.option("--run-seconds", type=float, default=_DEFAULTS["run_seconds"], show_default=True, help="How long each fake kernel runs.")
+@click.option("--output-kb", type=int, default=_DEFAULTS["output_kb"], show_default=True, help="Size of each kernel's output.")
+@click.option("--kaggle-rps", type=float, default=_DEFAULTS["kaggle_rps"], show_default=True, help="Kaggle rate limit in requests/s (0 = none).")
+@click.option("--wandb-rps", type=float, default=_DEFAULTS["wandb_rps"], show_default=True, help="W&B rate limit in requests/s (0 = none).")
+@click.option("--error-rate", type=click.FloatRange(0, 1), default=_DEFAULTS["error_rate"], show_default=True, help="Chance that a request starts a burst of 503s.")
+@click.option("--burst", type=click.IntRange(min=0), default=_DEFAULTS["burst"], show_default=True, help="Length of each 503 burst. Above 3, one burst can use up the score stage's retries.")
+@click.option("--transfer-kbps", type=float, default=_DEFAULTS["transfer_kbps"], show_default=True, help="Per-connection transfer speed in KB/s (0 = unthrottled).")
+@click.option("--latency-ms", type=float, default=_DEFAULTS["latency_ms"], show_default=True, help="Latency added to every request.")
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed for fault injection.")
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print the reports as JSON.")
+@click.option("--serve", is_flag=True, default=False, help="Only start the fake server (and shims) and wait for Ctrl-C.")
+@click.option("--port", type=int, default=0, help="Port for --serve (default: any free port).")
+def main(sizes, concurrency, poll_interval, run_seconds, output_kb, kaggle_rps, wandb_rps,
+         error_rate, burst, transfer_kbps, latency_ms, seed, as_json, serve, port):
+    """Run the push → poll → download → sync → score pipeline for many fake kernels.
+
+    Starts a local fake of the Kaggle kernels/submissions and W&B upload/summary
+    endpoints (rate limits, 429s, 5xx bursts, slow transfers), points
+    api.Client at it through kaggle/wandb shims, and reports throughput,
+    p50/p99 latency per stage and the retries each stage absorbed.
+    """
+    config = FaultConfig(kaggle_rps, wandb_rps, error_rate, burst, transfer_kbps, latency_ms, run_seconds, output_kb, seed)
+
+    if serve:
+        with FakeServer(config, port=port) as server, tempfile.TemporaryDirectory(prefix="kaggle-wandb-sync-shims-") as tmp:
+            write_shims(Path(tmp), server.url)
+            click.echo(f"Fake services listening on {server.url} (stats: {server.url}/stats)")
+            click.echo(f'Point the CLI at them with: export PATH="{tmp}:$PATH"')
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+        return
+
+    reports = []
+    for n in sizes:
+        click.echo(f"Running {n} kernel(s)...", err=as_json)
+        report = run_load(n, config, concurrency=concurrency, poll_interval=poll_interval)
+        reports.append(report)
+        if not as_json:
+            _print_report(report)
+
+    if as_json:
+        click.echo(json.dumps([
+            dict(
+                report._asdict(),
+                kernels_per_second=round(report.kernels_per_second, 3),
+                bytes_per_second=round(report.bytes_per_second),
+                stages={k: dict(v._asdict(), retries=v.retries) for k, v in report.stages.items()},
+            )
+            for report in reports
+        ], indent=2))
+
+    if any(report.failed for report in reports):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Drive many kernels through the async API against the fake server and measure it."""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import NamedTuple
+
+from kaggle_wandb_sync._history import HISTORY_ENV
+from kaggle_wandb_sync.api import Client
+from kaggle_wandb_sync.loadtest.server import FakeServer, FaultConfig
+from kaggle_wandb_sync.loadtest.shim import write_shims
+
+
+STAGES = ("push", "poll", "download", "sync", "score")
+
+# Server endpoints whose faults each stage absorbs (status checks before a
+# push are counted under poll).
+STAGE_ENDPOINTS = {
+    "push": ("push",),
+    "poll": ("status",),
+    "download": ("output",),
+    "sync": ("upload",),
+    "score": ("summary",),
+}
+
+
+class StageStats(NamedTuple):
+    """Latency percentiles of one stage over all kernels that reached it, plus faults absorbed."""
+
+    count: int
+    p50: float
+    p99: float
+    rate_limited: int  # 429 responses served
+    server_errors: int  # 5xx responses served
+
+    @property
+    def retries(self) -> int:
+        return self.rate_limited + self.server_errors
+
+
+class LoadReport(NamedTuple):
+    """Outcome of one load-test round."""
+
+    kernels: int
+    ok: int
+    failed: dict  # stage -> kernels that failed there
+    seconds: float
+    bytes: int  # downloaded + uploaded
+    stages: dict  # stage -> StageStats
+
+    @property
+    def kernels_per_second(self) -> float:
+        return self.ok / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile (q in 0-100) of values; 0.0 if empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))  # ceil
+    return ordered[int(rank) - 1]
+
+
+class _FakeWandbApi:
+    """Minimal wandb.Api() stand-in that writes summaries to the fake server."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def run(self, path):
+        url = f"{self.url}/wandb/summary/{path}"
+
+        class _Summary:
+            def update(self, values):
+                req = urllib.request.Request(url, data=json.dumps(values).encode(), method="POST")
+                urllib.request.urlopen(req, timeout=60).read()
+
+        class _Run:
+            summary = _Summary()
+
+        return _Run()
+
+
+async def _pipeline(client, api, kernel_id, root, poll_interval, max_attempts, limit, timings):
+    """push → poll → download → sync → score for one kernel; returns the failed stage or None."""
+    notebook = root / "notebooks" / kernel_id.replace("/", "__")
+    notebook.mkdir(parents=True)
+    (notebook / "kernel-metadata.json").write_text(json.dumps({"id": kernel_id}))
+    output_dir = root / "output" / kernel_id.replace("/", "__")
+
+    async with limit:
+        steps = (
+            ("push", lambda: client.push(notebook, wait_interval=poll_interval)),
+            ("poll", lambda: client.poll(kernel_id, interval=poll_interval, max_attempts=max_attempts)),
+            ("download", lambda: client.download(kernel_id, output_dir)),
+            ("sync", lambda: client.sync(output_dir, kernel_id=kernel_id)),
+            ("score", lambda: client.record_score(0.5, output_dir=output_dir, api=api)),
+        )
+        for stage, step in steps:
+            start = time.monotonic()
+            try:
+                result = await step()
+            except Exception:
+                return stage
+            timings[stage].append(time.monotonic() - start)
+            if not result.ok:
+                return stage
+    return None
+
+
+async def _run(n, server, shims, root, concurrency, poll_interval, max_attempts):
+    client = Client(kaggle_cmd=shims[0], wandb_cmd=shims[1])
+    api = _FakeWandbApi(server.url)
+    limit = asyncio.Semaphore(concurrency)
+    timings = {stage: [] for stage in STAGES}
+    kernel_ids = [f"loadtest/kernel-{i:04d}" for i in range(n)]
+    failures = await asyncio.gather(*(
+        _pipeline(client, api, k, root, poll_interval, max_attempts, limit, timings) for k in kernel_ids
+    ))
+    return failures, timings
+
+
+def run_load(
+    kernels: int,
+    config: FaultConfig = FaultConfig(),
+    concurrency: int = 64,
+    poll_interval: float = 0.5,
+    max_attempts: int = 600,
+) -> LoadReport:
+    """Start a fake server, run `kernels` pipelines through api.Client and report.
+
+    At most `concurrency` kernels are in flight at once. Everything (server,
+    shims, notebooks, outputs, history index) lives in a temporary directory.
+    """
+    previous_history = os.environ.get(HISTORY_ENV)
+    with tempfile.TemporaryDirectory(prefix="kaggle-wandb-sync-loadtest-") as tmp, FakeServer(config) as server:
+        root = Path(tmp)
+        os.environ[HISTORY_ENV] = str(root / "history.db")
+        try:
+            shims = write_shims(root / "bin", server.url)
+            start = time.monotonic()
+            failures, timings = asyncio.run(_run(kernels, server, shims, root, concurrency, poll_interval, max_attempts))
+            seconds = time.monotonic() - start
+        finally:
+            if previous_history is None:
+                os.environ.pop(HISTORY_ENV, None)
+            else:
+                os.environ[HISTORY_ENV] = previous_history
+        counters = server.stats()
+
+    failed = {}
+    for stage in failures:
+        if stage is not None:
+            failed[stage] = failed.get(stage, 0) + 1
+    stages = {}
+    for stage in STAGES:
+        endpoints = STAGE_ENDPOINTS[stage]
+        stages[stage] = StageStats(
+            count=len(timings[stage]),
+            p50=percentile(timings[stage], 50),
+            p99=percentile(timings[stage], 99),
+            rate_limited=sum(counters[e]["429"] for e in endpoints),
+            server_errors=sum(counters[e]["5xx"] for e in endpoints),
+        )
+    return LoadReport(
+        kernels=kernels,
+        ok=failures.count(None),
+        failed=failed,
+        seconds=seconds,
+        bytes=counters["output"]["bytes"] + counters["upload"]["bytes"],
+        stages=stages,
+    )
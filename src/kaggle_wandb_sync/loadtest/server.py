@@ -0,0 +1,285 @@
+"""Fake Kaggle kernels/submissions and W&B upload/summary endpoints with injected faults.
+
+Routes (all JSON unless noted):
+
+    POST /kaggle/kernels/push              {"id": kernel_id} → {"version": n}
+    GET  /kaggle/kernels/status?id=ID      → {"status": "RUNNING" | "COMPLETE"}
+    GET  /kaggle/kernels/output?id=ID      → output payload (octet-stream, throttled)
+    GET  /kaggle/submissions?c=SLUG        → submissions CSV
+    POST /wandb/files/ENTITY/PROJECT/RUN/PATH   file upload (body read throttled)
+    POST /wandb/summary/ENTITY/PROJECT/RUN      summary update
+    GET  /stats                            → per-endpoint request/fault counters
+
+A kernel reports RUNNING for run_seconds after each push. Every request
+passes through the same fault pipeline: fixed latency, a token-bucket
+rate limit per service (429 with Retry-After), and random bursts of 503s.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlparse
+
+
+ENDPOINTS = ("push", "status", "output", "submissions", "upload", "summary")
+_CHUNK = 16 * 1024
+
+
+class FaultConfig(NamedTuple):
+    """How badly the fake services behave. Zero disables a fault."""
+
+    kaggle_rps: float = 50.0  # rate limit for all /kaggle routes together
+    wandb_rps: float = 100.0  # rate limit for all /wandb routes together
+    error_rate: float = 0.01  # chance that a request starts a 5xx burst
+    # consecutive 503s per burst (per endpoint); the score stage retries a
+    # summary update 3 times (_runs.update_summaries), so a longer burst can
+    # fail it outright while the shims (8 attempts) still get through
+    burst: int = 3
+    transfer_kbps: float = 2048.0  # per-connection download/upload speed
+    latency_ms: float = 20.0  # added to every request
+    run_seconds: float = 2.0  # how long a pushed kernel stays RUNNING
+    output_kb: int = 256  # size of each kernel's output payload
+    seed: int = 0
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> float:
+        """Take a token; returns 0, or the seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class FakeServer:
+    """The fake services, served from a background thread.
+
+    Use as a context manager (or call start/stop); url is valid once started.
+    """
+
+    def __init__(self, config: FaultConfig = FaultConfig(), host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._buckets = {"kaggle": _TokenBucket(config.kaggle_rps), "wandb": _TokenBucket(config.wandb_rps)}
+        self._bursts = dict.fromkeys(ENDPOINTS, 0)
+        self._kernels = {}  # kernel_id -> (version, pushed_at)
+        self._summaries = {}
+        self._stats = {name: {"requests": 0, "ok": 0, "429": 0, "5xx": 0, "bytes": 0} for name in ENDPOINTS}
+
+        handler = type("Handler", (_Handler,), {"fake": self})
+        self._httpd = ThreadingHTTPServer((host, port), handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> dict:
+        """Per-endpoint counters: requests, ok, 429, 5xx, bytes."""
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._stats.items()}
+
+    def summaries(self) -> dict:
+        """Summary values written per run path."""
+        with self._lock:
+            return {path: dict(values) for path, values in self._summaries.items()}
+
+    # -- fault pipeline ----------------------------------------------------
+
+    def _admit(self, endpoint: str, service: str):
+        """Apply latency, rate limit and 5xx bursts; returns (status, retry_after) or None."""
+        if self.config.latency_ms:
+            time.sleep(self.config.latency_ms / 1000)
+        with self._lock:
+            self._stats[endpoint]["requests"] += 1
+        wait = self._buckets[service].take()
+        if wait:
+            self._count(endpoint, "429")
+            return 429, max(wait, 0.05)
+        with self._lock:
+            if not self._bursts[endpoint] and self._random.random() < self.config.error_rate:
+                self._bursts[endpoint] = self.config.burst
+            if self._bursts[endpoint]:
+                self._bursts[endpoint] -= 1
+                self._stats[endpoint]["5xx"] += 1
+                return 503, None
+        return None
+
+    def _count(self, endpoint: str, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[endpoint][key] += n
+
+    # -- service state -----------------------------------------------------
+
+    def _push(self, kernel_id: str) -> int:
+        with self._lock:
+            version = self._kernels.get(kernel_id, (0, 0))[0] + 1
+            self._kernels[kernel_id] = (version, time.monotonic())
+            return version
+
+    def _status(self, kernel_id: str) -> str | None:
+        with self._lock:
+            if kernel_id not in self._kernels:
+                return None
+            _, pushed_at = self._kernels[kernel_id]
+        return "COMPLETE" if time.monotonic() - pushed_at >= self.config.run_seconds else "RUNNING"
+
+    def _submissions_csv(self) -> str:
+        rows = ["fileName,date,description,status,publicScore,privateScore"]
+        with self._lock:
+            for i, kernel_id in enumerate(sorted(self._kernels)):
+                rows.append(f"submission.csv,2026-01-01,{kernel_id},complete,{0.5 + i / 1000:.3f},")
+        return "\n".join(rows) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake: FakeServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # keep load tests quiet
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers:
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status: int, data) -> None:
+        self._send(status, json.dumps(data).encode())
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if parts == ["stats"]:
+            return "stats", None, parts, query
+        if parts[:2] == ["kaggle", "kernels"] and len(parts) == 3 and parts[2] in ("push", "status", "output"):
+            return parts[2], "kaggle", parts, query
+        if parts == ["kaggle", "submissions"]:
+            return "submissions", "kaggle", parts, query
+        if parts[:2] == ["wandb", "files"] and len(parts) >= 6:
+            return "upload", "wandb", parts, query
+        if parts[:2] == ["wandb", "summary"] and len(parts) == 5:
+            return "summary", "wandb", parts, query
+        return None, None, parts, query
+
+    def _handle(self):
+        endpoint, service, parts, query = self._route()
+        length = int(self.headers.get("Content-Length") or 0)
+        if endpoint is None:
+            self.rfile.read(length)
+            return self._json(404, {"error": "not found"})
+        if endpoint == "stats":
+            return self._json(200, self.fake.stats())
+
+        fault = self.fake._admit(endpoint, service)
+        if fault is not None:
+            self.rfile.read(length)
+            status, retry_after = fault
+            headers = [("Retry-After", f"{retry_after:.2f}")] if retry_after else []
+            return self._send(status, b'{"error": "injected"}', headers=headers)
+
+        body = self._read_throttled(length, endpoint)
+        getattr(self, f"_do_{endpoint}")(parts, query, body)
+
+    do_GET = do_POST = _handle
+
+    def _read_throttled(self, length: int, endpoint: str) -> bytes:
+        chunks = []
+        remaining = length
+        while remaining:
+            chunk = self.rfile.read(min(_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            chunks.append(chunk)
+            self._throttle(len(chunk))
+        self.fake._count(endpoint, "bytes", length - remaining)
+        return b"".join(chunks)
+
+    def _throttle(self, n: int) -> None:
+        if self.fake.config.transfer_kbps:
+            time.sleep(n / (self.fake.config.transfer_kbps * 1024))
+
+    def _do_push(self, parts, query, body):
+        kernel_id = json.loads(body or b"{}").get("id", "")
+        if not kernel_id:
+            return self._json(400, {"error": "missing id"})
+        self.fake._count("push", "ok")
+        self._json(200, {"version": self.fake._push(kernel_id)})
+
+    def _do_status(self, parts, query, body):
+        status = self.fake._status(query.get("id", ""))
+        if status is None:
+            return self._json(404, {"error": "kernel not found"})
+        self.fake._count("status", "ok")
+        self._json(200, {"status": status})
+
+    def _do_output(self, parts, query, body):
+        if self.fake._status(query.get("id", "")) != "COMPLETE":
+            return self._json(404, {"error": "no output yet"})
+        size = self.fake.config.output_kb * 1024
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        chunk = b"\0" * _CHUNK
+        sent = 0
+        while sent < size:
+            n = min(_CHUNK, size - sent)
+            self.wfile.write(chunk[:n])
+            sent += n
+            self._throttle(n)
+        self.fake._count("output", "bytes", size)
+        self.fake._count("output", "ok")
+
+    def _do_submissions(self, parts, query, body):
+        self.fake._count("submissions", "ok")
+        self._send(200, self.fake._submissions_csv().encode(), content_type="text/csv")
+
+    def _do_upload(self, parts, query, body):
+        self.fake._count("upload", "ok")
+        self._json(200, {"uploaded": "/".join(parts[5:]), "bytes": len(body)})
+
+    def _do_summary(self, parts, query, body):
+        path = "/".join(parts[2:])
+        with self.fake._lock:
+            self.fake._summaries.setdefault(path, {}).update(json.loads(body or b"{}"))
+        self.fake._count("summary", "ok")
+        self._json(200, {"updated": path})
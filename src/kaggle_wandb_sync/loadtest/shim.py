@@ -0,0 +1,157 @@
+"""Stand-ins for the kaggle and wandb CLIs that talk to the fake server.
+
+write_shims() puts a kaggle and a wandb executable into a directory; pass
+their paths to api.Client (or put the directory first on PATH to drive the
+real CLI). They accept the subset of arguments kaggle-wandb-sync uses,
+print output in the same shape as the real tools, and retry 429s (honouring
+Retry-After) and 5xx/connection errors with jittered exponential backoff.
+"""
+
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+
+URL_ENV = "KAGGLE_WANDB_SYNC_FAKE_URL"
+MAX_ATTEMPTS = 8
+
+_SCRIPT = """#!{python}
+import sys
+sys.path.insert(0, {path!r})
+from kaggle_wandb_sync.loadtest.shim import main
+sys.exit(main({tool!r}, {url!r}, sys.argv[1:]))
+"""
+
+
+def write_shims(bin_dir: Path, url: str) -> tuple:
+    """Write kaggle/wandb shims for the server at url; returns their paths."""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    package_root = str(Path(__file__).resolve().parents[2])
+    paths = []
+    for tool in ("kaggle", "wandb"):
+        script = bin_dir / f"{tool}-shim.py"
+        script.write_text(_SCRIPT.format(python=sys.executable, path=package_root, tool=tool, url=url))
+        if os.name == "nt":
+            exe = bin_dir / f"{tool}.cmd"
+            exe.write_text(f'@"{sys.executable}" "{script}" %*\n')
+        else:
+            exe = bin_dir / tool
+            exe.write_text(script.read_text())
+            exe.chmod(0o755)
+            script.unlink()
+        paths.append(str(exe))
+    return tuple(paths)
+
+
+def run_id_for(kernel_id: str) -> str:
+    """Deterministic 8-character W&B run ID for a kernel's fake output."""
+    return hashlib.sha1(kernel_id.encode()).hexdigest()[:8]
+
+
+def _request(url: str, method: str = "GET", data: bytes | None = None, dest: Path | None = None) -> bytes:
+    """HTTP request with retries. With dest, the response body is streamed into it."""
+    headers = {"Content-Type": "application/octet-stream"} if data is not None else {}
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            req = urllib.request.Request(url, data=data, method=method, headers=headers)
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                if dest is None:
+                    return resp.read()
+                with open(dest, "wb") as f:
+                    while chunk := resp.read(64 * 1024):
+                        f.write(chunk)
+                return b""
+        except urllib.error.HTTPError as e:
+            retryable = e.code == 429 or e.code >= 500
+            if not retryable or attempt == MAX_ATTEMPTS:
+                raise
+            delay = float(e.headers.get("Retry-After") or 0) or min(2.0, 0.1 * 2 ** attempt)
+            reason = f"HTTP {e.code}"
+        except (urllib.error.URLError, ConnectionError) as e:
+            if attempt == MAX_ATTEMPTS:
+                raise
+            delay = min(2.0, 0.1 * 2 ** attempt)
+            reason = str(getattr(e, "reason", e))
+        delay *= random.uniform(0.5, 1.5)
+        print(f"retrying after {reason} in {delay:.2f}s ({attempt}/{MAX_ATTEMPTS})", flush=True)
+        time.sleep(delay)
+
+
+def _option(args: list, *names, default=None):
+    for name in names:
+        if name in args and args.index(name) + 1 < len(args):
+            return args[args.index(name) + 1]
+    return default
+
+
+def _kaggle(url: str, args: list) -> int:
+    if args[:2] == ["kernels", "push"]:
+        directory = Path(_option(args, "-p", "--path", default="."))
+        kernel_id = json.loads((directory / "kernel-metadata.json").read_text())["id"]
+        body = json.dumps({"id": kernel_id}).encode()
+        version = json.loads(_request(f"{url}/kaggle/kernels/push", "POST", body))["version"]
+        print(f"Kernel version {version} successfully pushed.  Please check progress at "
+              f"https://www.kaggle.com/code/{kernel_id}")
+        return 0
+
+    if args[:2] == ["kernels", "status"]:
+        kernel_id = args[2]
+        status = json.loads(_request(f"{url}/kaggle/kernels/status?id={kernel_id}"))["status"]
+        print(f'{kernel_id} has status "KernelWorkerStatus.{status}"')
+        return 0
+
+    if args[:2] == ["kernels", "output"]:
+        kernel_id = args[2]
+        dest = Path(_option(args, "-p", "--path", default="."))
+        run_id = run_id_for(kernel_id)
+        run_dir = dest / "wandb" / f"offline-run-20260101_000000-{run_id}"
+        (run_dir / "files").mkdir(parents=True, exist_ok=True)
+        _request(f"{url}/kaggle/kernels/output?id={kernel_id}", dest=run_dir / f"run-{run_id}.wandb")
+        user, slug = kernel_id.split("/", 1)
+        (run_dir / "files" / "wandb-metadata.json").write_text(
+            json.dumps({"entity": user, "project": slug, "run_id": run_id})
+        )
+        (dest / f"{slug}.log").write_text(json.dumps([{"stream_name": "stdout", "time": 0.1, "data": "done\n"}]))
+        print(f"Output file downloaded to {run_dir}")
+        return 0
+
+    if args[:3] == ["competitions", "submissions", "list"]:
+        slug = _option(args, "-c", default="")
+        print(_request(f"{url}/kaggle/submissions?c={slug}").decode(), end="")
+        return 0
+
+    print(f"fake kaggle: unsupported arguments {args}")
+    return 2
+
+
+def _wandb(url: str, args: list) -> int:
+    if args[:1] != ["sync"] or len(args) < 2:
+        print(f"fake wandb: unsupported arguments {args}")
+        return 2
+    run_dir = Path(args[-1])
+    meta_path = next(run_dir.rglob("wandb-metadata.json"), None)
+    meta = json.loads(meta_path.read_text()) if meta_path else {}
+    run_id = meta.get("run_id") or run_dir.name.rsplit("-", 1)[-1]
+    base = f"{url}/wandb/files/{meta.get('entity', 'fake')}/{meta.get('project', 'fake')}/{run_id}"
+    print(f"Syncing: https://wandb.ai/{meta.get('entity', 'fake')}/{meta.get('project', 'fake')}/runs/{run_id} ...")
+    for f in sorted(p for p in run_dir.rglob("*") if p.is_file()):
+        _request(f"{base}/{f.relative_to(run_dir).as_posix()}", "POST", f.read_bytes())
+    print("done.")
+    return 0
+
+
+def main(tool: str, url: str, args: list) -> int:
+    url = os.environ.get(URL_ENV, url)
+    try:
+        return _kaggle(url, args) if tool == "kaggle" else _wandb(url, args)
+    except urllib.error.HTTPError as e:
+        print(f"{e.code} Client Error: {e.reason} for url: {e.url}")
+    except (urllib.error.URLError, ConnectionError, OSError) as e:
+        print(f"Error: {e}")
+    return 1
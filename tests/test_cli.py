@@ -1,17 +1,45 @@
 """kaggle-wandb-sync CLI tests."""
 
+import asyncio
 import json
+import os
+import sqlite3
+import sys
+import threading
+import time
 
+import pytest
 from click.testing import CliRunner
 
 from kaggle_wandb_sync.cli import main
-from kaggle_wandb_sync._utils import parse_kernel_status, is_terminal, normalize_path
+from kaggle_wandb_sync._archive import read_manifest, restore_archive, write_archive
+from kaggle_wandb_sync._artifacts import changed_files, md5_b64, select_files
+from kaggle_wandb_sync._compact import compact_run
+from kaggle_wandb_sync._dag import Stage, run_stages_async
+from kaggle_wandb_sync._history import measured_throughput, query_events, record_event
+from kaggle_wandb_sync._plan import estimate_seconds
+from kaggle_wandb_sync._profile import Profiler, hotspots, timed
+from kaggle_wandb_sync._shard import assign_shards, notebook_weights, parse_shard
+from kaggle_wandb_sync._records import RecordWriter, find_wandb_file, iter_records, parse_record
+from kaggle_wandb_sync._runs import discover_runs, select_runs, update_summaries
+from kaggle_wandb_sync._utils import parse_kernel_status, parse_pushed_version, is_terminal, normalize_path, run_streaming
+from kaggle_wandb_sync.api import Client, KaggleWandbSyncError, ScoreResult, StageFailed, SyncResult
 from kaggle_wandb_sync.commands.score import _parse_run_path
+from kaggle_wandb_sync.loadtest.driver import _FakeWandbApi, percentile, run_load
+from kaggle_wandb_sync.loadtest.server import FakeServer, FaultConfig
 
 
 runner = CliRunner()
 
 
+@pytest.fixture(autouse=True)
+def history_db(tmp_path, monkeypatch):
+    """Keep every test's history index out of the real home directory."""
+    path = tmp_path / "history.db"
+    monkeypatch.setenv("KAGGLE_WANDB_SYNC_HISTORY", str(path))
+    return path
+
+
 def test_version():
     result = runner.invoke(main, ["--version"])
     assert result.exit_code == 0
@@ -58,6 +86,13 @@ class TestUtils:
     def test_is_terminal_empty(self):
         assert is_terminal("") is False
 
+    def test_parse_pushed_version(self):
+        raw = "Kernel version 7 successfully pushed.  Please check progress at https://..."
+        assert parse_pushed_version(raw) == 7
+
+    def test_parse_pushed_version_missing(self):
+        assert parse_pushed_version("Kernel push error: Notebook not found") is None
+
 
 class TestNormalizePath:
     def test_git_bash_c_drive(self):
@@ -83,6 +118,58 @@ class TestNormalizePath:
         assert normalize_path("/") == "/"
 
 
+class TestRunStreaming:
+    def test_streams_with_prefix(self, capsys):
+        result = run_streaming([sys.executable, "-c", "print('hello'); print('world')"], prefix="[x] ")
+        assert result.returncode == 0
+        assert result.tail == ["hello", "world"]
+        assert "[x] hello\n[x] world" in capsys.readouterr().out
+
+    def test_labels_stderr_and_keeps_exit_code(self):
+        code = "import sys; print('oops', file=sys.stderr); sys.exit(3)"
+        result = run_streaming([sys.executable, "-c", code], echo=False)
+        assert result.returncode == 3
+        assert result.tail == ["[stderr] oops"]
+
+    def test_failure_echoes_tail_to_stderr(self, capsys):
+        code = "import sys; print('step 1'); print('boom', file=sys.stderr); sys.exit(2)"
+        run_streaming([sys.executable, "-c", code], prefix="[x] ")
+        captured = capsys.readouterr()
+        assert "[x] step 1" in captured.out and "boom" not in captured.out
+        assert "[x] Exited with code 2; last 2 line(s) of output:" in captured.err
+        assert "[x]   [stderr] boom" in captured.err
+
+    @pytest.mark.skipif(os.name == "nt", reason="POSIX signals")
+    def test_signal_exit_code(self):
+        code = "import os, signal; os.kill(os.getpid(), signal.SIGTERM)"
+        result = run_streaming([sys.executable, "-c", code], echo=False)
+        assert result.returncode == 128 + 15
+
+    def test_tail_is_bounded(self):
+        code = "for i in range(100): print(i)"
+        result = run_streaming([sys.executable, "-c", code], tail_lines=5, echo=False)
+        assert result.tail == ["95", "96", "97", "98", "99"]
+
+    def test_timeout_kills_child(self):
+        code = "import time; time.sleep(30)"
+        result = run_streaming([sys.executable, "-c", code], timeout=0.5, echo=False)
+        assert result.timed_out is True
+        assert result.returncode != 0
+
+    def test_cancel_event_kills_child(self):
+        cancel = threading.Event()
+        threading.Timer(0.3, cancel.set).start()
+        code = "import time; time.sleep(30)"
+        result = run_streaming([sys.executable, "-c", code], cancel_event=cancel, echo=False)
+        assert result.cancelled is True
+        assert result.returncode != 0
+
+    def test_universal_newlines(self):
+        code = "import sys; sys.stdout.write('a\\r\\nb\\rc\\nd')"
+        result = run_streaming([sys.executable, "-c", code], echo=False)
+        assert result.tail == ["a", "b", "c", "d"]
+
+
 class TestParseRunPath:
     def test_full_url(self):
         url = "https://wandb.ai/test-user/my-project/runs/f75vzytz"
@@ -165,12 +252,115 @@ class TestPoll:
         assert "KERNEL_ID" in result.output
 
 
+FAKE_KAGGLE = """#!{python}
+import os, sys, time
+args = sys.argv[1:]
+if args[:2] == ["kernels", "output"]:
+    kernel_id, dest = args[2], args[4]
+    if kernel_id.endswith("/bad"):
+        print("404 Client Error: Not Found")
+        sys.exit(3)
+    for i in range(int(os.environ.get("FAKE_CHUNKS", "1"))):
+        with open(os.path.join(dest, "part%d.bin" % i), "wb") as f:
+            f.write(b"x" * int(os.environ.get("FAKE_CHUNK_BYTES", "1000")))
+        time.sleep(float(os.environ.get("FAKE_SLEEP", "0")))
+    print("Output file downloaded to " + dest)
+elif args[:2] == ["kernels", "status"]:
+    print('%s has status "KernelWorkerStatus.COMPLETE"' % args[2])
+elif args[:2] == ["kernels", "push"]:
+    print("Kernel version 3 successfully pushed.")
+elif args[:3] == ["competitions", "submissions", "list"]:
+    print("fileName,date,description,status,publicScore,privateScore")
+"""
+
+
+@pytest.fixture
+def fake_kaggle(tmp_path, monkeypatch):
+    """Put a scripted stand-in for the kaggle CLI first on PATH."""
+    if sys.platform == "win32":
+        pytest.skip("fake CLI needs a POSIX shebang")
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "kaggle"
+    script.write_text(FAKE_KAGGLE.format(python=sys.executable))
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ.get("PATH", ""))
+    return script
+
+
 class TestOutput:
     def test_help(self):
         result = runner.invoke(main, ["output", "--help"])
         assert result.exit_code == 0
         assert "KERNEL_ID" in result.output
 
+    def test_single_kernel_into_output_dir(self, tmp_path, fake_kaggle):
+        out = tmp_path / "out"
+        result = runner.invoke(main, ["output", "me/a", "-o", str(out)])
+        assert result.exit_code == 0
+        assert (out / "part0.bin").exists()
+        assert "Downloaded 1 file(s)" in result.output
+
+    def test_many_kernels_into_subdirs(self, tmp_path, fake_kaggle):
+        out = tmp_path / "out"
+        result = runner.invoke(main, ["output", "me/a", "me/b", "me/bad", "-o", str(out), "-j", "3"])
+        assert result.exit_code == 3  # the failed download's own exit code
+        assert (out / "me__a" / "part0.bin").exists()
+        assert (out / "me__b" / "part0.bin").exists()
+        assert "2/3 kernel(s) downloaded" in result.output
+        assert "FAILED" in result.output
+
+    def test_redownload_counts_replaced_files(self, tmp_path, fake_kaggle):
+        out = tmp_path / "out"
+        for _ in range(2):
+            result = asyncio.run(Client().download("me/a", out))
+            assert (result.files, result.bytes) == (1, 1000)
+        assert [p.name for p in out.iterdir()] == ["part0.bin"]  # no staging dir left behind
+
+    def test_repeated_kernel_is_rejected(self, tmp_path, fake_kaggle):
+        result = runner.invoke(main, ["output", "me/a", "me/a", "-o", str(tmp_path / "out")])
+        assert result.exit_code == 1
+        assert "given more than once: me/a" in result.output
+
+    def test_output_names_final_destination(self, tmp_path, fake_kaggle):
+        out = tmp_path / "out"
+        result = runner.invoke(main, ["output", "me/a", "-o", str(out)])
+        assert f"Output file downloaded to {out}\n" in result.output
+        assert ".kaggle-wandb-sync-download-" not in result.output
+
+    def test_staging_dirs_of_live_downloads_are_kept(self, tmp_path):
+        from kaggle_wandb_sync._transfer import STAGING_PREFIX, make_staging_dir, release_staging_dir
+
+        dead = tmp_path / f"{STAGING_PREFIX}999999999-x"  # no such process
+        live = tmp_path / f"{STAGING_PREFIX}{os.getppid()}-x"
+        dead.mkdir()
+        live.mkdir()
+        first = make_staging_dir(tmp_path)
+        second = make_staging_dir(tmp_path)
+        assert first.exists() and second.exists() and live.exists()
+        assert not dead.exists()
+        release_staging_dir(first)
+        release_staging_dir(second)
+        assert sorted(tmp_path.iterdir()) == [live]
+
+    def test_disk_budget_skips_remaining(self, tmp_path, fake_kaggle, monkeypatch):
+        monkeypatch.setenv("FAKE_CHUNK_BYTES", str(300 * 1024))
+        out = tmp_path / "out"
+        result = runner.invoke(main, ["output", "me/a", "me/b", "-o", str(out), "-j", "1", "--max-total-mb", "0.2"])
+        assert result.exit_code == 1
+        assert "SKIPPED" in result.output
+        assert not (out / "me__b" / "part0.bin").exists()
+
+    def test_disk_budget_aborts_in_flight(self, tmp_path, fake_kaggle, monkeypatch):
+        monkeypatch.setenv("FAKE_CHUNKS", "50")
+        monkeypatch.setenv("FAKE_CHUNK_BYTES", str(100 * 1024))
+        monkeypatch.setenv("FAKE_SLEEP", "0.05")
+        out = tmp_path / "out"
+        result = runner.invoke(main, ["output", "me/a", "me/b", "-o", str(out), "--max-total-mb", "1"])
+        assert result.exit_code == 1
+        assert "ABORTED" in result.output
+        assert not list(out.rglob("*.bin"))  # partial downloads cleaned up
+
 
 class TestSync:
     def test_missing_dir(self, tmp_path):
@@ -189,3 +379,986 @@ class TestRun:
         result = runner.invoke(main, ["run", str(tmp_path)])
         assert result.exit_code == 1
         assert "not found" in result.output
+
+    def _make_notebook(self, tmp_path):
+        nb = tmp_path / "nb"
+        nb.mkdir()
+        (nb / "kernel-metadata.json").write_text(json.dumps({"id": "me/nb"}))
+        return nb
+
+    def test_competition_flow_stops_when_sync_fails(self, tmp_path, fake_kaggle, monkeypatch):
+        import kaggle_wandb_sync.api as api_module
+
+        (fake_kaggle.parent / "wandb").write_text(f"#!{sys.executable}\nimport sys; sys.exit(1)\n")
+        (fake_kaggle.parent / "wandb").chmod(0o755)
+        stopped = []
+
+        def wait_for_new_score(*args, cancel_event=None, **kwargs):
+            stopped.append(cancel_event.wait(10))
+            return None
+
+        monkeypatch.setattr(api_module, "wait_for_new_score", wait_for_new_score)
+        nb = self._make_notebook(tmp_path)
+        result = runner.invoke(main, [
+            "run", str(nb), "-o", str(tmp_path / "out"), "--poll-interval", "0", "--competition-slug", "comp",
+        ])
+        assert result.exit_code == 1
+        assert stopped in ([], [True])
+        assert "[watch] FAILED" in result.output
+        assert "[record] skipped (sync did not succeed)" in result.output
+
+    def test_competition_watch_overlaps_sync(self, tmp_path, fake_kaggle, monkeypatch):
+        import kaggle_wandb_sync.api as api_module
+
+        watching = threading.Event()
+        monkeypatch.setattr(api_module, "wait_for_new_score", lambda *a, **k: watching.set() or "0.5")
+
+        async def sync(self, output_dir, kernel_id=None, **kwargs):
+            await asyncio.to_thread(watching.wait, 10)
+            return SyncResult(["r1"] if watching.is_set() else [], [] if watching.is_set() else ["r1"], 0, 0.0)
+
+        async def record_score(self, score, output_dir=None, targets=("all",)):
+            return ScoreResult({"kaggle_score": score}, ["me/proj/r1"], {})
+
+        monkeypatch.setattr(Client, "sync", sync)
+        monkeypatch.setattr(Client, "record_score", record_score)
+        nb = self._make_notebook(tmp_path)
+        result = runner.invoke(main, [
+            "run", str(nb), "-o", str(tmp_path / "out"), "--poll-interval", "0", "--competition-slug", "comp",
+        ])
+        assert result.exit_code == 0, result.output
+        assert "me/proj/r1: kaggle_score = 0.5" in result.output
+
+    def test_competition_flow_records_score(self, tmp_path, fake_kaggle, monkeypatch):
+        import kaggle_wandb_sync.api as api_module
+
+        recorded = []
+        monkeypatch.setattr(api_module, "wait_for_new_score", lambda *a, **k: "0.91")
+        async def record_score(self, score, output_dir=None, targets=("all",)):
+            recorded.append((score, output_dir, targets))
+            return ScoreResult({"kaggle_score": score}, ["me/proj/r1"], {})
+
+        monkeypatch.setattr(Client, "record_score", record_score)
+        nb = self._make_notebook(tmp_path)
+        out = tmp_path / "out"
+        result = runner.invoke(main, [
+            "run", str(nb), "-o", str(out), "--poll-interval", "0", "--skip-sync", "--competition-slug", "comp",
+            "--result-file", str(tmp_path / "result.json"),
+        ])
+        assert result.exit_code == 0, result.output
+        assert "Current submission count: 0" in result.output
+        assert recorded == [(0.91, str(out), ("all",))]
+        assert "me/proj/r1: kaggle_score = 0.91" in result.output
+        kernel = json.loads((tmp_path / "result.json").read_text())["kernels"][0]
+        assert kernel["score"] == 0.91
+        assert set(kernel["stages"]) == {"baseline", "push", "poll", "output", "watch", "record"}
+
+
+class TestHistory:
+    def test_record_and_query(self):
+        record_event("run", kernel_id="me/a", version=3, status="OK", duration=120.0,
+                     stages={"poll": 100.0, "sync": 20.0}, run_ids=["abc123"])
+        events = query_events(kernel_id="me/a")
+        assert len(events) == 1
+        assert events[0]["version"] == 3
+        assert events[0]["stages"] == {"poll": 100.0, "sync": 20.0}
+        assert events[0]["run_ids"] == ["abc123"]
+
+    def test_filter_and_sort(self):
+        record_event("score", kernel_id="me/a", score=0.5)
+        record_event("score", kernel_id="me/a", score=0.9)
+        record_event("poll", kernel_id="me/a", duration=10.0)
+        record_event("score", kernel_id="me/b", score=0.7)
+        events = query_events(kernel_id="me/a", command="score", sort="score")
+        assert [e["score"] for e in events] == [0.9, 0.5]
+        events = query_events(command="score", sort="score", descending=False, limit=2)
+        assert [e["score"] for e in events] == [0.5, 0.7]
+
+    def test_disabled(self, monkeypatch, history_db):
+        monkeypatch.setenv("KAGGLE_WANDB_SYNC_HISTORY", "off")
+        record_event("run", kernel_id="me/a")
+        assert not history_db.exists()
+        assert query_events() == []
+
+    def test_command_table(self):
+        record_event("run", kernel_id="me/a", version=2, status="OK", duration=754.0, score=0.25,
+                     stages={"poll": 700.0})
+        result = runner.invoke(main, ["history", "-k", "me/a"])
+        assert result.exit_code == 0
+        assert "me/a" in result.output
+        assert "12m34s" in result.output
+        assert "poll=11m40s" in result.output
+
+    def test_command_shows_run_upload_times(self):
+        record_event("sync", kernel_id="me/a", status="OK", run_ids=["r1"], run_seconds={"r1": 65.0})
+        result = runner.invoke(main, ["history", "-k", "me/a"])
+        assert result.exit_code == 0
+        assert "r1=1m05s" in result.output
+        assert query_events()[0]["stages"] == {}
+
+    def test_migrates_old_index(self, history_db):
+        history_db.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(history_db))
+        conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, recorded_at REAL NOT NULL,"
+                     " command TEXT NOT NULL, kernel_id TEXT, version INTEGER, status TEXT, duration REAL,"
+                     " bytes INTEGER, score REAL, stages TEXT, run_ids TEXT)")
+        conn.commit()
+        conn.close()
+        record_event("sync", status="OK", run_seconds={"r1": 2.0})
+        assert query_events()[0]["run_seconds"] == {"r1": 2.0}
+
+    def test_command_corrupt_index(self, history_db):
+        history_db.parent.mkdir(parents=True, exist_ok=True)
+        history_db.write_bytes(b"this is not a sqlite database" * 100)
+        result = runner.invoke(main, ["history"])
+        assert result.exit_code == 1
+        assert "Error: could not read the history index" in result.output
+        assert result.exception is None or isinstance(result.exception, SystemExit)
+
+    def test_command_json(self):
+        record_event("sync", kernel_id="me/a", status="OK", run_ids=["r1", "r2"])
+        result = runner.invoke(main, ["history", "--json"])
+        assert result.exit_code == 0
+        assert json.loads(result.output)[0]["run_ids"] == ["r1", "r2"]
+
+    def test_command_empty(self):
+        result = runner.invoke(main, ["history"])
+        assert result.exit_code == 0
+        assert "No matching events" in result.output
+
+
+def _make_offline_run(root, run_id="abc123", steps=50, media_bytes=0, extra_records=(),
+                      group="", job_type="", tags=(), started="20260101_000000", entity="me"):
+    """Write a minimal offline-run-* directory with a real .wandb record stream."""
+    from wandb.proto import wandb_internal_pb2 as pb
+
+    run_dir = root / f"offline-run-{started}-{run_id}"
+    (run_dir / "files").mkdir(parents=True)
+    with RecordWriter(run_dir / f"run-{run_id}.wandb") as w:
+        rec = pb.Record()
+        rec.run.run_id = run_id
+        rec.run.entity = entity
+        rec.run.project = "proj"
+        rec.run.run_group = group
+        rec.run.job_type = job_type
+        rec.run.tags.extend(tags)
+        w.write(rec.SerializeToString())
+        for step in range(steps):
+            rec = pb.Record()
+            for key, value in (("_step", step), ("loss", 1 / (step + 1))):
+                item = rec.history.item.add()
+                item.nested_key.append(key)
+                item.value_json = json.dumps(value)
+            w.write(rec.SerializeToString())
+            rec = pb.Record()
+            item = rec.summary.update.add()
+            item.nested_key.append("loss")
+            item.value_json = json.dumps(1 / (step + 1))
+            w.write(rec.SerializeToString())
+        if media_bytes:
+            media = run_dir / "files" / "media" / "images" / "big.png"
+            media.parent.mkdir(parents=True)
+            media.write_bytes(b"x" * media_bytes)
+            rec = pb.Record()
+            rec.files.files.add().path = "media/images/big.png"
+            w.write(rec.SerializeToString())
+        for extra in extra_records:
+            w.write(extra.SerializeToString())
+    (run_dir / f"run-{run_id}.wandb.syncstate").write_text("{}")
+    return run_dir
+
+
+class TestRecords:
+    def test_roundtrip_across_blocks(self, tmp_path):
+        payloads = [b"a" * 10, b"b" * 70000, b"", b"c" * 32761, b"d"]
+        path = tmp_path / "run-x.wandb"
+        with RecordWriter(path) as w:
+            for p in payloads:
+                w.write(p)
+        assert list(iter_records(path)) == payloads
+
+    def test_truncated_tail_is_ignored(self, tmp_path):
+        path = tmp_path / "run-x.wandb"
+        with RecordWriter(path) as w:
+            w.write(b"first")
+            w.write(b"second" * 100)
+        path.write_bytes(path.read_bytes()[:-50])
+        assert list(iter_records(path)) == [b"first"]
+
+    def test_bad_header(self, tmp_path):
+        path = tmp_path / "run-x.wandb"
+        path.write_bytes(b"not a wandb file")
+        with pytest.raises(ValueError):
+            list(iter_records(path))
+
+
+class TestCompact:
+    def test_downsamples_history_and_merges_summary(self, tmp_path):
+        run_dir = _make_offline_run(tmp_path / "src", steps=50)
+        result = compact_run(run_dir, tmp_path / "dst", max_history_points=5)
+        assert result.history_before == 50
+        assert result.history_after == 5
+        assert result.bytes_saved > 0
+
+        out = find_wandb_file(tmp_path / "dst" / run_dir.name)
+        records = [parse_record(d) for d in iter_records(out)]
+        steps = [json.loads(r.history.item[0].value_json) for r in records if r.HasField("history")]
+        assert steps[0] == 0 and steps[-1] == 49
+        summaries = [r for r in records if r.HasField("summary")]
+        assert len(summaries) == 1
+        assert json.loads(summaries[0].summary.update[0].value_json) == 1 / 50
+        assert records[0].run.run_id == "abc123"
+        assert not (tmp_path / "dst" / run_dir.name / "run-abc123.wandb.syncstate").exists()
+
+    def test_drops_oversized_media(self, tmp_path):
+        run_dir = _make_offline_run(tmp_path / "src", steps=3, media_bytes=2048)
+        result = compact_run(run_dir, tmp_path / "dst", max_media_bytes=1024)
+        assert result.media_dropped == ["media/images/big.png"]
+        copy = tmp_path / "dst" / run_dir.name
+        assert not (copy / "files" / "media" / "images" / "big.png").exists()
+        records = [parse_record(d) for d in iter_records(find_wandb_file(copy))]
+        assert not any(r.HasField("files") for r in records)
+        assert result.history_after == 3
+        # original untouched
+        assert (run_dir / "files" / "media" / "images" / "big.png").exists()
+
+    def test_drops_references_to_dropped_media(self, tmp_path):
+        from wandb.proto import wandb_internal_pb2 as pb
+
+        image = json.dumps({"_type": "image-file", "path": "media/images/big.png", "size": 2048})
+        extra = []
+        for step, value in ((3, image), (4, json.dumps({"_type": "images/separated", "filenames": ["media/images/big.png"]}))):
+            rec = pb.Record()
+            for key, v in (("_step", str(step)), ("samples", value)):
+                item = rec.history.item.add()
+                item.nested_key.append(key)
+                item.value_json = v
+            extra.append(rec)
+        rec = pb.Record()
+        for key, v in (("_step", "5"), ("samples", image), ("acc", "0.9")):
+            item = rec.history.item.add()
+            item.nested_key.append(key)
+            item.value_json = v
+        extra.append(rec)
+        rec = pb.Record()
+        item = rec.summary.update.add()
+        item.nested_key.append("samples")
+        item.value_json = image
+        extra.append(rec)
+
+        run_dir = _make_offline_run(tmp_path / "src", steps=3, media_bytes=2048, extra_records=extra)
+        result = compact_run(run_dir, tmp_path / "dst", max_media_bytes=1024)
+        records = [parse_record(d) for d in iter_records(find_wandb_file(tmp_path / "dst" / run_dir.name))]
+        values = [i.value_json for r in records if r.HasField("history") for i in r.history.item]
+        values += [i.value_json for r in records if r.HasField("summary") for i in r.summary.update]
+        assert not any("big.png" in v for v in values)
+        assert result.history_after == 4  # media-only rows dropped, the row with acc kept
+        summary = [r for r in records if r.HasField("summary")][0].summary
+        assert [list(i.nested_key) for i in summary.remove] == [["samples"]]
+
+
+class TestSyncPlan:
+    def test_plan_table_sorted_largest_first(self, tmp_path):
+        _make_offline_run(tmp_path, run_id="small", steps=2)
+        _make_offline_run(tmp_path, run_id="large", steps=2, media_bytes=50000)
+        result = runner.invoke(main, ["sync", str(tmp_path), "--plan"])
+        assert result.exit_code == 0
+        assert result.output.index("large") < result.output.index("small")
+        assert "no sync history yet" in result.output
+        assert "Syncing" not in result.output
+
+    def test_plan_json_uses_measured_throughput(self, tmp_path):
+        _make_offline_run(tmp_path, run_id="r1", steps=3)
+        record_event("sync", status="OK", num_bytes=1000, duration=2.0)
+        result = runner.invoke(main, ["sync", str(tmp_path), "--plan", "--json"])
+        assert result.exit_code == 0
+        plan = json.loads(result.output)
+        assert plan["throughput_measured"] is True
+        assert plan["throughput_bytes_per_s"] == 500
+        run = plan["runs"][0]
+        assert run["run_id"] == "r1"
+        assert run["records"] == 1 + 3 * 2
+        assert run["estimated_seconds"] == round(run["total_bytes"] / 500, 1)
+
+    def test_measured_throughput_ignores_failed(self):
+        assert measured_throughput() is None
+        record_event("sync", status="FAILED", num_bytes=1000, duration=1.0)
+        assert measured_throughput() is None
+        record_event("sync", status="OK", num_bytes=3000, duration=1.0)
+        record_event("sync", status="OK", num_bytes=1000, duration=1.0)
+        assert measured_throughput() == 2000
+
+    def test_measured_throughput_is_per_upload(self):
+        # a --parallel 2 sync: 4000 bytes in 1s of wall time, but each upload took 2s
+        record_event("sync", status="OK", num_bytes=4000, duration=1.0, run_seconds={"r1": 2.0, "r2": 2.0})
+        assert measured_throughput() == 1000
+
+    def test_plan_uses_compacted_sizes(self, tmp_path):
+        run_dir = _make_offline_run(tmp_path, run_id="r1", steps=50, media_bytes=50000)
+        result = runner.invoke(main, ["sync", str(tmp_path), "--plan", "--json", "--max-media-mb", "0.01"])
+        assert result.exit_code == 0, result.output
+        plan = json.loads(result.output)
+        assert plan["compacted"] is True
+        assert plan["total_bytes"] < plan["original_bytes"] - 50000 + 1
+        assert plan["runs"][0]["media_bytes"] == 0
+        assert plan["runs"][0]["path"] == str(run_dir)
+
+    def test_estimate_parallel_largest_first(self):
+        assert estimate_seconds([], 1.0) == 0.0
+        assert estimate_seconds([4, 3, 3], 1.0) == 10
+        assert estimate_seconds([4, 3, 3], 1.0, workers=2) == 6
+
+
+class TestStages:
+    def _run(self, stages, cancel_event=None):
+        return asyncio.run(run_stages_async(stages, cancel_event=cancel_event, echo=False))
+
+    def test_dependencies_and_values(self):
+        order = []
+
+        async def c():
+            order.append("c")
+            return 3
+
+        stages = [
+            Stage("a", lambda: order.append("a") or 1),
+            Stage("b", lambda: order.append("b") or 2, deps=("a",)),
+            Stage("c", c, deps=("b",)),
+        ]
+        results = self._run(stages)
+        assert order == ["a", "b", "c"]
+        assert [r.value for r in results.values()] == [1, 2, 3]
+        assert all(r.status == "OK" for r in results.values())
+
+    def test_independent_stages_overlap(self):
+        barrier = threading.Barrier(2, timeout=5)
+        started = []
+
+        async def waiter():
+            started.append(1)
+            while len(started) < 2:  # never ends if the coroutine stages ran one after another
+                await asyncio.sleep(0.01)
+
+        stages = [
+            Stage("x", barrier.wait),  # threads: BrokenBarrierError if run sequentially
+            Stage("y", barrier.wait),
+            Stage("p", waiter),
+            Stage("q", waiter),
+        ]
+        results = asyncio.run(asyncio.wait_for(run_stages_async(stages, echo=False), 5))
+        assert all(r.status == "OK" for r in results.values())
+
+    def test_failure_skips_dependents_only(self):
+        def fail():
+            raise SystemExit(2)
+
+        stages = [
+            Stage("push", fail),
+            Stage("poll", lambda: None, deps=("push",)),
+            Stage("output", lambda: None, deps=("poll",)),
+            Stage("baseline", lambda: 5),
+        ]
+        results = self._run(stages)
+        assert results["push"].status == "FAILED"
+        assert results["push"].error.code == 2
+        assert results["poll"].status == "SKIPPED"
+        assert results["output"].status == "SKIPPED"
+        assert results["baseline"].status == "OK"
+
+    def test_interrupt_cancels_running_stages(self):
+        cancel = threading.Event()
+        cancelled = []
+
+        async def interrupt():
+            await asyncio.sleep(0.1)
+            raise KeyboardInterrupt
+
+        async def slow_task():
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.append("task")
+                raise
+
+        stages = [
+            Stage("slow", lambda: cancel.wait(30)),
+            Stage("slow-task", slow_task),
+            Stage("ctrl-c", interrupt),
+            Stage("later", lambda: pytest.fail("should not start"), deps=("slow",)),
+        ]
+        start = time.monotonic()
+        with pytest.raises(KeyboardInterrupt):
+            self._run(stages, cancel_event=cancel)
+        assert time.monotonic() - start < 5
+        assert cancel.is_set()
+        assert cancelled == ["task"]
+
+    def test_unknown_dependency(self):
+        with pytest.raises(ValueError):
+            self._run([Stage("a", lambda: None, deps=("missing",))])
+
+    def test_cycle(self):
+        with pytest.raises(ValueError):
+            self._run([Stage("a", lambda: None, deps=("b",)), Stage("b", lambda: None, deps=("a",))])
+
+
+class _FakeApi:
+    """Stand-in for wandb.Api() that records summary updates."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.updated = {}
+        self.lock = threading.Lock()
+
+    def run(self, path):
+        api = self
+
+        class _Summary:
+            def update(self, values):
+                with api.lock:
+                    if api.failures:
+                        api.failures -= 1
+                        raise ConnectionError("429 Too Many Requests")
+                    api.updated[path] = values
+
+        class _Run:
+            summary = _Summary()
+
+        return _Run()
+
+
+class TestScoreTargets:
+    def _make_runs(self, tmp_path):
+        _make_offline_run(tmp_path, run_id="f0", steps=1, group="cv", job_type="fold", tags=("fold0",), started="20260101_000000")
+        _make_offline_run(tmp_path, run_id="f1", steps=1, group="cv", job_type="fold", tags=("fold1",), started="20260101_000100")
+        _make_offline_run(tmp_path, run_id="ens", steps=1, group="cv", job_type="ensemble", started="20260101_000200")
+
+    def test_discover_runs(self, tmp_path):
+        self._make_runs(tmp_path)
+        runs = discover_runs(tmp_path)
+        assert [r.path for r in runs] == ["me/proj/f0", "me/proj/f1", "me/proj/ens"]
+        assert runs[0].tags == ("fold0",)
+
+    def test_entity_from_metadata(self, tmp_path):
+        run_dir = _make_offline_run(tmp_path, run_id="r1", steps=1, entity="")
+        assert [r.path for r in discover_runs(tmp_path)] == ["proj/r1"]
+        meta = {"entity": "team", "project": "proj", "run_id": "r1"}
+        (run_dir / "files" / "wandb-metadata.json").write_text(json.dumps(meta))
+        assert [r.path for r in discover_runs(tmp_path)] == ["team/proj/r1"]
+
+    def test_select_runs(self, tmp_path):
+        self._make_runs(tmp_path)
+        runs = discover_runs(tmp_path)
+        assert len(select_runs(runs, ("all",))) == 3
+        assert [r.run_id for r in select_runs(runs, ("latest",))] == ["ens"]
+        assert [r.run_id for r in select_runs(runs, ("job_type=fold",))] == ["f0", "f1"]
+        assert [r.run_id for r in select_runs(runs, ("group=cv", "tag=fold1"))] == ["f1"]
+        with pytest.raises(ValueError):
+            select_runs(runs, ("color=red",))
+
+    def test_update_summaries_retries(self):
+        api = _FakeApi(failures=2)
+        errors = update_summaries(["a/b/1", "a/b/2", "a/b/3"], {"kaggle_score": 0.5}, api=api, backoff=0)
+        assert errors == {"a/b/1": None, "a/b/2": None, "a/b/3": None}
+        assert set(api.updated) == {"a/b/1", "a/b/2", "a/b/3"}
+
+    def test_update_summaries_gives_up(self):
+        api = _FakeApi(failures=100)
+        errors = update_summaries(["a/b/1"], {"kaggle_score": 0.5}, api=api, retries=2, backoff=0)
+        assert isinstance(errors["a/b/1"], ConnectionError)
+
+    def test_update_summaries_does_not_retry_missing_runs(self):
+        from wandb.errors import CommError
+
+        calls = []
+
+        class Api:
+            def run(self, path):
+                calls.append(path)
+                missing = ValueError(f"Could not find run {path}")
+                raise CommError(str(missing), missing)
+
+        errors = update_summaries(["a/b/1"], {"kaggle_score": 0.5}, api=Api(), backoff=10)
+        assert isinstance(errors["a/b/1"], CommError)
+        assert calls == ["a/b/1"]
+
+    def test_invalid_target_option(self, tmp_path):
+        result = runner.invoke(main, ["score", "--from-output", str(tmp_path), "--target", "bogus", "--score", "0.1"])
+        assert result.exit_code == 2
+        assert "invalid target" in result.output
+
+    def test_no_run_ids(self):
+        result = runner.invoke(main, ["score", "--score", "0.1"])
+        assert result.exit_code == 1
+        assert "--from-output" in result.output
+
+
+class TestArchive:
+    def _make_runs(self, root):
+        a = _make_offline_run(root / "wandb", run_id="r1", steps=20, media_bytes=5000, started="20260101_000000")
+        b = _make_offline_run(root / "wandb", run_id="r2", steps=30, media_bytes=5000, started="20260101_000100")
+        (a / "logs").mkdir()
+        (a / "logs" / "debug.log").write_text("noise")
+        return a, b
+
+    def test_dedup_and_manifest(self, tmp_path):
+        self._make_runs(tmp_path / "out")
+        dest = tmp_path / "arch" / "me__nb__v3.tar.gz"
+        manifest = write_archive(tmp_path / "out", dest, "me/nb", 3)
+        assert [r["run_id"] for r in manifest["runs"]] == ["r1", "r2"]
+        # identical media and syncstate in r2 are stored as links to r1's copies
+        assert manifest["links"] == {
+            "wandb/offline-run-20260101_000100-r2/files/media/images/big.png":
+                "wandb/offline-run-20260101_000000-r1/files/media/images/big.png",
+            "wandb/offline-run-20260101_000100-r2/run-r2.wandb.syncstate":
+                "wandb/offline-run-20260101_000000-r1/run-r1.wandb.syncstate",
+        }
+        assert read_manifest(dest)["version"] == 3
+        assert not dest.with_name(dest.name + ".tmp").exists()
+
+    def test_roundtrip(self, tmp_path):
+        a, b = self._make_runs(tmp_path / "out")
+        dest = tmp_path / "me__nb__v3.tar.gz"
+        write_archive(tmp_path / "out", dest, "me/nb", 3)
+        restore_archive(dest, tmp_path / "back")
+        for run_dir in (a, b):
+            restored = tmp_path / "back" / run_dir.relative_to(tmp_path / "out")
+            originals = {f.relative_to(run_dir): f.read_bytes() for f in run_dir.rglob("*") if f.is_file() and "logs" not in f.parts}
+            copies = {f.relative_to(restored): f.read_bytes() for f in restored.rglob("*") if f.is_file()}
+            assert copies == originals
+        assert not (tmp_path / "back" / a.relative_to(tmp_path / "out") / "logs").exists()
+
+    def test_selective_restore_resolves_links(self, tmp_path):
+        a, b = self._make_runs(tmp_path / "out")
+        dest = tmp_path / "me__nb__v3.tar.gz"
+        write_archive(tmp_path / "out", dest, "me/nb", 3)
+        restored = restore_archive(dest, tmp_path / "back", runs={"r2"})
+        assert [r["run_id"] for r in restored] == ["r2"]
+        assert not (tmp_path / "back" / "wandb" / a.name).exists()
+        media = tmp_path / "back" / "wandb" / b.name / "files" / "media" / "images" / "big.png"
+        assert media.read_bytes() == b"x" * 5000
+        assert [r.run_id for r in discover_runs(tmp_path / "back")] == ["r2"]
+
+    def test_archive_restore_commands(self, tmp_path):
+        self._make_runs(tmp_path / "out")
+        record_event("push", kernel_id="me/nb", version=7, status="OK")
+        result = runner.invoke(main, ["archive", "me/nb", str(tmp_path / "out"), "--archive-dir", str(tmp_path / "arch")])
+        assert result.exit_code == 0, result.output
+        assert (tmp_path / "arch" / "me__nb__v7.tar.gz").exists()
+        assert "2 duplicate file(s)" in result.output
+
+        result = runner.invoke(main, ["restore", "me/nb", "--archive-dir", str(tmp_path / "arch"), "--list"])
+        assert result.exit_code == 0, result.output
+        assert "r1" in result.output and "r2" in result.output
+
+        result = runner.invoke(main, ["restore", "me/nb", "--archive-dir", str(tmp_path / "arch"),
+                                      "--run", "r1", "-o", str(tmp_path / "back")])
+        assert result.exit_code == 0, result.output
+        assert [r.run_id for r in discover_runs(tmp_path / "back")] == ["r1"]
+
+    def test_restore_errors(self, tmp_path):
+        result = runner.invoke(main, ["restore", "me/nb", "--archive-dir", str(tmp_path)])
+        assert result.exit_code == 1
+        assert "no archive" in result.output
+
+        self._make_runs(tmp_path / "out")
+        write_archive(tmp_path / "out", tmp_path / "me__nb__v1.tar.gz", "me/nb", 1)
+        result = runner.invoke(main, ["restore", "me/nb", "--archive-dir", str(tmp_path), "--run", "nope"])
+        assert result.exit_code == 1
+        assert "nope" in result.output
+
+    def test_archive_without_runs(self, tmp_path):
+        result = runner.invoke(main, ["archive", "me/nb", str(tmp_path)])
+        assert result.exit_code == 1
+        assert "No offline-run-*" in result.output
+
+
+class TestApi:
+    def test_push_and_poll(self, tmp_path, fake_kaggle):
+        comp_dir = TestPush()._make_dir(tmp_path)
+        client = Client()
+        pushed = asyncio.run(client.push(comp_dir, wait_interval=0))
+        assert pushed.ok and pushed.kernel_id == "user/my-notebook" and pushed.version == 3
+        polled = asyncio.run(client.poll(pushed.kernel_id, interval=0))
+        assert polled.ok and polled.attempts == 1
+        assert query_events(command="poll")[0]["status"] == "OK"
+
+    def test_many_kernels_on_one_loop(self, tmp_path, fake_kaggle):
+        client = Client()
+
+        async def pipeline(kernel_id):
+            polled = await client.poll(kernel_id, interval=0)
+            assert polled.ok
+            return await client.download(kernel_id, tmp_path / kernel_id.replace("/", "__"))
+
+        async def main():
+            return await asyncio.gather(*(pipeline(f"me/k{i}") for i in range(20)))
+
+        results = asyncio.run(main())
+        assert [r.status for r in results] == ["OK"] * 20
+        assert all((tmp_path / f"me__k{i}" / "part0.bin").exists() for i in range(20))
+
+    def test_download_many_reports_failures(self, tmp_path, fake_kaggle):
+        results = asyncio.run(Client().download_many(["me/a", "me/bad"], tmp_path))
+        assert [(r.kernel_id, r.status) for r in results] == [("me/a", "OK"), ("me/bad", "FAILED")]
+        assert results[0].path == str(tmp_path / "me__a")
+
+    def test_pipeline(self, tmp_path, fake_kaggle):
+        notebooks = {"me/a": str(tmp_path), "me/bad": str(tmp_path)}
+        results = asyncio.run(Client().pipeline(notebooks, tmp_path / "out", skip_push=True, skip_sync=True, poll_interval=0))
+        assert {name: r.status for name, r in results.items()} == {
+            "me/a:poll": "OK", "me/a:output": "OK", "me/bad:poll": "OK", "me/bad:output": "FAILED",
+        }
+        assert isinstance(results["me/bad:output"].error, StageFailed)
+        assert (tmp_path / "out" / "me__a" / "part0.bin").exists()
+
+    def test_setup_errors_raise(self, tmp_path):
+        client = Client(wandb_cmd="wandb")
+        with pytest.raises(KaggleWandbSyncError, match="not found"):
+            asyncio.run(client.push(tmp_path))
+        with pytest.raises(KaggleWandbSyncError, match="does not exist"):
+            asyncio.run(client.sync(tmp_path / "missing"))
+        with pytest.raises(KaggleWandbSyncError, match="No offline-run"):
+            asyncio.run(client.sync(tmp_path))
+
+    def test_record_score(self, tmp_path):
+        _make_offline_run(tmp_path, run_id="r1", steps=1)
+        api = _FakeApi()
+        result = asyncio.run(Client().record_score(0.9, ["a/b/c"], output_dir=tmp_path, api=api))
+        assert result.ok
+        assert sorted(result.updated) == ["a/b/c", "me/proj/r1"]
+        assert api.updated["me/proj/r1"] == {"submitted": True, "kaggle_score": 0.9}
+        assert query_events(command="score")[0]["score"] == 0.9
+
+
+class TestLoadtest:
+    QUIET = FaultConfig(error_rate=0, latency_ms=0, transfer_kbps=0, run_seconds=0.2, output_kb=4)
+
+    def _get(self, url):
+        import urllib.error
+        import urllib.request
+
+        try:
+            with urllib.request.urlopen(url) as resp:
+                return resp.status, resp.headers
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers
+
+    def test_rate_limit_returns_429(self):
+        with FakeServer(self.QUIET._replace(kaggle_rps=1)) as server:
+            codes = [self._get(f"{server.url}/kaggle/submissions?c=x") for _ in range(3)]
+            assert [c for c, _ in codes] == [200, 429, 429]
+            assert float(codes[1][1]["Retry-After"]) > 0
+            assert server.stats()["submissions"]["429"] == 2
+
+    def test_error_bursts(self):
+        with FakeServer(self.QUIET._replace(error_rate=1, burst=2)) as server:
+            codes = [self._get(f"{server.url}/kaggle/submissions?c=x")[0] for _ in range(3)]
+            assert codes == [503, 503, 503]  # a new burst starts right after the first
+            assert server.stats()["submissions"]["5xx"] == 3
+
+    def test_default_burst_fits_score_retries(self):
+        burst = FaultConfig().burst
+        with FakeServer(self.QUIET) as server:
+            server._bursts["summary"] = burst  # one default burst, already started
+            errors = update_summaries(["e/p/r1"], {"kaggle_score": 0.5}, api=_FakeWandbApi(server.url), backoff=0)
+            assert errors == {"e/p/r1": None}
+            assert server.stats()["summary"]["5xx"] == burst
+
+    def test_run_load(self):
+        report = run_load(3, self.QUIET, poll_interval=0.1)
+        assert report.ok == 3 and not report.failed
+        assert all(report.stages[s].count == 3 for s in ("push", "poll", "download", "sync", "score"))
+        assert report.bytes >= 3 * 4 * 1024 * 2  # downloaded and uploaded again
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 50) == 0.0
+
+
+class TestShard:
+    def _make_notebooks(self, tmp_path, n=3):
+        dirs = []
+        for i in range(n):
+            d = tmp_path / f"nb{i}"
+            d.mkdir()
+            (d / "kernel-metadata.json").write_text(json.dumps({"id": f"me/nb{i}"}))
+            (d / "nb.ipynb").write_text("x" * (1000 * (i + 1)))
+            dirs.append(str(d))
+        return dirs
+
+    def test_parse_shard(self):
+        assert parse_shard("2/4") == (2, 4)
+        for bad in ("0/4", "5/4", "1", "a/b", "1/0"):
+            with pytest.raises(ValueError):
+                parse_shard(bad)
+
+    def test_assign_is_balanced_and_deterministic(self):
+        weights = {"a": 10, "b": 9, "c": 5, "d": 4, "e": 1}
+        shards = assign_shards(weights, 2)
+        assert shards == [["a", "d", "e"], ["b", "c"]]
+        assert assign_shards(dict(reversed(weights.items())), 2) == shards
+        assert assign_shards(weights, 7)[5:] == [[], []]
+
+    def test_weights_prefer_history(self, tmp_path):
+        notebooks = {"me/a": str(tmp_path), "me/b": str(tmp_path)}
+        record_event("run", kernel_id="me/a", status="OK", duration=100)
+        weights, basis = notebook_weights(notebooks)
+        assert basis == "size"  # me/b has no history yet
+        record_event("run", kernel_id="me/b", status="OK", duration=30)
+        record_event("run", kernel_id="me/b", status="OK", duration=50)
+        weights, basis = notebook_weights(notebooks)
+        assert basis == "history" and weights == {"me/a": 100, "me/b": 40}
+
+    def test_sharded_run_and_merge(self, tmp_path, fake_kaggle):
+        dirs = self._make_notebooks(tmp_path)
+        out = tmp_path / "out"
+        for i in (1, 2):
+            result = runner.invoke(main, ["run", *dirs, "--shard", f"{i}/2", "--skip-sync", "--poll-interval", "0",
+                                          "-o", str(out), "--result-file", str(tmp_path / f"r{i}.json")])
+            assert result.exit_code == 0, result.output
+            assert f"Shard {i}/2" in result.output
+        # size-balanced: nb2 (largest) alone, nb1 + nb0 together
+        r1 = json.loads((tmp_path / "r1.json").read_text())
+        assert [k["kernel_id"] for k in r1["kernels"]] == ["me/nb2"]
+        assert r1["kernels"][0]["stages"]["push"]["status"] == "OK"
+        assert (out / "me__nb0" / "part0.bin").exists()
+
+        result = runner.invoke(main, ["merge-results", str(tmp_path / "r1.json"), str(tmp_path / "r2.json"), "--json"])
+        assert result.exit_code == 0, result.output
+        merged = json.loads(result.output)
+        assert merged["ok"] == 3 and merged["missing_shards"] == []
+        assert merged["missing_kernels"] == merged["duplicate_kernels"] == []
+        assert r1["notebooks"] == ["me/nb0", "me/nb1", "me/nb2"] and r1["basis"] == "size"
+
+        result = runner.invoke(main, ["merge-results", str(tmp_path / "r1.json")])
+        assert result.exit_code == 1
+        assert "missing shard(s): 2/2" in result.output
+
+    def test_merge_checks_the_split(self, tmp_path):
+        def write(name, shard, kernel_ids, notebooks=("me/a", "me/b", "me/c"), basis="size"):
+            kernels = [{"kernel_id": k, "status": "OK", "duration": 1} for k in kernel_ids]
+            data = {"shard": shard, "notebooks": list(notebooks), "basis": basis, "kernels": kernels}
+            (tmp_path / name).write_text(json.dumps(data))
+            return str(tmp_path / name)
+
+        # the two shards weighed the kernels differently: me/b ran twice, me/c never
+        files = [write("r1.json", "1/2", ["me/a", "me/b"]), write("r2.json", "2/2", ["me/b"], basis="history")]
+        result = runner.invoke(main, ["merge-results", *files, "--no-notify"])
+        assert result.exit_code == 1
+        assert "kernel(s) in no result file: me/c" in result.output
+        assert "kernel(s) in more than one result file: me/b" in result.output
+        assert "different bases (history, size)" in result.output
+
+        files[1] = write("r2.json", "2/2", ["me/c"], notebooks=("me/a", "me/c"))
+        result = runner.invoke(main, ["merge-results", *files, "--no-notify"])
+        assert result.exit_code == 1
+        assert "different kernel lists" in result.output
+
+    def test_multi_directory_rejects_kernel_id(self, tmp_path):
+        dirs = self._make_notebooks(tmp_path, 2)
+        result = runner.invoke(main, ["run", *dirs, "--kernel-id", "me/x"])
+        assert result.exit_code == 1
+        assert "single DIRECTORY" in result.output
+
+    def test_invalid_shard(self, tmp_path):
+        result = runner.invoke(main, ["run", str(tmp_path), "--shard", "3/2"])
+        assert result.exit_code == 2
+        assert "invalid shard" in result.output
+
+
+def _busy_in_thread():
+    return sum(i * i for i in range(20000))
+
+
+class TestProfile:
+    def test_profile_option_writes_dump_and_breakdown(self, tmp_path):
+        import pstats
+
+        path = tmp_path / "out.prof"
+        result = runner.invoke(main, ["--profile", str(path), "history"])
+        assert result.exit_code == 0, result.output
+        assert "Profile of 'history'" in result.output
+        assert "self CPU" in result.output and "child process" in result.output
+        assert "Top 15 functions" in result.output
+        assert pstats.Stats(str(path)).total_calls > 0
+
+    def test_profile_on_failing_command(self, tmp_path):
+        path = tmp_path / "out.prof"
+        result = runner.invoke(main, ["--profile", str(path), "sync", str(tmp_path / "missing")])
+        assert result.exit_code == 1
+        assert "Profile of 'sync'" in result.output
+        assert path.exists()
+
+    def test_threads_are_merged_and_waits_categorised(self):
+        profiler = Profiler().start()
+        thread = threading.Thread(target=_busy_in_thread)
+        thread.start()
+        thread.join()
+        with timed("sleep"):
+            time.sleep(0.05)
+        run_streaming([sys.executable, "-c", "pass"], echo=False)
+        report = profiler.stop("test")
+        assert report.sleep >= 0.05
+        assert report.child > 0
+        functions = {func for _, _, func in report.stats.stats}
+        assert "_busy_in_thread" in functions
+        assert not any("time.sleep" in where for *_, where in hotspots(report.stats, 100))
+
+    def test_timed_is_inert_without_profiler(self):
+        with timed("sleep"):
+            pass
+
+
+class _FakeArtifact:
+    """Stand-in for a wandb.Artifact version (or a draft of the next one)."""
+
+    class _Entry:
+        def __init__(self, size, digest):
+            self.size, self.digest = size, digest
+
+    def __init__(self, entries, version=None):
+        self.manifest = type("Manifest", (), {"entries": dict(entries)})()
+        self.version = version
+        self.added = []
+
+    def new_draft(self):
+        return _FakeArtifact(self.manifest.entries)
+
+    def add_file(self, local_path, name, overwrite=False, policy="mutable"):
+        self.manifest.entries[name] = self._Entry(os.path.getsize(local_path), md5_b64(local_path))
+        self.added.append(name)
+
+    def remove(self, name):
+        del self.manifest.entries[name]
+
+    def wait(self):
+        return self
+
+
+class _FakeArtifactBackend:
+    """wandb.Api() and wandb.init stand-ins that keep artifact versions in memory."""
+
+    def __init__(self):
+        self.versions = []  # (run_path, _FakeArtifact)
+        self.linked = []
+        self.uploads = []
+
+    def artifact(self, name, type=None):
+        from wandb.errors import CommError
+
+        if not self.versions:
+            # what wandb.Api().artifact raises for a missing artifact
+            missing = ValueError(f"artifact membership {name!r} not found")
+            raise CommError(str(missing), missing)
+        return self.versions[-1][1]
+
+    def run(self, path):
+        backend = self
+
+        class _Run:
+            def log_artifact(self, artifact):
+                backend.linked.append((path, artifact.version))
+
+        return _Run()
+
+    def init(self, entity, project, id, **kwargs):
+        backend = self
+
+        class _Run:
+            def log_artifact(self, draft):
+                entries = draft.manifest.entries
+                logged = _FakeArtifact(
+                    {n: _FakeArtifact._Entry(e.size, e.digest) for n, e in entries.items()},
+                    version=f"v{len(backend.versions)}",
+                )
+                backend.versions.append((f"{entity}/{project}/{id}", logged))
+                backend.uploads.append(sorted(getattr(draft, "added", None) or entries))
+                return logged
+
+            def finish(self):
+                pass
+
+        return _Run()
+
+
+class TestArtifacts:
+    def _make_output(self, root):
+        _make_offline_run(root / "wandb", run_id="old", steps=1, started="20260101_000000")
+        _make_offline_run(root / "wandb", run_id="new", steps=1, started="20260101_000100")
+        (root / "submission.csv").write_text("id,target\n1,0.5\n")
+        (root / "models").mkdir()
+        (root / "models" / "fold0.pt").write_bytes(b"\0" * 5000)
+        (root / "models" / "fold1.pt").write_bytes(b"\1" * 5000)
+
+    def test_select_files(self, tmp_path):
+        self._make_output(tmp_path)
+        files = select_files(tmp_path, ["submission.csv", "models/*.pt", "**/*.wandb"])
+        assert sorted(files) == ["models/fold0.pt", "models/fold1.pt", "submission.csv"]
+        with pytest.raises(ValueError, match="relative"):
+            select_files(tmp_path, [str(tmp_path / "*.csv")])
+
+    def test_changed_files_hashes_only_same_size(self, tmp_path):
+        from wandb.sdk.lib.hashutil import md5_file_b64
+
+        self._make_output(tmp_path)
+        files = select_files(tmp_path, ["submission.csv", "models/*.pt"])
+        assert md5_b64(files["submission.csv"]) == md5_file_b64(str(files["submission.csv"]))
+        previous = {
+            "models/fold0.pt": (5000, md5_b64(files["models/fold0.pt"])),
+            "models/fold1.pt": (5000, "stale"),
+            "submission.csv": (1, md5_b64(files["submission.csv"])),
+        }
+        assert sorted(changed_files(files, previous, max_workers=2)) == ["models/fold1.pt", "submission.csv"]
+
+    def test_latest_version_reraises_other_errors(self):
+        from wandb.errors import CommError
+        from kaggle_wandb_sync._artifacts import _latest_version
+
+        class Api:
+            def artifact(self, name, type=None):
+                raise CommError("HTTP 500: not found in cache", RuntimeError("boom"))
+
+        with pytest.raises(CommError):
+            _latest_version(Api(), "me/proj/out", "kaggle-output")
+
+    def test_only_changed_files_are_uploaded(self, tmp_path):
+        self._make_output(tmp_path)
+        backend = _FakeArtifactBackend()
+        client = Client()
+
+        def log():
+            return asyncio.run(client.log_artifacts(
+                tmp_path, ["submission.csv", "models/*.pt"], kernel_id="me/nb", api=backend, init=backend.init,
+            ))
+
+        first = log()
+        assert [(r.run_path, r.artifact, r.uploaded) for r in first] == [("me/proj/new", "proj-output:v0", 3)]
+        assert first[0].bytes == 10000 + len("id,target\n1,0.5\n")
+
+        second = log()
+        assert second[0].ok and second[0].uploaded == 0 and second[0].artifact == "proj-output:v0"
+        assert backend.linked == [("me/proj/new", "v0")]
+
+        (tmp_path / "models" / "fold1.pt").write_bytes(b"\2" * 5000)
+        third = log()
+        assert third[0].artifact == "proj-output:v1" and third[0].uploaded == 1
+        assert backend.uploads[-1] == ["models/fold1.pt"]
+        assert sorted(backend.versions[-1][1].manifest.entries) == ["models/fold0.pt", "models/fold1.pt", "submission.csv"]
+        assert query_events(command="artifact")[0]["bytes"] == 5000
+
+    def test_upload_errors_are_reported(self, tmp_path):
+        self._make_output(tmp_path)
+
+        def init(**kwargs):
+            raise ConnectionError("run not resumable")
+
+        results = asyncio.run(Client().log_artifacts(
+            tmp_path, ["submission.csv"], name="preds", api=_FakeArtifactBackend(), init=init,
+        ))
+        assert not results[0].ok and results[0].artifact == "preds"
+        assert "not resumable" in results[0].error
+        assert query_events(command="artifact")[0]["status"] == "FAILED"
+